@@ -1,6 +1,10 @@
 import logging
-from class_adw import OracleADBConnection
-from config import DB_CONFIG, TABLE_NAME
+from class_adw import (OracleADBConnection, genai_stats_table_name, genai_stats_table_ddl,
+                       vector_index_ddl, vector_index_name, text_index_ddl, text_index_name,
+                       docid_index_ddl, docid_index_name)
+from config import (DB_CONFIG, TABLE_NAME, VECTOR_DIMENSIONS, VECTOR_FORMAT, VECTOR_DISTANCE_METRIC,
+                    VECTOR_INDEX_TYPE, VECTOR_INDEX_ACCURACY, VECTOR_INDEX_PARTITIONS, EXPECTED_ROWS,
+                    TEXT_INDEX_ENABLED)
 import oracledb
 import os
 
@@ -8,6 +12,7 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger(__name__)
 
 SQL_DROP_TABLE = f"DROP TABLE {TABLE_NAME} PURGE"
+SQL_DROP_STATS_TABLE = f"DROP TABLE {genai_stats_table_name(TABLE_NAME)} PURGE"
 
 SQL_CREATE_TABLE = f"""
 CREATE TABLE {TABLE_NAME}
@@ -15,23 +20,27 @@ CREATE TABLE {TABLE_NAME}
     id             NUMBER GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
     docid          VARCHAR2(500),
     body           CLOB,
-    vector         VECTOR(1536, FLOAT32),
+    vector         VECTOR({VECTOR_DIMENSIONS}, {VECTOR_FORMAT}),
     title          VARCHAR2(500),
     url            VARCHAR2(1000),
     chunk_id       NUMBER,
     page_numbers   VARCHAR2(100),
     metadata       JSON,
+    content_hash   VARCHAR2(64),
     fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 )
 """
 
-SQL_CREATE_INDEX = f"""
-CREATE VECTOR INDEX idx_vector_{TABLE_NAME}
-ON {TABLE_NAME}(vector)
-ORGANIZATION INMEMORY NEIGHBOR GRAPH
-DISTANCE COSINE
-WITH TARGET ACCURACY 95
-"""
+
+def resolve_index_settings(db):
+    """Tipo de índice y particiones: los configurados, o los recomendados por el advisor (AUTO)"""
+    if VECTOR_INDEX_TYPE != "AUTO":
+        return VECTOR_INDEX_TYPE, VECTOR_INDEX_PARTITIONS
+
+    logger.info(f"Consultando el vector memory advisor para {EXPECTED_ROWS} filas de {VECTOR_DIMENSIONS} "
+                f"dimensiones {VECTOR_FORMAT}...")
+    recommendation = db.recommend_vector_index(EXPECTED_ROWS, VECTOR_DIMENSIONS, VECTOR_FORMAT)
+    return recommendation['index_type'], VECTOR_INDEX_PARTITIONS or recommendation['neighbor_partitions']
 
 
 def setup_database_table():
@@ -59,24 +68,35 @@ def setup_database_table():
         with db.get_connection() as conn:
             logger.info(f"✓ Conexión exitosa. Versión Oracle: {conn.version}")
 
-        try:
-            logger.info(f"Intentando eliminar la tabla '{TABLE_NAME}' si existe...")
-            db.execute_dml(SQL_DROP_TABLE)
-            logger.info(f"✓ Tabla '{TABLE_NAME}' eliminada con éxito.")
-        except oracledb.DatabaseError as e:
-            # ORA-00942: table or view does not exist
-            if 'ORA-00942' in str(e):
-                logger.info(f"La tabla '{TABLE_NAME}' no existía, no fue necesario eliminarla.")
-            else:
-                raise
-
-        logger.info(f"Creando la tabla '{TABLE_NAME}'...")
-        db.execute_dml(SQL_CREATE_TABLE)
-        logger.info(f"✓ Tabla '{TABLE_NAME}' creada con éxito.")
-
-        logger.info(f"Creando el índice vectorial 'idx_vector_{TABLE_NAME}'...")
-        db.execute_dml(SQL_CREATE_INDEX)
-        logger.info(f"✓ Índice vectorial 'idx_vector_{TABLE_NAME}' creado con éxito.")
+        index_type, partitions = resolve_index_settings(db)
+
+        # (sentencia, mensaje, se ignora si la tabla no existe): todo el DDL en un solo pipeline
+        steps = [
+            (SQL_DROP_TABLE, f"Tabla '{TABLE_NAME}' eliminada", True),
+            (SQL_DROP_STATS_TABLE, f"Tabla de estadísticas '{genai_stats_table_name(TABLE_NAME)}' eliminada", True),
+            (SQL_CREATE_TABLE, f"Tabla '{TABLE_NAME}' creada", False),
+            # docid: MERGE de la ingesta idempotente y consulta de hashes por archivo
+            (docid_index_ddl(TABLE_NAME), f"Índice '{docid_index_name(TABLE_NAME)}' creado", False),
+            (vector_index_ddl(TABLE_NAME, index_type, VECTOR_DISTANCE_METRIC, VECTOR_INDEX_ACCURACY, partitions),
+             f"Índice vectorial '{vector_index_name(TABLE_NAME)}' ({index_type}) creado", False),
+            (genai_stats_table_ddl(TABLE_NAME),
+             f"Tabla de estadísticas '{genai_stats_table_name(TABLE_NAME)}' creada", False),
+        ]
+        if TEXT_INDEX_ENABLED:
+            steps.append((text_index_ddl(TABLE_NAME),
+                          f"Índice de texto '{text_index_name(TABLE_NAME)}' para la búsqueda híbrida creado", False))
+
+        logger.info(f"Recreando la tabla '{TABLE_NAME}' y sus índices ({len(steps)} sentencias en un pipeline)...")
+        results = db.execute_pipeline([('execute', statement) for statement, _, _ in steps],
+                                      continue_on_error=True)
+        for (_, message, missing_ok), result in zip(steps, results):
+            if isinstance(result, Exception):
+                # ORA-00942: table or view does not exist
+                if missing_ok and 'ORA-00942' in str(result):
+                    continue
+                raise result
+            logger.info(f"✓ {message}.")
+        db.close_pool()
 
         logger.info("\n" + "=" * 60)
         logger.info("✓ Configuración de la base de datos finalizada exitosamente.")
@@ -0,0 +1,105 @@
+import logging
+import time
+import numpy as np
+from class_adw import OracleADBConnection
+from class_ann import PQIndex
+from class_local import top_k_distances
+from class_pq import PQVectorIndex
+from config import DB_CONFIG, TABLE_NAME, VECTOR_DISTANCE_METRIC
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+CANDIDATES = 100
+NUM_QUERIES = 50
+SAMPLE_ROWS = 20000
+SUBSPACE_DIVISORS = [8, 16]  # m = dim // divisor bytes de código por vector
+
+
+def recall(expected, found):
+    """Fracción de los vecinos exactos recuperados"""
+    return float(np.mean([len(set(e) & set(f)) / len(e) for e, f in zip(expected, found)]))
+
+
+def sweep_subspaces(matrix, queries):
+    """Recall@k y latencia ADC por número de subespacios, frente al top-k exacto en memoria"""
+    norms = np.linalg.norm(matrix, axis=1)
+    expected = [[row for row, _ in hits] for hits in
+                top_k_distances(matrix, norms, queries, TOP_K, VECTOR_DISTANCE_METRIC)]
+    dim = matrix.shape[1]
+
+    results = []
+    for divisor in SUBSPACE_DIVISORS:
+        if dim % divisor:
+            continue
+        index = PQIndex(dim, dim // divisor, VECTOR_DISTANCE_METRIC)
+        start = time.perf_counter()
+        index.train(matrix)
+        index.add(matrix)
+        build_s = time.perf_counter() - start
+
+        found, reranked, latencies = [], [], []
+        for query in queries:
+            start = time.perf_counter()
+            hits = index.search(query, CANDIDATES)
+            latencies.append((time.perf_counter() - start) * 1000)
+            rows = np.array([row for row, _ in hits])
+            found.append(rows[:TOP_K])
+            # Re-rank exacto de los candidatos (lo que hace ADB con rerank=True)
+            exact = top_k_distances(matrix[rows], norms[rows], query, TOP_K, VECTOR_DISTANCE_METRIC)[0]
+            reranked.append(rows[[row for row, _ in exact]])
+
+        results.append({
+            'm': index.m,
+            'compression': matrix.nbytes / index.memory_bytes,
+            'recall': recall(expected, found),
+            'rerank_recall': recall(expected, reranked),
+            'adc_ms_p50': float(np.percentile(latencies, 50)),
+            'build_s': build_s
+        })
+    return results
+
+
+def run_benchmark():
+    """Barrido de subespacios PQ en memoria y prueba de extremo a extremo con re-rank en ADB"""
+    if VECTOR_DISTANCE_METRIC != 'COSINE':
+        logger.error("El índice PQ requiere vectores FLOAT32/INT8 (métrica COSINE).")
+        return
+
+    db = OracleADBConnection(**DB_CONFIG)
+    _, matrix = db.fetch_vector_matrix(
+        f"SELECT id, vector FROM {TABLE_NAME} FETCH FIRST :1 ROWS ONLY", [SAMPLE_ROWS])
+    if len(matrix) <= NUM_QUERIES:
+        logger.error(f"Se necesitan más de {NUM_QUERIES} vectores en '{TABLE_NAME}'.")
+        return
+    matrix = matrix.astype(np.float32)
+
+    rng = np.random.default_rng(42)
+    query_idx = rng.choice(len(matrix), NUM_QUERIES, replace=False)
+    queries = matrix[query_idx]
+    collection = np.delete(matrix, query_idx, axis=0)
+    logger.info(f"Colección: {len(collection)} vectores de {matrix.shape[1]} dimensiones, {NUM_QUERIES} consultas")
+
+    logger.info("\n" + "=" * 72)
+    logger.info(f"{'m':>5} {'Códigos':>10} {f'Recall@{TOP_K}':>10} {'+re-rank':>9} {'ADC p50':>10} {'Build':>8}")
+    for result in sweep_subspaces(collection, queries):
+        logger.info(f"{result['m']:>5} {result['compression']:>9.1f}x {result['recall']:>10.3f} "
+                    f"{result['rerank_recall']:>9.3f} {result['adc_ms_p50']:>7.2f} ms {result['build_s']:>6.1f} s")
+    logger.info(f"(compresión de códigos + codebooks frente a float32; re-rank exacto de {CANDIDATES} "
+                f"candidatos ADC)")
+    logger.info("=" * 72)
+
+    # Extremo a extremo sobre la tabla completa: ADC en el proceso + re-rank en ADB
+    pq = PQVectorIndex(db, TABLE_NAME, distance_metric=VECTOR_DISTANCE_METRIC)
+    pq.build()
+    result = pq.benchmark(queries, TOP_K, CANDIDATES)
+    logger.info(f"PQ ({result['bytes_per_vector']} bytes/vector de código, {result['compression']:.1f}x "
+                f"con id/docid/title por fila): "
+                f"recall {result['pq_recall']:.3f} en {result['pq_ms_p50']:.2f} ms; "
+                f"con re-rank {result['rerank_recall']:.3f} en {result['rerank_ms_p50']:.1f} ms; "
+                f"ADB exacto {result['adb_ms_p50']:.1f} ms")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,31 @@
+import logging
+import sys
+from class_adw import OracleADBConnection
+from config import DB_CONFIG, TABLE_NAME
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+USAGE = "Uso: python 11-snapshot_collection.py export|import <directorio> [tabla]"
+
+
+def main():
+    """Exportar la tabla a un snapshot columnar o cargar un snapshot en la tabla"""
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "import"):
+        logger.error(USAGE)
+        sys.exit(1)
+
+    operation, path = sys.argv[1], sys.argv[2]
+    table_name = sys.argv[3] if len(sys.argv) > 3 else TABLE_NAME
+    db = OracleADBConnection(**DB_CONFIG)
+
+    if operation == "export":
+        db.export_collection(table_name, path)
+    else:
+        # La tabla destino debe existir (1-create_vector_table.py); conviene crear el
+        # índice vectorial después de la carga
+        db.import_collection(path, table_name)
+
+
+if __name__ == "__main__":
+    main()
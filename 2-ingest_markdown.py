@@ -2,8 +2,12 @@ import os
 import json
 import logging
 from class_adw import OracleADBConnection
+from class_local import create_vector_backend
+from class_index import VectorIndexManager
 from class_vector import CohereOCIEmbedder
-from config import DB_CONFIG, OCI_CONFIG, MARKDOWN_DIR, TABLE_NAME, CHUNK_SIZE, CHUNK_OVERLAP, BATCH_SIZE
+from config import (DB_CONFIG, OCI_CONFIG, MARKDOWN_DIR, TABLE_NAME, CHUNK_SIZE, CHUNK_OVERLAP, BATCH_SIZE, INGEST_MODE,
+                    VECTOR_INDEX_TYPE, VECTOR_INDEX_ACCURACY, VECTOR_INDEX_PARTITIONS, INDEX_WAIT_POPULATION,
+                    VECTOR_DISTANCE_METRIC, VECTOR_DIMENSIONS, VECTOR_FORMAT, VECTOR_BACKEND, LOCAL_STORE_PATH)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -34,16 +38,112 @@ def chunk_text(text, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP):
     return chunks
 
 
+def build_chunk_documents(filename, chunks):
+    """Documentos GenAI (sin vector) de los chunks de un archivo"""
+    documents = []
+    for idx, chunk in enumerate(chunks, 1):
+        metadata = {
+            "source_file": filename,
+            "chunk_index": idx,
+            "total_chunks": len(chunks),
+            "char_count": len(chunk),
+            "embedding_model": OCI_CONFIG["model_id"],
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP
+        }
+        documents.append({
+            'docid': f"{filename}_chunk_{idx}",
+            'body': chunk[:4000],
+            'title': filename,
+            'chunk_id': idx,
+            'metadata': json.dumps(metadata)
+        })
+    return documents
+
+
+def insert_files(db, embedder, documents_by_file):
+    """Vectoriza e inserta todos los chunks (modo insert: no detecta chunks ya ingestados)"""
+    total_chunks_inserted = 0
+    documents_batch = []
+
+    for filename, documents in documents_by_file.items():
+        logger.info(f"Procesando archivo: {filename} ({len(documents)} chunks)")
+
+        for idx, doc in enumerate(documents, 1):
+            try:
+                logger.info(f"Vectorizando chunk {idx}/{len(documents)} de {filename}...")
+                documents_batch.append({**doc, 'vector': embedder.embed_vector(doc['body'])})
+
+                if len(documents_batch) >= BATCH_SIZE:
+                    total_chunks_inserted += db.bulk_insert_genai(documents_batch, TABLE_NAME, BATCH_SIZE)
+                    documents_batch = []
+
+            except Exception as e:
+                logger.error(f"Error al procesar chunk {idx} del archivo {filename}: {e}")
+                continue
+
+        logger.info(f"✓ Archivo {filename} completado. {len(documents)} chunks procesados.")
+
+    if documents_batch:
+        total_chunks_inserted += db.bulk_insert_genai(documents_batch, TABLE_NAME, BATCH_SIZE)
+
+    logger.info(f"Proceso de ingesta finalizado. Total de chunks insertados: {total_chunks_inserted}")
+
+
+def upsert_files(db, embedder, documents_by_file, index_manager, unreadable=()):
+    """
+    Sincroniza cada archivo por hash de contenido: solo vectoriza chunks nuevos o modificados
+
+    Los archivos guardados en la tabla que ya no están en MARKDOWN_DIR o quedaron vacíos se
+    sincronizan sin chunks (se borran); los que no se pudieron leer (unreadable) se conservan.
+    """
+    db.ensure_upsert_schema(TABLE_NAME)
+    salt = f"{OCI_CONFIG['model_id']}|{DB_CONFIG['vector_format']}"
+
+    missing = set(db.source_titles_genai(TABLE_NAME)) - set(documents_by_file) - set(unreadable)
+    for filename in sorted(missing):
+        logger.info(f"El archivo {filename} ya no existe o está vacío: se borrarán sus chunks")
+    documents_by_file = {**documents_by_file, **{filename: [] for filename in sorted(missing)}}
+
+    # Una consulta por archivo, todas en un pipeline; el tamaño real del cambio decide la estrategia del índice
+    prefixed = db.diff_sources_genai({f"{filename}_chunk_": documents
+                                      for filename, documents in documents_by_file.items()}, TABLE_NAME, salt)
+    diffs = {filename: prefixed[f"{filename}_chunk_"] for filename in documents_by_file}
+    delta = sum(len(diff['changed']) + len(diff['removed_ids']) for diff in diffs.values())
+    logger.info(f"Chunks por vectorizar: {sum(len(diff['changed']) for diff in diffs.values())}, "
+                f"por borrar: {sum(len(diff['removed_ids']) for diff in diffs.values())}")
+    index_manager.before_ingest(delta)
+
+    totals = {}
+    for filename, documents in documents_by_file.items():
+        result = db.upsert_source_genai(f"{filename}_chunk_", documents, embedder.embed_vector,
+                                        TABLE_NAME, BATCH_SIZE, salt, diff=diffs[filename])
+        for key, value in result.items():
+            totals[key] = totals.get(key, 0) + value
+
+    logger.info(f"Proceso de ingesta finalizado: {totals.get('inserted', 0)} nuevos, "
+                f"{totals.get('updated', 0)} actualizados, {totals.get('deleted', 0)} borrados, "
+                f"{totals.get('unchanged', 0)} sin cambios, {totals.get('embedded', 0)} llamadas de embedding")
+
+
 def process_and_ingest_files():
     """Procesa archivos markdown y los ingesta en formato GenAI"""
     logger.info("Iniciando proceso de ingesta en formato GenAI...")
 
     try:
-        db = OracleADBConnection(**DB_CONFIG)
+        if VECTOR_BACKEND == "local" and INGEST_MODE == "upsert":
+            # Sin MERGE ni borrados: repetir la ingesta duplicaría todos los chunks
+            raise ValueError("El almacén local (VECTOR_BACKEND=local) no admite INGEST_MODE=upsert; "
+                             "use INGEST_MODE=insert sobre un LOCAL_STORE_PATH vacío")
+
+        db = create_vector_backend(VECTOR_BACKEND, LOCAL_STORE_PATH, **DB_CONFIG)
 
-        logger.info("Probando conexión a la base de datos...")
-        with db.get_connection() as conn:
-            logger.info(f"Conexión exitosa a Oracle DB version: {conn.version}")
+        if isinstance(db, OracleADBConnection):
+            logger.info("Probando conexión a la base de datos...")
+            with db.get_connection() as conn:
+                logger.info(f"Conexión exitosa a Oracle DB version: {conn.version}")
+        else:
+            logger.info(f"Usando el almacén vectorial local en '{LOCAL_STORE_PATH}'")
 
         embedder = CohereOCIEmbedder(**OCI_CONFIG)
         logger.info("Embedder de Cohere OCI inicializado correctamente.")
@@ -56,85 +156,62 @@ def process_and_ingest_files():
         files_to_process = [f for f in os.listdir(MARKDOWN_DIR) if f.endswith('.md')]
         if not files_to_process:
             logger.warning(f"No se encontraron archivos .md en el directorio '{MARKDOWN_DIR}'.")
-            return
+            if INGEST_MODE != "upsert":
+                return
         logger.info(f"Se encontraron {len(files_to_process)} archivos para procesar.")
     except FileNotFoundError:
         logger.error(f"El directorio '{MARKDOWN_DIR}' no existe.")
         return
 
-    total_chunks_inserted = 0
-    documents_batch = []
-
+    # Chunking previo: el tamaño del delta decide la estrategia del índice vectorial
+    file_chunks = {}
+    unreadable = []
     for filename in files_to_process:
         file_path = os.path.join(MARKDOWN_DIR, filename)
-        logger.info(f"Procesando archivo: {filename}")
-
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
+        except Exception as e:
+            logger.error(f"Error al leer el archivo {filename}: {e}")
+            unreadable.append(filename)
+            continue
 
-            if not content.strip():
-                logger.warning(f"El archivo {filename} está vacío. Saltando...")
-                continue
+        if not content.strip():
+            logger.warning(f"El archivo {filename} está vacío. Saltando...")
+            continue
+        file_chunks[filename] = chunk_text(content)
 
-            chunks = chunk_text(content)
-            logger.info(f"Archivo dividido en {len(chunks)} chunks")
-
-            for idx, chunk in enumerate(chunks, 1):
-                try:
-                    logger.info(f"Vectorizando chunk {idx}/{len(chunks)} de {filename}...")
-                    embedding_response = embedder.embed_text(chunk)
-                    vector = embedding_response.embeddings[0]
-
-                    docid = f"{filename}_chunk_{idx}"
-                    body = chunk[:4000]
-                    title = filename
-                    chunk_id = idx
-
-                    metadata = {
-                        "source_file": filename,
-                        "chunk_index": idx,
-                        "total_chunks": len(chunks),
-                        "char_count": len(chunk),
-                        "embedding_model": OCI_CONFIG["model_id"],
-                        "chunk_size": CHUNK_SIZE,
-                        "chunk_overlap": CHUNK_OVERLAP
-                    }
-                    metadata_json = json.dumps(metadata)
-
-                    doc = {
-                        'docid': docid,
-                        'body': body,
-                        'vector': vector,
-                        'title': title,
-                        'chunk_id': chunk_id,
-                        'metadata': metadata_json
-                    }
-                    documents_batch.append(doc)
-
-                    if len(documents_batch) >= BATCH_SIZE:
-                        inserted = db.bulk_insert_genai(documents_batch, TABLE_NAME, BATCH_SIZE)
-                        total_chunks_inserted += inserted
-                        documents_batch = []
-
-                    logger.info(f"✓ Chunk {idx}/{len(chunks)} de {filename} preparado.")
-
-                except Exception as e:
-                    logger.error(f"Error al procesar chunk {idx} del archivo {filename}: {e}")
-                    continue
-
-            logger.info(f"✓ Archivo {filename} completado. {len(chunks)} chunks procesados.")
+    documents_by_file = {filename: build_chunk_documents(filename, chunks)
+                         for filename, chunks in file_chunks.items()}
 
-        except Exception as e:
-            logger.error(f"Error al procesar el archivo {filename}: {e}")
-            continue
+    if not isinstance(db, OracleADBConnection):
+        # Sin índice ni MERGE: el almacén local solo admite la ingesta por inserción (INGEST_MODE=insert)
+        insert_files(db, embedder, documents_by_file)
+        log_stats(db)
+        return
 
-    if documents_batch:
-        inserted = db.bulk_insert_genai(documents_batch, TABLE_NAME, BATCH_SIZE)
-        total_chunks_inserted += inserted
+    index_manager = VectorIndexManager(
+        db, TABLE_NAME,
+        index_type=VECTOR_INDEX_TYPE,
+        distance_metric=VECTOR_DISTANCE_METRIC,
+        target_accuracy=VECTOR_INDEX_ACCURACY,
+        neighbor_partitions=VECTOR_INDEX_PARTITIONS,
+        dimensions=VECTOR_DIMENSIONS,
+        dim_type=VECTOR_FORMAT
+    )
+
+    if INGEST_MODE == "upsert":
+        upsert_files(db, embedder, documents_by_file, index_manager, unreadable)
+    else:
+        index_manager.before_ingest(sum(len(chunks) for chunks in file_chunks.values()))
+        insert_files(db, embedder, documents_by_file)
+
+    index_manager.after_ingest(wait_population=INDEX_WAIT_POPULATION)
+    log_stats(db)
 
-    logger.info(f"Proceso de ingesta finalizado. Total de chunks insertados: {total_chunks_inserted}")
 
+def log_stats(db):
+    """Muestra las estadísticas finales de la tabla"""
     try:
         stats = db.get_genai_stats(TABLE_NAME)
         logger.info("\n" + "=" * 50)
@@ -1,8 +1,10 @@
 import logging
 from class_adw import OracleADBConnection
+from class_local import create_vector_backend
 from class_vector import CohereOCIEmbedder
 from class_llm_grok import GrokOCIAssistant
-from config import DB_CONFIG, OCI_CONFIG, TABLE_NAME
+from config import (DB_CONFIG, OCI_CONFIG, TABLE_NAME, VECTOR_DISTANCE_METRIC, HYBRID_SEARCH,
+                    VECTOR_BACKEND, LOCAL_STORE_PATH)
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -15,15 +17,18 @@ def test_rag_pipeline():
 
     try:
         # Inicializar conexiones
-        db = OracleADBConnection(**DB_CONFIG)
+        db = create_vector_backend(VECTOR_BACKEND, LOCAL_STORE_PATH, **DB_CONFIG)
         embedder = CohereOCIEmbedder(**OCI_CONFIG)
         grok = GrokOCIAssistant()  # Usa configuración del .env
 
         logger.info("✓ Componentes inicializados correctamente")
 
         # Verificar conexión a BD
-        with db.get_connection() as conn:
-            logger.info(f"✓ Conectado a Oracle DB versión: {conn.version}")
+        if isinstance(db, OracleADBConnection):
+            with db.get_connection() as conn:
+                logger.info(f"✓ Conectado a Oracle DB versión: {conn.version}")
+        else:
+            logger.info(f"✓ Almacén vectorial local en '{LOCAL_STORE_PATH}'")
 
     except Exception as e:
         logger.error(f"Error inicializando componentes: {e}")
@@ -38,18 +43,26 @@ def test_rag_pipeline():
     try:
         # 1. Vectorizar consulta
         logger.info("1. Generando embedding de la consulta...")
-        query_embedding = embedder.embed_text(query)
-        query_vector = query_embedding.embeddings[0]
+        query_vector = embedder.embed_vector(query)
         logger.info(f"✓ Vector generado: {len(query_vector)} dimensiones")
 
-        # 2. Búsqueda vectorial
+        # 2. Búsqueda vectorial (híbrida con palabras clave si se activa HYBRID_SEARCH)
         logger.info("\n2. Buscando documentos similares...")
-        search_results = db.vector_similarity_search_genai(
-            query_vector=query_vector,
-            top_k=3,
-            distance_metric='COSINE',
-            table_name=TABLE_NAME
-        )
+        if HYBRID_SEARCH and VECTOR_BACKEND == "adb":
+            search_results = db.hybrid_search_genai(
+                query_text=query,
+                query_vector=query_vector,
+                top_k=3,
+                distance_metric=VECTOR_DISTANCE_METRIC,
+                table_name=TABLE_NAME
+            )
+        else:
+            search_results = db.vector_similarity_search_genai(
+                query_vector=query_vector,
+                top_k=3,
+                distance_metric=VECTOR_DISTANCE_METRIC,
+                table_name=TABLE_NAME
+            )
 
         logger.info(f"✓ Encontrados {len(search_results)} documentos relevantes")
 
@@ -0,0 +1,50 @@
+import logging
+from class_adw import OracleADBConnection, genai_stats_table_name, supports_pipelining
+from config import DB_CONFIG, TABLE_NAME
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REPEATS = 5
+
+# Consultas pequeñas e independientes, como las que encadenan los scripts de ingesta
+OPERATIONS = [
+    ('fetchone', "SELECT banner_full FROM v$version"),
+    ('fetchone', f"SELECT COUNT(*) FROM {TABLE_NAME}"),
+    ('fetchone', f"SELECT MAX(fecha_creacion) FROM {TABLE_NAME}"),
+    ('fetchall', "SELECT index_name, status FROM user_indexes WHERE table_name = UPPER(:1)", [TABLE_NAME]),
+    ('fetchall', "SELECT table_name FROM user_tables WHERE table_name = UPPER(:1)",
+     [genai_stats_table_name(TABLE_NAME)]),
+]
+
+
+def run_benchmark():
+    """Compara la ejecución secuencial frente al pipelining de python-oracledb"""
+    if not supports_pipelining():
+        logger.error("El driver instalado no soporta pipelining (requiere python-oracledb >= 2.4).")
+        return
+
+    db = OracleADBConnection(**DB_CONFIG)
+
+    with db.get_connection() as conn:
+        logger.info(f"Conectado a Oracle DB versión: {conn.version}")
+        if int(conn.version.split('.')[0]) < 23:
+            logger.warning("El servidor es anterior a 23ai: el pipeline se ejecutará en secuencia.")
+
+    # Ambos modos se alternan sobre la misma sesión ya abierta y calentada, de modo
+    # que la diferencia medida corresponde a los round trips de las sentencias
+    result = db.benchmark_pipeline(OPERATIONS, REPEATS)
+    sequential = result['sequential_ms']
+    pipelined = result['pipelined_ms']
+    db.close_pool()
+
+    logger.info("\n" + "=" * 60)
+    logger.info(f"Operaciones por ejecución: {len(OPERATIONS)} ({REPEATS} repeticiones)")
+    logger.info(f"Secuencial: {sequential:.1f} ms ({len(OPERATIONS)} round trips)")
+    logger.info(f"Pipeline:   {pipelined:.1f} ms (1 round trip en 23ai)")
+    logger.info(f"Ahorro:     {sequential - pipelined:.1f} ms")
+    logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    run_benchmark()
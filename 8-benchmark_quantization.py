@@ -0,0 +1,90 @@
+import logging
+import numpy as np
+from class_adw import OracleADBConnection, quantize_vector, estimate_hnsw_memory, VECTOR_DIM_BYTES
+from config import DB_CONFIG, TABLE_NAME
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+NUM_QUERIES = 100
+SAMPLE_ROWS = 20000
+EXPECTED_ROWS = 1_000_000  # Filas para proyectar la memoria HNSW de cada formato
+
+# Bits a 1 de cada valor de byte, para la distancia de Hamming
+POPCOUNT = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def top_k_cosine(matrix, queries, k):
+    """Top-k exacto por similitud coseno (FLOAT32 e INT8)"""
+    norms = np.linalg.norm(matrix, axis=1)
+    norms[norms == 0] = 1.0
+    scores = (queries @ matrix.T) / norms
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def top_k_hamming(packed, packed_queries, k):
+    """Top-k exacto por distancia de Hamming sobre bits empaquetados (BINARY)"""
+    distances = np.stack([POPCOUNT[query ^ packed].sum(axis=1) for query in packed_queries])
+    return np.argsort(distances, axis=1, kind='stable')[:, :k]
+
+
+def recall(expected, found):
+    """Fracción de los vecinos FLOAT32 recuperados por el formato cuantizado"""
+    return float(np.mean([len(set(e) & set(f)) / len(e) for e, f in zip(expected, found)]))
+
+
+def quantize_matrix(matrix, vector_format):
+    """Cuantizar cada fila con la misma función que se usa al insertar y al buscar"""
+    dtype = np.int8 if vector_format == 'INT8' else np.uint8
+    return np.stack([np.frombuffer(quantize_vector(row, vector_format), dtype=dtype) for row in matrix])
+
+
+def run_benchmark():
+    """Compara recall@k y memoria de INT8 y BINARY frente a la línea base FLOAT32"""
+    db = OracleADBConnection(**DB_CONFIG)
+
+    _, matrix = db.fetch_vector_matrix(
+        f"SELECT id, vector FROM {TABLE_NAME} FETCH FIRST :1 ROWS ONLY", [SAMPLE_ROWS])
+    if matrix.dtype != np.float32:
+        logger.error(f"La tabla '{TABLE_NAME}' no es FLOAT32: la línea base requiere los vectores originales.")
+        return
+    if len(matrix) <= NUM_QUERIES:
+        logger.error(f"Se necesitan más de {NUM_QUERIES} vectores en '{TABLE_NAME}'.")
+        return
+
+    # Las consultas se excluyen de la colección para no contarse como su propio vecino
+    rng = np.random.default_rng(42)
+    query_idx = rng.choice(len(matrix), NUM_QUERIES, replace=False)
+    queries = matrix[query_idx]
+    collection = np.delete(matrix, query_idx, axis=0)
+    dim = matrix.shape[1]
+    logger.info(f"Colección: {len(collection)} vectores de {dim} dimensiones, {NUM_QUERIES} consultas")
+
+    baseline = top_k_cosine(collection, queries, TOP_K)
+
+    results = {'FLOAT32': 1.0}
+
+    int8_collection = quantize_matrix(collection, 'INT8').astype(np.float32)
+    int8_queries = quantize_matrix(queries, 'INT8').astype(np.float32)
+    found = top_k_cosine(int8_collection, int8_queries, TOP_K)
+    results['INT8'] = recall(baseline, found)
+
+    if dim % 8 == 0:
+        found = top_k_hamming(quantize_matrix(collection, 'BINARY'), quantize_matrix(queries, 'BINARY'), TOP_K)
+        results['BINARY'] = recall(baseline, found)
+    else:
+        logger.warning("Dimensiones no múltiplo de 8: se omite BINARY")
+
+    logger.info("\n" + "=" * 60)
+    logger.info(f"{'Formato':<8} {'Bytes/vector':>12} {'HNSW estimado':>14} {f'Recall@{TOP_K}':>10}")
+    for vector_format, value in results.items():
+        bytes_per_vector = dim * VECTOR_DIM_BYTES[vector_format]
+        hnsw_gb = estimate_hnsw_memory(EXPECTED_ROWS, dim, vector_format) / 1024 ** 3
+        logger.info(f"{vector_format:<8} {bytes_per_vector:>12.0f} {hnsw_gb:>11.2f} GB {value:>10.3f}")
+    logger.info(f"(HNSW proyectado para {EXPECTED_ROWS} vectores; recall exacto frente a FLOAT32 coseno)")
+    logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    run_benchmark()
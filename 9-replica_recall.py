@@ -0,0 +1,50 @@
+import logging
+import numpy as np
+from class_adw import OracleADBConnection
+from class_replica import VectorReplica
+from config import DB_CONFIG, TABLE_NAME, VECTOR_DISTANCE_METRIC, REPLICA_NLIST, REPLICA_NPROBE
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+TOP_K = 10
+NUM_QUERIES = 50
+NPROBE_VALUES = [1, 4, REPLICA_NPROBE, 32]
+
+
+def run_benchmark():
+    """Carga la réplica, reporta su retraso y mide recall@k y latencia frente a ADB por nprobe"""
+    if VECTOR_DISTANCE_METRIC != 'COSINE':
+        logger.error("La réplica IVF requiere vectores FLOAT32/INT8 (métrica COSINE).")
+        return
+
+    db = OracleADBConnection(**DB_CONFIG)
+    replica = VectorReplica(db, TABLE_NAME, nlist=REPLICA_NLIST, nprobe=REPLICA_NPROBE,
+                            distance_metric=VECTOR_DISTANCE_METRIC)
+    replica.load()
+    if replica.index is None or replica.index.alive_count < NUM_QUERIES:
+        logger.error(f"Se necesitan al menos {NUM_QUERIES} vectores en '{TABLE_NAME}'.")
+        return
+
+    replica.sync()
+    logger.info(f"Retraso de la réplica: {replica.staleness()}")
+
+    # Consultas: vectores de la propia tabla con ruido, para no coincidir exactamente
+    rng = np.random.default_rng(42)
+    alive = replica.index.alive_positions()
+    queries = replica.index.vectors(rng.choice(alive, NUM_QUERIES, replace=False))
+    queries = queries + rng.normal(scale=0.01 * np.abs(queries).mean(), size=queries.shape).astype(np.float32)
+
+    results = [replica.measure_recall(queries, TOP_K, nprobe) for nprobe in NPROBE_VALUES]
+
+    logger.info("\n" + "=" * 60)
+    logger.info(f"{'nprobe':>6} {f'Recall@{TOP_K}':>10} {'Réplica p50':>12} {'Réplica p95':>12} {'ADB p50':>10}")
+    for result in results:
+        logger.info(f"{result['nprobe']:>6} {result['recall']:>10.3f} {result['replica_ms_p50']:>9.2f} ms "
+                    f"{result['replica_ms_p95']:>9.2f} ms {result['adb_ms_p50']:>7.1f} ms")
+    logger.info(f"(nlist={replica.index.nlist}, {replica.index.alive_count} vectores)")
+    logger.info("=" * 60)
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -1,21 +1,1290 @@
 import oracledb
+import numpy as np
 import pandas as pd
 import array
-from typing import List, Dict, Any, Optional, Tuple
+import asyncio
+import functools
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Callable, Iterable, Iterator
 from contextlib import contextmanager
 import logging
 
+from class_cache import SearchResultCache
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def build_dsn(host: Optional[str] = None, port: Optional[int] = None,
+              service_name: Optional[str] = None, dsn: Optional[str] = None) -> str:
+    """Construir la cadena de conexión a partir de dsn o de host/port/service_name"""
+    if dsn:
+        return dsn
+    if host and port and service_name:
+        # Connection string simple que funciona sin wallet
+        return f'''(description= 
+            (retry_count=20)
+            (retry_delay=3)
+            (address=(protocol=tcps)(port={port})(host={host}))
+            (connect_data=(service_name={service_name})))'''
+    raise ValueError("Debe proporcionar 'dsn' o ('host', 'port', 'service_name').")
+
+
+VECTOR_FORMATS = {'FLOAT32': 'f', 'FLOAT64': 'd', 'INT8': 'b', 'BINARY': 'B'}
+# Métricas invariantes a la escala de cada vector (cuantización INT8 de embeddings float)
+INT8_FLOAT_METRICS = ('COSINE',)
+BINARY_DISTANCE_METRICS = ('HAMMING', 'JACCARD')
+
+
+def validate_vector_format(vector_format: str) -> str:
+    """Formato de almacenamiento de la columna VECTOR (FLOAT32, FLOAT64, INT8 o BINARY)"""
+    vector_format = vector_format.upper()
+    if vector_format not in VECTOR_FORMATS:
+        raise ValueError(f"vector_format debe ser uno de {sorted(VECTOR_FORMATS)}")
+    return vector_format
+
+
+def quantize_vector(vector, vector_format: str = 'FLOAT32',
+                    distance_metric: Optional[str] = None) -> array.array:
+    """
+    Convertir un embedding al array.array que espera una columna VECTOR(dim, formato)
+
+    - FLOAT32/FLOAT64: se enlaza tal cual ('f'/'d')
+    - INT8: los enteros (ej. embeddings int8 del servicio, con escala común a todo el
+      corpus) se enlazan tal cual; los float se escalan a [-127, 127] por su propio
+      máximo absoluto ('b'). Esa escala cambia de un vector a otro y solo conserva el
+      orden con COSINE: con otra distance_metric los float se rechazan
+    - BINARY: los enteros se toman como bits ya empaquetados (ej. ubinary); los
+      float se cuantizan por signo y se empaquetan 8 dimensiones por byte ('B')
+    """
+    vector_format = validate_vector_format(vector_format)
+    typecode = VECTOR_FORMATS[vector_format]
+    if isinstance(vector, array.array) and vector.typecode == typecode:
+        return vector
+
+    values = np.asarray(vector)
+    if vector_format == 'INT8':
+        if values.dtype.kind not in 'iu':
+            if distance_metric and distance_metric.upper() not in INT8_FLOAT_METRICS:
+                raise ValueError(f"Los vectores float cuantizados a INT8 (escala por vector) solo admiten "
+                                 f"{', '.join(INT8_FLOAT_METRICS)}, no {distance_metric.upper()}: use "
+                                 f"embeddings int8 del servicio (embedding_type='int8') o FLOAT32")
+            values = values.astype(np.float32)
+            scale = np.abs(values).max()
+            values = np.rint(values * (127.0 / scale)) if scale > 0 else np.zeros_like(values)
+        return array.array('b', np.clip(values, -128, 127).astype(np.int8).tobytes())
+
+    if vector_format == 'BINARY':
+        if values.dtype.kind in 'iu':
+            return array.array('B', values.astype(np.uint8).tobytes())
+        if values.size % 8:
+            raise ValueError("Los vectores BINARY requieren un número de dimensiones múltiplo de 8")
+        return array.array('B', np.packbits(values > 0).tobytes())
+
+    return array.array(typecode, values.astype(np.float32 if typecode == 'f' else np.float64).tobytes())
+
+
+def resolve_distance_metric(distance_metric: str, vector_format: str = 'FLOAT32') -> str:
+    """Métrica efectiva para el formato: los vectores BINARY solo admiten HAMMING o JACCARD"""
+    distance_metric = distance_metric.upper()
+    if validate_vector_format(vector_format) == 'BINARY' and distance_metric not in BINARY_DISTANCE_METRICS:
+        logger.warning(f"La métrica {distance_metric} no aplica a vectores BINARY; usando HAMMING")
+        return 'HAMMING'
+    return distance_metric
+
+
+def genai_insert_statement(doc: Dict[str, Any], table_name: str,
+                           vector_format: str = 'FLOAT32') -> Tuple[str, List[Any]]:
+    """Construir el INSERT GenAI (columnas opcionales solo si vienen informadas)"""
+    columns = ['docid', 'body', 'vector']
+    values = [doc['docid'], doc['body'][:4000], quantize_vector(doc['vector'], vector_format)]
+
+    for column in ('title', 'url', 'chunk_id', 'page_numbers', 'metadata'):
+        value = doc.get(column)
+        if value is None or (column != 'chunk_id' and not value):
+            continue
+        columns.append(column)
+        values.append(value)
+
+    placeholders = [f':{i}' for i in range(1, len(columns) + 1)]
+    query = f"""
+        INSERT INTO {table_name} ({', '.join(columns)})
+        VALUES ({', '.join(placeholders)})
+    """
+    return query, values
+
+
+GENAI_COLUMNS = ['docid', 'body', 'vector', 'title', 'url', 'chunk_id', 'page_numbers', 'metadata']
+
+
+def genai_bulk_insert_statement(table_name: str, with_hash: bool = False) -> str:
+    """INSERT GenAI fijo con todas las columnas (un solo texto SQL para executemany)"""
+    columns = UPSERT_COLUMNS if with_hash else GENAI_COLUMNS
+    placeholders = [f':{i}' for i in range(1, len(columns) + 1)]
+    return f"""
+        INSERT INTO {table_name} ({', '.join(columns)})
+        VALUES ({', '.join(placeholders)})
+    """
+
+
+def genai_bulk_input_sizes() -> List[Any]:
+    """Tipos declarados una sola vez para las columnas VECTOR/CLOB/JSON del INSERT fijo"""
+    return [None, oracledb.DB_TYPE_CLOB, oracledb.DB_TYPE_VECTOR,
+            None, None, None, None, oracledb.DB_TYPE_JSON]
+
+
+def genai_bulk_row(doc: Dict[str, Any], vector_format: str = 'FLOAT32') -> List[Any]:
+    """Fila para el INSERT fijo: los campos opcionales ausentes se enlazan como NULL"""
+    metadata = doc.get('metadata') or None
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+
+    return [
+        doc['docid'],
+        doc['body'][:4000],
+        quantize_vector(doc['vector'], vector_format),
+        doc.get('title') or None,
+        doc.get('url') or None,
+        doc.get('chunk_id'),
+        doc.get('page_numbers') or None,
+        metadata
+    ]
+
+
+def genai_bulk_rows(batch: List[Dict[str, Any]],
+                    vector_format: str = 'FLOAT32') -> Tuple[List[List[Any]], List[Dict[str, Any]]]:
+    """Preparar las filas de un batch; devuelve (filas, documentos enlazados en el mismo orden)"""
+    rows = []
+    bound_docs = []
+    for doc in batch:
+        try:
+            rows.append(genai_bulk_row(doc, vector_format))
+            bound_docs.append(doc)
+        except Exception as e:
+            logger.error(f"Error insertando documento {doc.get('docid', 'unknown')}: {e}")
+    return rows, bound_docs
+
+
+def log_batch_errors(batch_errors: List[Any], bound_docs: List[Dict[str, Any]]):
+    """Reportar por fila los errores devueltos por getbatcherrors()"""
+    for error in batch_errors:
+        docid = bound_docs[error.offset].get('docid', 'unknown')
+        logger.error(f"Error insertando documento {docid}: {error.message}")
+
+
+def log_rejected_batch(bound_docs: List[Dict[str, Any]], error: Exception):
+    """Reportar por fila un batch descartado entero (cargas sin batcherrors)"""
+    for doc in bound_docs:
+        logger.error(f"Error insertando documento {doc.get('docid', 'unknown')}: {error}")
+
+
+def like_prefix(prefix: str) -> str:
+    """Patrón LIKE (con ESCAPE '\\') que coincide con los textos que empiezan por prefix"""
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+UPSERT_COLUMNS = GENAI_COLUMNS + ['content_hash']
+
+
+def genai_content_hash(doc: Dict[str, Any], salt: str = '') -> str:
+    """
+    Hash SHA-256 de todo lo que se guarda de un chunk salvo el vector
+
+    salt identifica cómo se genera el vector (modelo y formato): si cambia, todos
+    los chunks se consideran modificados y se vuelven a vectorizar.
+    """
+    metadata = doc.get('metadata') or None
+    if isinstance(metadata, str):
+        metadata = json.loads(metadata)
+    payload = [doc['body'][:4000], doc.get('title') or None, doc.get('url') or None,
+               doc.get('chunk_id'), doc.get('page_numbers') or None, metadata, salt]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def genai_existing_hashes_statement(table_name: str) -> str:
+    """Filas ya guardadas de un prefijo de docid (un archivo fuente) con su hash (bind :prefix)"""
+    return f"""
+        SELECT id, docid, content_hash FROM {table_name}
+        WHERE docid LIKE :prefix ESCAPE '\\'
+        ORDER BY docid, id
+    """
+
+
+def genai_source_titles_statement(table_name: str) -> str:
+    """Archivos fuente (title) con filas guardadas en la tabla"""
+    return f"SELECT DISTINCT title FROM {table_name} WHERE title IS NOT NULL ORDER BY title"
+
+
+def check_source_docids(docid_prefix: str, documents: List[Dict[str, Any]]):
+    """Verificar que todos los chunks de un archivo fuente comparten el prefijo de docid"""
+    for doc in documents:
+        if not doc['docid'].startswith(docid_prefix):
+            raise ValueError(f"El docid {doc['docid']} no empieza por '{docid_prefix}'")
+
+
+def genai_source_diff(documents: List[Dict[str, Any]], rows: Iterable[tuple],
+                      salt: str = '') -> Dict[str, Any]:
+    """
+    Comparar los chunks actuales de un archivo con sus filas guardadas
+    (id, docid, content_hash) en el orden de genai_existing_hashes_statement
+    """
+    existing = {}
+    removed_ids = []
+    removed_docids = []
+    for row_id, docid, content_hash in rows:
+        if docid in existing:
+            removed_ids.append(row_id)
+            removed_docids.append(docid)
+        else:
+            existing[docid] = (row_id, content_hash)
+
+    current = {doc['docid'] for doc in documents}
+    for docid, (row_id, _) in existing.items():
+        if docid not in current:
+            removed_ids.append(row_id)
+            removed_docids.append(docid)
+
+    changed = []
+    unchanged = 0
+    for doc in documents:
+        content_hash = genai_content_hash(doc, salt)
+        stored = existing.get(doc['docid'])
+        if stored is not None and stored[1] == content_hash:
+            unchanged += 1
+        else:
+            changed.append((doc, content_hash, stored is not None))
+
+    return {'changed': changed, 'removed_ids': removed_ids,
+            'removed_docids': removed_docids, 'unchanged': unchanged}
+
+
+def genai_merge_statement(table_name: str) -> str:
+    """MERGE por docid con las columnas de UPSERT_COLUMNS (un solo texto SQL para executemany)"""
+    source = ', '.join(f':{i} as {column}' for i, column in enumerate(UPSERT_COLUMNS, 1))
+    updates = ', '.join(f't.{column} = s.{column}' for column in UPSERT_COLUMNS if column != 'docid')
+    return f"""
+        MERGE INTO {table_name} t
+        USING (SELECT {source} FROM dual) s
+        ON (t.docid = s.docid)
+        WHEN MATCHED THEN UPDATE SET {updates}, t.fecha_creacion = CURRENT_TIMESTAMP
+        WHEN NOT MATCHED THEN INSERT ({', '.join(UPSERT_COLUMNS)})
+            VALUES ({', '.join(f's.{column}' for column in UPSERT_COLUMNS)})
+    """
+
+
+def genai_merge_input_sizes() -> List[Any]:
+    """Tipos del MERGE: los del INSERT fijo más content_hash"""
+    return genai_bulk_input_sizes() + [None]
+
+
+def content_hash_column_ddl(table_name: str) -> str:
+    """Columna del hash de contenido para tablas creadas antes de la ingesta idempotente"""
+    return f"ALTER TABLE {table_name} ADD (content_hash VARCHAR2(64))"
+
+
+def docid_index_name(table_name: str) -> str:
+    """Índice sobre docid que usan el MERGE y la búsqueda de hashes por archivo"""
+    return f"idx_docid_{table_name}"
+
+
+def docid_index_ddl(table_name: str) -> str:
+    """DDL del índice sobre docid"""
+    return f"CREATE INDEX {docid_index_name(table_name)} ON {table_name}(docid)"
+
+
+LOB_FALLBACK_SUFFIX = '__lob'
+
+
+def lob_output_type_handler(cursor, metadata):
+    """
+    Output type handler que trae CLOB/BLOB en línea (str/bytes) en el fetch inicial,
+    evitando un round trip por cada LOB. Las columnas con sufijo '__lob' se dejan
+    como localizadores (ver inline_lob_projection). Los JSON nativos ya llegan como dict.
+    """
+    if metadata.name.lower().endswith(LOB_FALLBACK_SUFFIX):
+        return None
+    if metadata.type_code is oracledb.DB_TYPE_CLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG, arraysize=cursor.arraysize)
+    if metadata.type_code is oracledb.DB_TYPE_NCLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_NVARCHAR, arraysize=cursor.arraysize)
+    if metadata.type_code is oracledb.DB_TYPE_BLOB:
+        return cursor.var(oracledb.DB_TYPE_LONG_RAW, arraysize=cursor.arraysize)
+    return None
+
+
+VECTOR_NUMPY_DTYPES = {
+    'f': np.float32,
+    'd': np.float64,
+    'b': np.int8,
+    'B': np.uint8
+}
+
+
+def vector_to_numpy(value):
+    """Vista NumPy sin copia sobre el array.array devuelto por el driver"""
+    if value is None:
+        return None
+    return np.frombuffer(value, dtype=VECTOR_NUMPY_DTYPES[value.typecode])
+
+
+def numpy_vector_output_type_handler(cursor, metadata):
+    """Output type handler que materializa columnas VECTOR como arrays NumPy"""
+    if metadata.type_code is oracledb.DB_TYPE_VECTOR:
+        return cursor.var(metadata.type_code, arraysize=cursor.arraysize,
+                          outconverter=vector_to_numpy)
+    return None
+
+
+def stack_vectors(vectors, dim: Optional[int] = None, dtype=np.float32) -> np.ndarray:
+    """Apilar vectores en una matriz contigua (n, dim)"""
+    vectors = list(vectors)
+    if dim is None:
+        dim = len(vectors[0]) if vectors else 0
+    matrix = np.empty((len(vectors), dim), dtype=dtype)
+    for i, vector in enumerate(vectors):
+        matrix[i] = vector
+    return matrix
+
+
+def build_output_type_handler(inline_lobs: bool, vectors_as_numpy: bool) -> Optional[Callable]:
+    """Combinar los output type handlers habilitados (None si no hay ninguno)"""
+    handlers = []
+    if inline_lobs:
+        handlers.append(lob_output_type_handler)
+    if vectors_as_numpy:
+        handlers.append(numpy_vector_output_type_handler)
+    if not handlers:
+        return None
+
+    def output_type_handler(cursor, metadata):
+        for handler in handlers:
+            var = handler(cursor, metadata)
+            if var is not None:
+                return var
+        return None
+
+    return output_type_handler
+
+
+def inline_lob_projection(column: str, max_inline_size: Optional[int]) -> str:
+    """
+    Proyectar una columna LOB en línea hasta max_inline_size caracteres; los valores
+    mayores se devuelven en '<column>__lob' como localizador y se combinan después
+    con merge_lob_fallback_columns.
+    """
+    if not max_inline_size:
+        return column
+    return (f"CASE WHEN DBMS_LOB.GETLENGTH({column}) <= {int(max_inline_size)} THEN {column} END as {column}, "
+            f"CASE WHEN DBMS_LOB.GETLENGTH({column}) > {int(max_inline_size)} THEN {column} END "
+            f"as {column}{LOB_FALLBACK_SUFFIX}")
+
+
+def merge_lob_fallback_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Combinar las columnas '<column>__lob' en su columna original"""
+    for fallback in [c for c in df.columns if c.endswith(LOB_FALLBACK_SUFFIX)]:
+        column = fallback[:-len(LOB_FALLBACK_SUFFIX)]
+        if column in df.columns:
+            df[column] = df[column].where(df[column].notna(), df[fallback])
+        df = df.drop(columns=[fallback])
+    return df
+
+
+VALID_DISTANCE_METRICS = {'COSINE', 'DOT', 'EUCLIDEAN', 'EUCLIDEAN_SQUARED', 'L2_SQUARED',
+                          'MANHATTAN', 'HAMMING', 'JACCARD'}
+
+# Columnas filtrables con igualdad/IN/rango
+FILTERABLE_COLUMNS = ('docid', 'title', 'chunk_id', 'fecha_creacion')
+RANGE_OPERATORS = {'gt': '>', 'gte': '>=', 'lt': '<', 'lte': '<='}
+# Las listas IN se rellenan hasta estos tamaños para mantener pocas formas de SQL
+IN_LIST_BUCKETS = (1, 4, 16, 64, 256)
+JSON_PATH_PATTERN = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)*$')
+
+
+def validate_distance_metric(distance_metric: str) -> str:
+    """Validar la métrica de distancia contra la lista permitida"""
+    metric = distance_metric.upper()
+    if metric not in VALID_DISTANCE_METRICS:
+        raise ValueError(f"Métrica de distancia no soportada: {distance_metric}")
+    return metric
+
+
+def _compile_condition(expression: str, value: Any, name: str,
+                       binds: Dict[str, Any]) -> List[str]:
+    """Compilar igualdad, IN o rango sobre una expresión a condiciones con bind variables"""
+    if isinstance(value, dict):
+        conditions = []
+        for op in sorted(value):
+            operand = value[op]
+            if op not in RANGE_OPERATORS:
+                raise ValueError(f"Operador de rango no soportado: {op}")
+            bind = f"{name}_{op}"
+            binds[bind] = operand
+            conditions.append(f"{expression} {RANGE_OPERATORS[op]} :{bind}")
+        return conditions
+
+    if isinstance(value, (list, tuple, set)):
+        values = list(value)
+        if not values:
+            raise ValueError(f"Lista IN vacía para el filtro '{name}'")
+        size = next((b for b in IN_LIST_BUCKETS if b >= len(values)), len(values))
+        values += [values[-1]] * (size - len(values))
+        placeholders = []
+        for i, item in enumerate(values):
+            bind = f"{name}_{i}"
+            binds[bind] = item
+            placeholders.append(f":{bind}")
+        return [f"{expression} IN ({', '.join(placeholders)})"]
+
+    bind = f"{name}_eq"
+    binds[bind] = value
+    return [f"{expression} = :{bind}"]
+
+
+def compile_genai_filters(filters: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    """
+    Compilar un filtro estructurado a una cláusula WHERE con bind variables
+
+    Formato:
+        {
+            'title': 'a.md' | ['a.md', 'b.md'],
+            'docid': ['a.md_chunk_0', 'b.md_chunk_3'],
+            'docid_prefix': 'a.md_chunk_',
+            'id': [101, 102],
+            'chunk_id': 3 | [1, 2] | {'gte': 1, 'lte': 10},
+            'fecha_creacion': {'gte': datetime(2025, 1, 1)},
+            'metadata': {'source_file': 'a.md', 'chunk_index': {'lt': 5}}
+        }
+
+    Los valores siempre van como binds: la forma del SQL solo depende de las claves
+    usadas, los operadores y el tamaño (redondeado) de las listas IN.
+
+    Returns:
+        (cláusula sin 'WHERE', o '' si no hay filtros; diccionario de binds)
+    """
+    if not filters:
+        return "", {}
+
+    conditions = []
+    binds = {}
+
+    for key in sorted(filters):
+        value = filters[key]
+        if key in FILTERABLE_COLUMNS:
+            conditions += _compile_condition(key, value, f"f_{key}", binds)
+        elif key == 'docid_prefix':
+            binds['f_docid_prefix'] = like_prefix(value)
+            conditions.append("docid LIKE :f_docid_prefix ESCAPE '\\'")
+        elif key == 'id':
+            # Clave de la fila (única, a diferencia de docid): re-rank de índices en memoria
+            conditions += _compile_condition('id', value, 'f_id', binds)
+        elif key == 'metadata':
+            for i, path in enumerate(sorted(value)):
+                if not JSON_PATH_PATTERN.match(path):
+                    raise ValueError(f"Ruta JSON no válida en metadata: {path}")
+                expression = f"JSON_VALUE(metadata, '$.{path}')"
+                conditions += _compile_condition(expression, value[path], f"f_meta{i}", binds)
+        else:
+            raise ValueError(f"Filtro no soportado: {key}")
+
+    return " AND ".join(conditions), binds
+
+
+def fetch_first_clause(approximate: bool = False, target_accuracy: Optional[int] = None,
+                       rows_bind: str = 'top_k') -> str:
+    """Cláusula de top-k: exacta, o aproximada por índice vectorial con precisión objetivo opcional"""
+    if not approximate:
+        return f"FETCH FIRST :{rows_bind} ROWS ONLY"
+    if target_accuracy is None:
+        return f"FETCH APPROX FIRST :{rows_bind} ROWS ONLY"
+    return f"FETCH APPROX FIRST :{rows_bind} ROWS ONLY WITH TARGET ACCURACY :target_accuracy"
+
+
+def genai_search_statement(distance_metric: str, where_clause: Optional[str],
+                           table_name: str, max_inline_body: Optional[int] = None,
+                           approximate: bool = False,
+                           target_accuracy: Optional[int] = None) -> str:
+    """Construir la consulta de similitud vectorial GenAI (binds :query_vector y :top_k)"""
+    base_query = f"""
+        SELECT docid, {inline_lob_projection('body', max_inline_body)}, title, url, chunk_id,
+               page_numbers, metadata,
+               VECTOR_DISTANCE(vector, :query_vector, {validate_distance_metric(distance_metric)}) as distance
+        FROM {table_name}
+    """
+    fetch_clause = fetch_first_clause(approximate, target_accuracy)
+
+    if where_clause:
+        return f"{base_query} WHERE {where_clause} ORDER BY distance {fetch_clause}"
+    return f"{base_query} ORDER BY distance {fetch_clause}"
+
+
+def genai_search_params(query_vector: List[float], top_k: int,
+                        filter_conditions: Optional[str],
+                        filters: Optional[Dict[str, Any]],
+                        target_accuracy: Optional[int] = None,
+                        vector_format: str = 'FLOAT32',
+                        distance_metric: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Resolver la cláusula WHERE y los binds de una búsqueda GenAI (query cuantizada al
+    formato; distance_metric valida la cuantización INT8, ver quantize_vector)
+    """
+    if filter_conditions and filters:
+        raise ValueError("Use 'filters' o 'filter_conditions', no ambos")
+
+    if filter_conditions:
+        logger.warning("filter_conditions inserta texto libre en el SQL; prefiera 'filters'")
+        where_clause, binds = filter_conditions, {}
+    else:
+        where_clause, binds = compile_genai_filters(filters)
+
+    binds['query_vector'] = quantize_vector(query_vector, vector_format, distance_metric)
+    binds['top_k'] = top_k
+    if target_accuracy is not None:
+        if not 0 < target_accuracy <= 100:
+            raise ValueError("target_accuracy debe estar entre 1 y 100")
+        binds['target_accuracy'] = target_accuracy
+    return where_clause, binds
+
+
+GENAI_PROJECTION_COLUMNS = ('docid', 'body', 'title', 'url', 'chunk_id', 'page_numbers',
+                            'metadata', 'fecha_creacion')
+
+
+def genai_ids_search_statement(distance_metric: str, where_clause: Optional[str],
+                               table_name: str, approximate: bool = False,
+                               target_accuracy: Optional[int] = None) -> str:
+    """Fase 1 de la búsqueda en dos fases: solo id, docid y distancia"""
+    where = f"WHERE {where_clause}" if where_clause else ""
+    return f"""
+        SELECT id, docid,
+               VECTOR_DISTANCE(vector, :query_vector, {validate_distance_metric(distance_metric)}) as distance
+        FROM {table_name}
+        {where}
+        ORDER BY distance {fetch_first_clause(approximate, target_accuracy)}
+    """
+
+
+def genai_fetch_by_ids_statement(num_ids: int, table_name: str, columns: List[str],
+                                 body_preview_chars: Optional[int] = None) -> str:
+    """Fase 2: columnas proyectadas para un conjunto de ids (binds :id0..:idN-1)"""
+    projection = []
+    for column in columns:
+        if column not in GENAI_PROJECTION_COLUMNS:
+            raise ValueError(f"Columna no soportada: {column}")
+        if column == 'body' and body_preview_chars:
+            projection.append("DBMS_LOB.SUBSTR(body, :preview_chars, 1) as body")
+        else:
+            projection.append(column)
+
+    placeholders = ", ".join(f":id{i}" for i in range(num_ids))
+    return f"""
+        SELECT id, {', '.join(projection)}
+        FROM {table_name}
+        WHERE id IN ({placeholders})
+    """
+
+
+def genai_batch_search_statement(num_queries: int, distance_metric: str,
+                                 where_clause: Optional[str], table_name: str,
+                                 max_inline_body: Optional[int] = None,
+                                 approximate: bool = False,
+                                 target_accuracy: Optional[int] = None) -> str:
+    """
+    Top-k por consulta para N vectores en una sola sentencia (CROSS APPLY)
+
+    Los vectores van en binds :qv0..:qvN-1; usar un N redondeado (IN_LIST_BUCKETS)
+    mantiene pocas formas de SQL. Solo las :active_queries primeras filas de q
+    existen: las de relleno se descartan antes del CROSS APPLY y no ejecutan su top-k.
+    """
+    queries = " UNION ALL ".join(
+        f"SELECT {i} as query_index, :qv{i} as qv FROM dual WHERE {i} < :active_queries"
+        for i in range(num_queries)
+    )
+    where = f"WHERE {where_clause}" if where_clause else ""
+    return f"""
+        WITH q AS ({queries})
+        SELECT q.query_index, r.*
+        FROM q CROSS APPLY (
+            SELECT docid, {inline_lob_projection('body', max_inline_body)}, title, url, chunk_id,
+                   page_numbers, metadata,
+                   VECTOR_DISTANCE(vector, q.qv, {validate_distance_metric(distance_metric)}) as distance
+            FROM {table_name}
+            {where}
+            ORDER BY distance {fetch_first_clause(approximate, target_accuracy)}
+        ) r
+        ORDER BY q.query_index, r.distance
+    """
+
+
+def text_index_name(table_name: str) -> str:
+    """Nombre del índice Oracle Text sobre body"""
+    return f"idx_text_{table_name}"
+
+
+def text_index_ddl(table_name: str) -> str:
+    """DDL del índice Oracle Text sobre body, sincronizado en cada commit de la ingesta"""
+    return f"""
+CREATE INDEX {text_index_name(table_name)}
+ON {table_name}(body)
+INDEXTYPE IS CTXSYS.CONTEXT
+PARAMETERS ('SYNC (ON COMMIT)')
+"""
+
+
+MAX_TEXT_QUERY_TERMS = 32
+
+
+def keyword_text_query(text: str) -> Optional[str]:
+    """
+    Convertir texto libre en una consulta CONTAINS segura
+
+    Cada término se escapa con llaves (evita que '-', '?' o 'AND' se lean como
+    operadores); los identificadores compuestos como 'Bre-B' se buscan como frase
+    ('{bre} {b}') y los términos se combinan con ACCUM, que puntúa más alto a los
+    documentos que contienen más términos. None si no queda ningún término.
+    """
+    terms = []
+    for word in text.split():
+        parts = re.findall(r"\w+", word)
+        if parts:
+            terms.append(" ".join(f"{{{part}}}" for part in parts))
+    if not terms:
+        return None
+    return " ACCUM ".join(dict.fromkeys(terms[:MAX_TEXT_QUERY_TERMS]))
+
+
+def genai_hybrid_search_statement(distance_metric: str, where_clause: Optional[str],
+                                  table_name: str, max_inline_body: Optional[int] = None,
+                                  approximate: bool = False,
+                                  target_accuracy: Optional[int] = None) -> str:
+    """
+    Búsqueda híbrida (vectorial + Oracle Text) con fusión por reciprocal rank en una sentencia
+
+    Cada rama trae :candidates filas; la puntuación final es la suma de
+    1 / (:rrf_k + rango) en las ramas donde aparece el documento. Binds:
+    :query_vector, :text_query, :candidates, :rrf_k y :top_k.
+    """
+    metric = validate_distance_metric(distance_metric)
+    and_where = f"AND {where_clause}" if where_clause else ""
+    where = f"WHERE {where_clause}" if where_clause else ""
+    return f"""
+        WITH vec AS (
+            SELECT id, VECTOR_DISTANCE(vector, :query_vector, {metric}) as distance
+            FROM {table_name}
+            {where}
+            ORDER BY distance {fetch_first_clause(approximate, target_accuracy, 'candidates')}
+        ),
+        vec_ranked AS (
+            SELECT id, ROW_NUMBER() OVER (ORDER BY distance) as vector_rank FROM vec
+        ),
+        txt AS (
+            SELECT id, SCORE(1) as text_score
+            FROM {table_name}
+            WHERE CONTAINS(body, :text_query, 1) > 0 {and_where}
+            ORDER BY SCORE(1) DESC FETCH FIRST :candidates ROWS ONLY
+        ),
+        txt_ranked AS (
+            SELECT id, text_score, ROW_NUMBER() OVER (ORDER BY text_score DESC, id) as text_rank FROM txt
+        ),
+        fused AS (
+            SELECT NVL(v.id, x.id) as fused_id, v.vector_rank, x.text_rank, x.text_score,
+                   NVL(1 / (:rrf_k + v.vector_rank), 0) + NVL(1 / (:rrf_k + x.text_rank), 0) as rrf_score
+            FROM vec_ranked v FULL OUTER JOIN txt_ranked x ON v.id = x.id
+        )
+        SELECT docid, {inline_lob_projection('body', max_inline_body)}, title, url, chunk_id,
+               page_numbers, metadata,
+               VECTOR_DISTANCE(vector, :query_vector, {metric}) as distance,
+               f.vector_rank, f.text_rank, f.text_score, f.rrf_score
+        FROM fused f JOIN {table_name} d ON d.id = f.fused_id
+        ORDER BY f.rrf_score DESC, distance
+        FETCH FIRST :top_k ROWS ONLY
+    """
+
+
+VECTOR_DIM_BYTES = {'FLOAT32': 4, 'FLOAT64': 8, 'INT8': 1, 'BINARY': 0.125}
+
+
+def vector_index_name(table_name: str) -> str:
+    """Nombre del índice vectorial de una tabla"""
+    return f"idx_vector_{table_name}"
+
+
+def vector_index_ddl(table_name: str, index_type: str = 'HNSW', distance_metric: str = 'COSINE',
+                     target_accuracy: int = 95, neighbor_partitions: Optional[int] = None,
+                     parallel: Optional[int] = None) -> str:
+    """
+    DDL del índice vectorial
+
+    Args:
+        index_type: 'HNSW' (INMEMORY NEIGHBOR GRAPH, debe caber en el vector memory pool)
+                    o 'IVF' (NEIGHBOR PARTITIONS, en disco)
+        neighbor_partitions: Particiones del IVF (por defecto las calcula Oracle)
+    """
+    index_type = index_type.upper()
+    if index_type == 'HNSW':
+        organization = "INMEMORY NEIGHBOR GRAPH"
+        parameters = ""
+    elif index_type == 'IVF':
+        organization = "NEIGHBOR PARTITIONS"
+        parameters = f"\nPARAMETERS (TYPE IVF, NEIGHBOR PARTITIONS {int(neighbor_partitions)})" \
+            if neighbor_partitions else ""
+    else:
+        raise ValueError("index_type debe ser 'HNSW' o 'IVF'")
+
+    parallel_clause = f"\nPARALLEL {int(parallel)}" if parallel else ""
+    return f"""
+CREATE VECTOR INDEX {vector_index_name(table_name)}
+ON {table_name}(vector)
+ORGANIZATION {organization}
+DISTANCE {validate_distance_metric(distance_metric)}
+WITH TARGET ACCURACY {int(target_accuracy)}{parameters}{parallel_clause}
+"""
+
+
+def estimate_hnsw_memory(num_vectors: int, dimensions: int, dim_type: str = 'FLOAT32') -> int:
+    """Estimación de memoria HNSW según la guía de Oracle: 1.3 * vectores * dimensiones * bytes"""
+    return int(1.3 * num_vectors * dimensions * VECTOR_DIM_BYTES[dim_type.upper()])
+
+
+MEMORY_UNITS = {'B': 1, 'BYTES': 1, 'K': 1024, 'KB': 1024, 'M': 1024 ** 2, 'MB': 1024 ** 2,
+                'G': 1024 ** 3, 'GB': 1024 ** 3, 'T': 1024 ** 4, 'TB': 1024 ** 4}
+MEMORY_SIZE_PATTERN = re.compile(r'([\d.]+)\s*([A-Za-z]*)')
+
+
+def parse_memory_size(value: Any) -> Optional[int]:
+    """Bytes de un tamaño numérico (bytes) o con unidad ('1047.98 MB', '2G'); None si no se reconoce"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str):
+        return None
+    match = MEMORY_SIZE_PATTERN.search(value)
+    if match is None:
+        return None
+    unit = MEMORY_UNITS.get(match.group(2).upper() or 'B')
+    return int(float(match.group(1)) * unit) if unit else None
+
+
+def advisor_memory_bytes(response: Any) -> Optional[int]:
+    """
+    Memoria sugerida (bytes) en la respuesta JSON de INDEX_VECTOR_MEMORY_ADVISOR
+
+    Busca, en cualquier nivel, una clave que mencione la memoria ('Suggested vector
+    memory size', 'vector_memory_size', ...); prefiere las que dicen 'suggest' y,
+    entre ellas, la mayor.
+    """
+    candidates = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                name = re.sub(r'[^a-z]', '', str(key).lower())
+                if 'memory' in name and not isinstance(value, (dict, list)):
+                    size = parse_memory_size(value)
+                    if size is not None:
+                        candidates.append(('suggest' in name, size))
+                walk(value)
+        elif isinstance(node, list):
+            for item in node:
+                walk(item)
+
+    walk(response)
+    return max(candidates)[1] if candidates else None
+
+
+def genai_stats_statement(table_name: str) -> str:
+    """Estadísticas GenAI en una sola pasada sobre la tabla"""
+    return f"""
+        SELECT
+            COUNT(*) as total_docs,
+            COUNT(DISTINCT REGEXP_SUBSTR(docid, '^[^_]+')) as unique_docs,
+            COUNT(chunk_id) as chunked_docs,
+            AVG(DBMS_LOB.GETLENGTH(body)) as avg_length,
+            MAX(DBMS_LOB.GETLENGTH(body)) as max_length,
+            MIN(DBMS_LOB.GETLENGTH(body)) as min_length
+        FROM {table_name}
+    """
+
+
+STATS_TABLE_SUFFIX = '_stats'
+# Clave de la tabla lateral para los docids sin archivo fuente (source_file_of nunca devuelve '_')
+NULL_SOURCE_FILE = '_'
+STATS_TABLE_EXISTS_QUERY = "SELECT COUNT(*) FROM user_tables WHERE table_name = UPPER(:1)"
+INDEX_EXISTS_QUERY = "SELECT COUNT(*) FROM user_indexes WHERE index_name = UPPER(:1)"
+
+
+def genai_stats_table_name(table_name: str) -> str:
+    """Tabla lateral de contadores por archivo fuente"""
+    return f"{table_name}{STATS_TABLE_SUFFIX}"
+
+
+# Sentencias que cambian filas de una tabla (INSERT/UPDATE/DELETE/MERGE, TRUNCATE y DROP TABLE)
+DML_TARGET_PATTERN = re.compile(
+    r'^\s*(INSERT|UPDATE|DELETE|MERGE|TRUNCATE\s+TABLE|DROP\s+TABLE)\s+(?:/\*.*?\*/\s*)?'
+    r'(?:(?:ALL\s+)?INTO\s+|FROM\s+)?(?:"?[\w$#]+"?\.)?"?([\w$#]+)"?',
+    re.IGNORECASE | re.DOTALL)
+
+
+def dml_target_table(statement: str) -> Optional[Tuple[str, str]]:
+    """(verbo, tabla en minúsculas y sin esquema) de una sentencia que modifica filas, o None"""
+    match = DML_TARGET_PATTERN.match(statement)
+    if match is None:
+        return None
+    return match.group(1).split()[0].upper(), match.group(2).lower()
+
+
+def genai_stats_side_operations(table_name: str) -> List[Tuple[str, str, Any]]:
+    """Operaciones de pipeline: existencia de la tabla lateral y su resumen (un round trip)"""
+    return [('fetchone', STATS_TABLE_EXISTS_QUERY, [genai_stats_table_name(table_name)]),
+            ('fetchone', genai_stats_summary_statement(table_name), None)]
+
+
+class GenAIStatsState:
+    """
+    Estado en el cliente de get_genai_stats, compartido por las variantes síncrona y
+    asíncrona (tablas en minúsculas); es local a cada instancia
+
+    - results: último resultado por tabla, reutilizado durante ttl segundos
+    - tables: existencia de la tabla lateral; un positivo se recuerda y un negativo
+      se vuelve a comprobar tras ttl segundos, para usar una tabla creada después
+    - stale: tablas con filas modificadas fuera de la ingesta (execute_dml), que no
+      pasan por los contadores: hasta rebuild_genai_stats se hace la pasada completa
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self.results = {}
+        self.tables = {}
+        self.stale = set()
+
+    def cached(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """Último resultado si tiene menos de ttl segundos"""
+        cached = self.results.get(table_name.lower())
+        if cached and time.monotonic() - cached[0] < self.ttl:
+            return dict(cached[1])
+        return None
+
+    def store(self, table_name: str, stats: Dict[str, Any]) -> Dict[str, Any]:
+        self.results[table_name.lower()] = (time.monotonic(), stats)
+        return dict(stats)
+
+    def forget(self, table_name: str):
+        """Descartar el último resultado (los contadores acaban de cambiar)"""
+        self.results.pop(table_name.lower(), None)
+
+    def side_table(self, table_name: str) -> Optional[bool]:
+        """Existencia conocida de la tabla lateral, o None si hay que comprobarla"""
+        cached = self.tables.get(table_name.lower())
+        if cached is not None and (cached[0] or time.monotonic() - cached[1] < self.ttl):
+            return cached[0]
+        return None
+
+    def set_side_table(self, table_name: str, exists: bool):
+        self.tables[table_name.lower()] = (exists, time.monotonic())
+
+    def use_side_table(self, table_name: str, fresh: bool) -> bool:
+        """Indicar si get_genai_stats debe intentar la tabla lateral"""
+        return not fresh and table_name.lower() not in self.stale and self.side_table(table_name) is not False
+
+    def side_table_row(self, table_name: str, exists: Any, summary: Any) -> Optional[tuple]:
+        """
+        Fila de resumen a partir de los resultados de genai_stats_side_operations
+        (None si no hay tabla lateral); los errores se relanzan
+        """
+        if isinstance(exists, Exception):
+            raise exists
+        self.set_side_table(table_name, exists[0] > 0)
+        if exists[0] == 0:
+            return None
+        if isinstance(summary, Exception):
+            raise summary
+        return summary
+
+    def mark_rebuilt(self, table_name: str):
+        """La tabla lateral vuelve a reflejar la tabla (create/rebuild_genai_stats)"""
+        self.forget(table_name)
+        self.stale.discard(table_name.lower())
+
+    def after_dml(self, statement: str) -> Optional[Tuple[str, str]]:
+        """
+        Invalidar el estado tras una sentencia de execute_dml
+
+        Returns:
+            (verbo, tabla) de dml_target_table si modifica una tabla GenAI (no la
+            lateral), o None
+        """
+        target = dml_target_table(statement)
+        if target is None:
+            return None
+        verb, table = target
+
+        if table.endswith(STATS_TABLE_SUFFIX):
+            # DML sobre la propia tabla lateral
+            base = table[:-len(STATS_TABLE_SUFFIX)]
+            self.results.pop(base, None)
+            if verb == 'DROP':
+                self.tables.pop(base, None)
+            return None
+
+        self.results.pop(table, None)
+        if verb == 'DROP':
+            self.tables.pop(table, None)
+        if table not in self.stale:
+            self.stale.add(table)
+            logger.info(f"Filas de '{table}' modificadas fuera de la ingesta: get_genai_stats hará "
+                        f"la pasada completa hasta rebuild_genai_stats")
+        return target
+
+
+def genai_stats_table_ddl(table_name: str) -> str:
+    """DDL de la tabla lateral de contadores por archivo fuente"""
+    return f"""
+        CREATE TABLE {genai_stats_table_name(table_name)}
+        (
+            source_file     VARCHAR2(500) PRIMARY KEY,
+            chunk_count     NUMBER DEFAULT 0 NOT NULL,
+            chunked_count   NUMBER DEFAULT 0 NOT NULL,
+            body_length_sum NUMBER DEFAULT 0 NOT NULL,
+            body_length_max NUMBER,
+            body_length_min NUMBER,
+            updated_at      TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """
+
+
+def genai_stats_summary_statement(table_name: str) -> str:
+    """Estadísticas agregadas a partir de la tabla lateral (sin recorrer la tabla GenAI)"""
+    return f"""
+        SELECT
+            SUM(chunk_count) as total_docs,
+            COUNT(CASE WHEN chunk_count > 0 AND source_file <> '{NULL_SOURCE_FILE}' THEN 1 END) as unique_docs,
+            SUM(chunked_count) as chunked_docs,
+            SUM(body_length_sum) / NULLIF(SUM(chunk_count), 0) as avg_length,
+            MAX(body_length_max) as max_length,
+            MIN(body_length_min) as min_length
+        FROM {genai_stats_table_name(table_name)}
+    """
+
+
+def genai_stats_merge_statement(table_name: str) -> str:
+    """MERGE que acumula los contadores de un archivo fuente"""
+    return f"""
+        MERGE INTO {genai_stats_table_name(table_name)} s
+        USING (SELECT :source_file as source_file, :chunks as chunks, :chunked as chunked,
+                      :length_sum as length_sum, :length_max as length_max,
+                      :length_min as length_min FROM dual) d
+        ON (s.source_file = d.source_file)
+        WHEN MATCHED THEN UPDATE SET
+            s.chunk_count = s.chunk_count + d.chunks,
+            s.chunked_count = s.chunked_count + d.chunked,
+            s.body_length_sum = s.body_length_sum + d.length_sum,
+            s.body_length_max = GREATEST(NVL(s.body_length_max, d.length_max), d.length_max),
+            s.body_length_min = LEAST(NVL(s.body_length_min, d.length_min), d.length_min),
+            s.updated_at = CURRENT_TIMESTAMP
+        WHEN NOT MATCHED THEN INSERT
+            (source_file, chunk_count, chunked_count, body_length_sum, body_length_max, body_length_min)
+            VALUES (d.source_file, d.chunks, d.chunked, d.length_sum, d.length_max, d.length_min)
+    """
+
+
+def genai_stats_rebuild_statement(table_name: str) -> str:
+    """
+    Recalcular la tabla lateral completa en una pasada (GROUP BY archivo fuente)
+
+    Las filas sin archivo fuente se cuentan bajo NULL_SOURCE_FILE para que los
+    totales coincidan con la pasada completa.
+    """
+    source = f"NVL(REGEXP_SUBSTR(docid, '^[^_]+'), '{NULL_SOURCE_FILE}')"
+    return f"""
+        INSERT INTO {genai_stats_table_name(table_name)}
+            (source_file, chunk_count, chunked_count, body_length_sum, body_length_max, body_length_min)
+        SELECT {source}, COUNT(*), COUNT(chunk_id),
+               NVL(SUM(DBMS_LOB.GETLENGTH(body)), 0),
+               MAX(DBMS_LOB.GETLENGTH(body)), MIN(DBMS_LOB.GETLENGTH(body))
+        FROM {table_name}
+        GROUP BY {source}
+    """
+
+
+def genai_stats_refresh_statement(table_name: str, null_source: bool = False) -> str:
+    """
+    Recalcular desde la tabla base los contadores de un archivo fuente (bind :source_file)
+
+    Se usa tras actualizar o borrar chunks, donde los contadores acumulados no
+    pueden restarse (máximo y mínimo). Usa el índice sobre docid; el archivo queda
+    fuera de la tabla lateral si ya no tiene chunks. Con null_source se recalcula
+    NULL_SOURCE_FILE, lo que recorre la tabla.
+    """
+    if null_source:
+        where = "REGEXP_SUBSTR(docid, '^[^_]+') IS NULL"
+    else:
+        where = "docid = :source_file OR docid LIKE :source_prefix ESCAPE '\\'"
+    return f"""
+        MERGE INTO {genai_stats_table_name(table_name)} s
+        USING (SELECT :source_file as source_file, COUNT(*) as chunks, COUNT(chunk_id) as chunked,
+                      NVL(SUM(DBMS_LOB.GETLENGTH(body)), 0) as length_sum,
+                      MAX(DBMS_LOB.GETLENGTH(body)) as length_max,
+                      MIN(DBMS_LOB.GETLENGTH(body)) as length_min
+               FROM {table_name}
+               WHERE {where}) d
+        ON (s.source_file = d.source_file)
+        WHEN MATCHED THEN UPDATE SET
+            s.chunk_count = d.chunks,
+            s.chunked_count = d.chunked,
+            s.body_length_sum = d.length_sum,
+            s.body_length_max = d.length_max,
+            s.body_length_min = d.length_min,
+            s.updated_at = CURRENT_TIMESTAMP
+            DELETE WHERE s.chunk_count = 0
+        WHEN NOT MATCHED THEN INSERT
+            (source_file, chunk_count, chunked_count, body_length_sum, body_length_max, body_length_min)
+            VALUES (d.source_file, d.chunks, d.chunked, d.length_sum, d.length_max, d.length_min)
+            WHERE d.chunks > 0
+    """
+
+
+def source_file_of(docid: str) -> Optional[str]:
+    """Archivo fuente de un docid (misma regla que REGEXP_SUBSTR(docid, '^[^_]+'))"""
+    return docid.split('_', 1)[0] or None
+
+
+def genai_stats_source(docid: Optional[str]) -> str:
+    """Clave de la tabla lateral de un docid: su archivo fuente, o NULL_SOURCE_FILE"""
+    return source_file_of(docid or '') or NULL_SOURCE_FILE
+
+
+def genai_stats_refresh_binds(docids: List[Optional[str]]) -> List[Dict[str, str]]:
+    """Binds de genai_stats_refresh_statement por archivo fuente tocado (ordenados)"""
+    sources = sorted({genai_stats_source(docid) for docid in docids})
+    return [{'source_file': source} if source == NULL_SOURCE_FILE
+            else {'source_file': source, 'source_prefix': like_prefix(source + '_')}
+            for source in sources]
+
+
+def genai_stats_retry_rows(batch_errors: List[Any], rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Filas del MERGE de la tabla lateral a repetir tras un executemany con batcherrors
+
+    Dos ingestas que insertan a la vez el mismo archivo fuente nuevo chocan con la
+    clave primaria (ORA-00001): repetido, el MERGE ya encuentra la fila y actualiza.
+    Cualquier otro error se relanza.
+    """
+    retry = []
+    for error in batch_errors:
+        if error.code != 1:
+            raise oracledb.DatabaseError(error)
+        retry.append(rows[error.offset])
+    return retry
+
+
+def genai_stats_deltas(documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Agrupar por archivo fuente (o NULL_SOURCE_FILE) los contadores de los documentos insertados"""
+    deltas = {}
+    for doc in documents:
+        source_file = genai_stats_source(doc['docid'])
+        length = len(doc['body'][:4000])
+        delta = deltas.setdefault(source_file, {
+            'source_file': source_file, 'chunks': 0, 'chunked': 0,
+            'length_sum': 0, 'length_max': length, 'length_min': length
+        })
+        delta['chunks'] += 1
+        delta['chunked'] += 1 if doc.get('chunk_id') is not None else 0
+        delta['length_sum'] += length
+        delta['length_max'] = max(delta['length_max'], length)
+        delta['length_min'] = min(delta['length_min'], length)
+    return list(deltas.values())
+
+
+def genai_stats_from_row(row: tuple) -> Dict[str, Any]:
+    """Armar el diccionario de estadísticas GenAI"""
+    return {
+        'total_documents': int(row[0]) if row[0] else 0,
+        'unique_source_documents': row[1] if row[1] else 0,
+        'chunked_documents': row[2] if row[2] else 0,
+        'body_avg_length': float(row[3]) if row[3] else 0,
+        'body_max_length': row[4] if row[4] else 0,
+        'body_min_length': row[5] if row[5] else 0
+    }
+
+
+PIPELINE_OPERATIONS = ('execute', 'fetchone', 'fetchall', 'commit')
+
+
+SNAPSHOT_MANIFEST = 'manifest.json'
+SNAPSHOT_COLUMNS_FILE = 'columns.parquet'
+SNAPSHOT_COLUMNS = ['docid', 'body', 'title', 'url', 'chunk_id', 'page_numbers', 'metadata', 'content_hash']
+SNAPSHOT_VECTOR_FILES = {'BINARY': ('vectors.u8', np.uint8)}
+SNAPSHOT_DEFAULT_VECTOR_FILE = ('vectors.f32', np.float32)
+NUMPY_VECTOR_FORMATS = {'float32': 'FLOAT32', 'float64': 'FLOAT64', 'int8': 'INT8', 'uint8': 'BINARY'}
+
+
+def import_pyarrow():
+    """pyarrow y pyarrow.parquet (dependencia opcional de los snapshots)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Los snapshots requieren pyarrow: pip install pyarrow") from e
+    return pyarrow, pyarrow.parquet
+
+
+def snapshot_schema():
+    """Esquema Arrow de las columnas no vectoriales de un snapshot (metadata como texto JSON)"""
+    pyarrow, _ = import_pyarrow()
+    return pyarrow.schema([
+        ('docid', pyarrow.string()),
+        ('body', pyarrow.large_string()),
+        ('title', pyarrow.string()),
+        ('url', pyarrow.string()),
+        ('chunk_id', pyarrow.int64()),
+        ('page_numbers', pyarrow.string()),
+        ('metadata', pyarrow.string()),
+        ('content_hash', pyarrow.string())
+    ])
+
+
+def snapshot_vector_file(vector_format: str) -> Tuple[str, Any]:
+    """Archivo y dtype del bloque de vectores: float32 (INT8 incluido, sin pérdida) o bits BINARY"""
+    return SNAPSHOT_VECTOR_FILES.get(vector_format, SNAPSHOT_DEFAULT_VECTOR_FILE)
+
+
+def normalize_pipeline_operations(operations: List[Any]) -> List[Tuple[str, Optional[str], Any]]:
+    """
+    Normalizar operaciones de pipeline a tuplas (tipo, sql, params)
+
+    Formatos aceptados: 'commit', ('fetchall', sql), ('fetchone', sql, params),
+    ('execute', sql, params)
+    """
+    normalized = []
+    for op in operations:
+        if isinstance(op, str):
+            op = (op,)
+        kind = op[0]
+        if kind not in PIPELINE_OPERATIONS:
+            raise ValueError(f"Operación de pipeline no soportada: {kind}")
+        sql = op[1] if len(op) > 1 else None
+        params = op[2] if len(op) > 2 else None
+        if kind != 'commit' and not sql:
+            raise ValueError(f"La operación '{kind}' requiere una sentencia SQL")
+        normalized.append((kind, sql, params))
+    return normalized
+
+
+def build_pipeline(operations: List[Tuple[str, Optional[str], Any]]):
+    """Construir un oracledb.Pipeline a partir de operaciones normalizadas"""
+    pipeline = oracledb.create_pipeline()
+    for kind, sql, params in operations:
+        if kind == 'commit':
+            pipeline.add_commit()
+        elif kind == 'execute':
+            pipeline.add_execute(sql, params)
+        elif kind == 'fetchone':
+            pipeline.add_fetchone(sql, params)
+        else:
+            pipeline.add_fetchall(sql, params)
+    return pipeline
+
+
+def pipeline_result_value(kind: str, result) -> Any:
+    """Valor de un resultado de pipeline con el mismo formato que la ejecución secuencial"""
+    if result.error is not None:
+        return oracledb.DatabaseError(result.error)
+    if kind == 'fetchall':
+        return result.rows
+    if kind == 'fetchone':
+        return result.rows[0] if result.rows else None
+    return None
+
+
+def supports_pipelining() -> bool:
+    """Indicar si el driver instalado tiene la API de pipelining (python-oracledb >= 2.4)"""
+    return hasattr(oracledb, 'create_pipeline')
+
+
+DEFAULT_WORKLOAD = 'default'
+WORKLOADS = (DEFAULT_WORKLOAD, 'search', 'ingest')
+
+
+def build_workload_dsns(host: Optional[str] = None, port: Optional[int] = None,
+                        service_name: Optional[str] = None, dsn: Optional[str] = None,
+                        workload_services: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """
+    DSN por clase de carga: el por defecto más uno por servicio de workload_services
+
+    Con host/port cada servicio es un service_name; sin ellos, un dsn o alias TNS.
+    """
+    dsns = {DEFAULT_WORKLOAD: build_dsn(host, port, service_name, dsn)}
+    for workload, service in (workload_services or {}).items():
+        if host and port:
+            dsns[workload] = build_dsn(host, port, service)
+        else:
+            dsns[workload] = build_dsn(dsn=service)
+    return dsns
+
+
+def resolve_workload(workload: Optional[str], workload_dsns: Dict[str, str]) -> str:
+    """
+    Clase de carga efectiva: la pedida si tiene servicio propio, o la por defecto
+
+    Un nombre que no es una clase conocida (WORKLOADS) ni tiene servicio configurado
+    es un error: caer en silencio al servicio por defecto ocultaría la errata.
+    """
+    if workload in workload_dsns:
+        return workload
+    if workload is not None and workload not in WORKLOADS:
+        raise ValueError(f"Clase de carga desconocida: '{workload}' (use {', '.join(WORKLOADS)} "
+                         f"o una de workload_services)")
+    return DEFAULT_WORKLOAD
+
+
+def workload_route(workload: str):
+    """
+    Enrutar un método a una clase de carga (pool/servicio ADB)
+
+    El método acepta además workload=... para forzar otra clase en esa llamada.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            override = kwargs.pop('workload', None)
+            with self._routed(workload):
+                if override:
+                    with self.use_workload(override):
+                        return method(self, *args, **kwargs)
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
 class OracleADBConnection:
     """Clase para manejar conexiones a Oracle Autonomous Database"""
     
     def __init__(self, user: str, password: str, 
                  host: Optional[str] = None, port: Optional[int] = None, 
-                 service_name: Optional[str] = None, dsn: Optional[str] = None):
+                 service_name: Optional[str] = None, dsn: Optional[str] = None,
+                 pool_enabled: bool = False, pool_min: int = 1, pool_max: int = 4,
+                 pool_increment: int = 1, pool_ping_interval: int = 60,
+                 pool_timeout: int = 5000,
+                 session_callback: Optional[Callable] = None,
+                 fetch_lobs_inline: bool = True,
+                 lob_inline_max_size: Optional[int] = 1048576,
+                 vectors_as_numpy: bool = False,
+                 stmtcachesize: int = 50,
+                 stats_ttl: float = 60.0,
+                 workload_services: Optional[Dict[str, str]] = None,
+                 search_cache_enabled: bool = False,
+                 search_cache_max_entries: int = 1024,
+                 search_cache_max_bytes: int = 64 * 1024 * 1024,
+                 search_cache_ttl: Optional[float] = 300.0,
+                 vector_format: str = 'FLOAT32',
+                 pipeline_pool_max: int = 2):
         """
         Inicializar conexión a Oracle ADB
         
@@ -26,24 +1295,83 @@ class OracleADBConnection:
             port: Puerto (normalmente 1522)
             service_name: Nombre del servicio (ej: g1cde62092a80c9_vectorjg_low.adb.oraclecloud.com)
             dsn: Cadena de conexión completa (si se proporciona, host/port/service_name son ignorados)
+            pool_enabled: Usar un pool de sesiones (oracledb.create_pool) en lugar de
+                          abrir una conexión TLS nueva en cada llamada
+            pool_min: Sesiones mínimas abiertas en el pool
+            pool_max: Sesiones máximas del pool
+            pool_increment: Sesiones que se abren cada vez que el pool crece
+            pool_ping_interval: Segundos de inactividad tras los que se verifica la sesión al adquirirla
+            pool_timeout: Milisegundos máximos de espera para adquirir una sesión
+            session_callback: Función llamada al crear cada sesión nueva del pool
+                              (ej: ALTER SESSION); recibe (connection, requested_tag).
+                              Con un callback, execute_pipeline ejecuta en secuencia sobre
+                              el pool síncrono (la sesión asyncio no puede ejecutarlo)
+            fetch_lobs_inline: Traer CLOB/BLOB como str/bytes en el fetch inicial
+                               (execute_query_df, iter_query_df y búsquedas)
+            lob_inline_max_size: Tamaño máximo (caracteres) de un body traído en línea en
+                                 las búsquedas; los mayores se leen por localizador
+            vectors_as_numpy: Devolver las columnas VECTOR como arrays NumPy (float32 para
+                              VECTOR(..., FLOAT32)) en lugar de array.array
+            stmtcachesize: Sentencias cacheadas por sesión (reutiliza los cursores ya parseados)
+            stats_ttl: Segundos que get_genai_stats reutiliza el último resultado
+            workload_services: Servicio ADB por clase de carga, ej. {'search': '..._tp',
+                               'ingest': '..._high'}. Con host/port cada valor es un
+                               service_name; sin ellos, un dsn o alias TNS. Las clases sin
+                               servicio propio usan el servicio por defecto.
+            search_cache_enabled: Cachear en el cliente los resultados de
+                                  vector_similarity_search_genai y vector_search_ids
+            search_cache_max_entries: Resultados máximos en la caché (LRU)
+            search_cache_max_bytes: Memoria máxima de la caché en bytes
+            search_cache_ttl: Segundos de vida de cada resultado cacheado
+            vector_format: Formato de la columna VECTOR (FLOAT32, INT8 o BINARY); los
+                           vectores insertados y las consultas se cuantizan a este formato
+            pipeline_pool_max: Sesiones del único pool asyncio de execute_pipeline
+                               (servicio por defecto), compartido por todas las cargas
         """
         self.user = user
         self.password = password
         
-        if dsn:
-            self.dsn = dsn
-        elif host and port and service_name:
-            # Connection string simple que funciona sin wallet
-            self.dsn = f'''(description= 
-                (retry_count=20)
-                (retry_delay=3)
-                (address=(protocol=tcps)(port={port})(host={host}))
-                (connect_data=(service_name={service_name})))'''
-        else:
-            raise ValueError("Debe proporcionar 'dsn' o ('host', 'port', 'service_name').")
+        self.dsn = build_dsn(host, port, service_name, dsn)
         
         self.connection = None
 
+        self.pool_enabled = pool_enabled
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.pool_increment = pool_increment
+        self.pool_ping_interval = pool_ping_interval
+        self.pool_timeout = pool_timeout
+        self.session_callback = session_callback
+        self.pool = None
+
+        # Enrutamiento por clase de carga: un DSN (y un pool) por servicio ADB
+        self.workload_dsns = build_workload_dsns(host, port, service_name, dsn, workload_services)
+        self.pools = {}
+        self._pool_lock = threading.Lock()
+        # Un solo pool asyncio para los pipelines, en un event loop propio (hilo daemon)
+        self.pipeline_pool_max = pipeline_pool_max
+        self.pipeline_pool = None
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._pool_metrics = {}
+        self._local = threading.local()
+
+        self.fetch_lobs_inline = fetch_lobs_inline
+        self.lob_inline_max_size = lob_inline_max_size if fetch_lobs_inline else None
+        self.vectors_as_numpy = vectors_as_numpy
+        self.stmtcachesize = stmtcachesize
+
+        self.stats_ttl = stats_ttl
+        self._stats = GenAIStatsState(stats_ttl)
+        self._text_indexes = {}
+
+        self.search_cache = None
+        if search_cache_enabled:
+            self.search_cache = SearchResultCache(search_cache_max_entries, search_cache_max_bytes,
+                                                  search_cache_ttl)
+
+        self.vector_format = validate_vector_format(vector_format)
+
     def connect(self):
         """Establecer conexión a la base de datos"""
         try:
@@ -65,28 +1393,352 @@ class OracleADBConnection:
             logger.info("✓ Conexión cerrada")
             self.connection = None
 
+    # ==================== POOL DE SESIONES ====================
+
+    def _resolve_workload(self, workload: Optional[str]) -> str:
+        """Clase de carga efectiva (ver resolve_workload)"""
+        return resolve_workload(workload, self.workload_dsns)
+
+    def create_pool(self, workload: str = DEFAULT_WORKLOAD):
+        """Crear el pool de sesiones de una clase de carga (idempotente)"""
+        workload = self._resolve_workload(workload)
+        with self._pool_lock:
+            if workload in self.pools:
+                return self.pools[workload]
+            try:
+                pool = oracledb.create_pool(
+                    user=self.user,
+                    password=self.password,
+                    dsn=self.workload_dsns[workload],
+                    min=self.pool_min,
+                    max=self.pool_max,
+                    increment=self.pool_increment,
+                    ping_interval=self.pool_ping_interval,
+                    getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                    wait_timeout=self.pool_timeout,
+                    session_callback=self.session_callback,
+                    stmtcachesize=self.stmtcachesize
+                )
+                self.pools[workload] = pool
+                if workload == DEFAULT_WORKLOAD:
+                    self.pool = pool
+                logger.info(f"✓ Pool '{workload}' creado (min={self.pool_min}, max={self.pool_max}, "
+                            f"increment={self.pool_increment})")
+                return pool
+            except oracledb.Error as e:
+                logger.error(f"Error al crear el pool '{workload}': {e}")
+                raise
+
+    def close_pool(self, force: bool = False, workload: Optional[str] = None):
+        """Cerrar el pool de una clase de carga, o todos (incluido el de pipelines) si no se indica"""
+        with self._pool_lock:
+            workloads = [workload] if workload else list(self.pools)
+            for name in workloads:
+                pool = self.pools.pop(name, None)
+                if pool is not None:
+                    pool.close(force=force)
+                    logger.info(f"✓ Pool '{name}' cerrado")
+            if workload is None and self.pipeline_pool is not None:
+                self._run_async(self.pipeline_pool.close(force=force))
+                self.pipeline_pool = None
+                logger.info("✓ Pool de pipelines cerrado")
+            if DEFAULT_WORKLOAD not in self.pools:
+                self.pool = None
+
+    def get_pool_stats(self, workload: str = DEFAULT_WORKLOAD) -> Dict[str, Any]:
+        """Obtener estadísticas del pool (sesiones abiertas/ocupadas y tiempos de espera)"""
+        workload = self._resolve_workload(workload)
+        pool = self.pools.get(workload)
+        metrics = self._pool_metrics.get(workload, {'acquires': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+        acquires = metrics['acquires']
+
+        return {
+            'pool_enabled': self.pool_enabled,
+            'workload': workload,
+            'opened': pool.opened if pool else 0,
+            'busy': pool.busy if pool else 0,
+            'min': pool.min if pool else self.pool_min,
+            'max': pool.max if pool else self.pool_max,
+            'acquires': acquires,
+            'wait_avg_ms': (metrics['wait_total'] / acquires) * 1000 if acquires else 0.0,
+            'wait_max_ms': metrics['wait_max'] * 1000
+        }
+
+    def get_workload_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Estadísticas de pool por clase de carga"""
+        return {workload: self.get_pool_stats(workload) for workload in self.workload_dsns}
+
     @contextmanager
-    def get_connection(self):
-        """Context manager para manejar conexiones automáticamente"""
-        conn = None
+    def use_workload(self, workload: str):
+        """Forzar la clase de carga de las llamadas hechas dentro del bloque (en este hilo)"""
+        self._resolve_workload(workload)
+        previous = getattr(self._local, 'override', None)
+        self._local.override = workload
         try:
-            conn = oracledb.connect(
+            yield
+        finally:
+            self._local.override = previous
+
+    @contextmanager
+    def _routed(self, workload: str):
+        """
+        Clase de carga por defecto de un método; use_workload tiene prioridad y las
+        llamadas anidadas (ej. execute_query dentro de una operación de ingesta)
+        conservan la del método exterior
+        """
+        previous = getattr(self._local, 'routed', None)
+        self._local.routed = previous or workload
+        try:
+            yield
+        finally:
+            self._local.routed = previous
+
+    def _current_workload(self) -> str:
+        """Clase de carga para la próxima conexión en este hilo"""
+        return (getattr(self._local, 'override', None)
+                or getattr(self._local, 'routed', None)
+                or DEFAULT_WORKLOAD)
+
+    def _acquire(self, workload: str):
+        """Obtener una sesión: del pool si está habilitado, o una conexión nueva"""
+        workload = self._resolve_workload(workload)
+        if not self.pool_enabled:
+            return oracledb.connect(
                 user=self.user,
                 password=self.password,
-                dsn=self.dsn
+                dsn=self.workload_dsns[workload],
+                stmtcachesize=self.stmtcachesize
             )
+
+        pool = self.pools.get(workload) or self.create_pool(workload)
+        start = time.perf_counter()
+        conn = pool.acquire()
+        waited = time.perf_counter() - start
+
+        with self._pool_lock:
+            metrics = self._pool_metrics.setdefault(
+                workload, {'acquires': 0, 'wait_total': 0.0, 'wait_max': 0.0})
+            metrics['acquires'] += 1
+            metrics['wait_total'] += waited
+            metrics['wait_max'] = max(metrics['wait_max'], waited)
+
+        return conn
+
+    @contextmanager
+    def get_connection(self, workload: Optional[str] = None):
+        """
+        Context manager para manejar conexiones automáticamente
+
+        Args:
+            workload: Clase de carga ('search', 'ingest', ...); por defecto la del
+                      método en curso o la fijada con use_workload
+        """
+        conn = None
+        try:
+            conn = self._acquire(workload or self._current_workload())
             yield conn
         except oracledb.Error as e:
             logger.error(f"Error en la conexión: {e}")
             raise
         finally:
             if conn:
+                # En modo pool, close() devuelve la sesión al pool
                 conn.close()
 
+    # ==================== PIPELINING ====================
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """Event loop propio (hilo daemon) donde viven los pools asyncio y sus conexiones"""
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name='oracledb-pipelines', daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def _run_async(self, coroutine) -> Any:
+        """Ejecutar una corrutina en el event loop propio y esperar su resultado"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._event_loop()).result()
+
+    async def _acquire_async(self):
+        """
+        Sesión del pool asyncio de pipelines (servicio por defecto)
+
+        Se crea una vez y se comparte entre cargas, también con pool_enabled=False:
+        abrir una conexión TLS por pipeline anularía el ahorro de round trips.
+        """
+        if self.pipeline_pool is None:
+            self.pipeline_pool = oracledb.create_pool_async(
+                user=self.user,
+                password=self.password,
+                dsn=self.dsn,
+                min=1,
+                max=self.pipeline_pool_max,
+                increment=1,
+                ping_interval=self.pool_ping_interval,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=self.pool_timeout,
+                stmtcachesize=self.stmtcachesize
+            )
+            logger.info(f"✓ Pool de pipelines creado (max={self.pipeline_pool_max})")
+        return await self.pipeline_pool.acquire()
+
+    def execute_pipeline(self, operations: List[Any], continue_on_error: bool = False,
+                         pipelined: Optional[bool] = None) -> List[Any]:
+        """
+        Ejecutar varias sentencias independientes en un solo round trip
+
+        Usa el pipelining de python-oracledb (Oracle 23ai) sobre una sesión del pool
+        asyncio de pipelines, que vive en un event loop propio. La llamada bloquea el
+        hilo que la hace hasta tener los resultados, también si ese hilo ejecuta un
+        event loop: desde código asyncio use AsyncOracleADBConnection.run_pipeline.
+        Con servidores anteriores el driver las ejecuta en secuencia. Si el driver no
+        tiene la API, hay session_callback o pipelined=False, se ejecutan en secuencia
+        sobre una conexión normal de la carga actual.
+
+        Args:
+            operations: Ver normalize_pipeline_operations
+            continue_on_error: Seguir tras un error; el error (oracledb.DatabaseError)
+                               se devuelve en su posición
+
+        Returns:
+            Un resultado por operación: filas (fetchall), fila (fetchone) o None
+        """
+        operations = normalize_pipeline_operations(operations)
+        if pipelined is None:
+            pipelined = supports_pipelining() and self.session_callback is None
+        elif pipelined and self.session_callback is not None:
+            raise ValueError("execute_pipeline(pipelined=True) no ejecuta session_callback en la sesión "
+                             "asyncio; use pipelined=False o quite el callback")
+
+        if pipelined:
+            results = self._run_async(self._run_pipeline_async(operations, continue_on_error))
+        else:
+            results = self._run_sequential(operations, continue_on_error)
+
+        for kind, sql, _ in operations:
+            if kind == 'execute':
+                self._invalidate_after_dml(sql)
+        return results
+
+    async def _run_pipeline_async(self, operations: List[Tuple[str, Optional[str], Any]],
+                                  continue_on_error: bool) -> List[Any]:
+        """Ejecutar el pipeline sobre una sesión del pool de pipelines"""
+        conn = await self._acquire_async()
+        try:
+            return await self._execute_async(conn, operations, continue_on_error, pipelined=True)
+        finally:
+            await conn.close()
+
+    @staticmethod
+    async def _execute_async(conn, operations: List[Tuple[str, Optional[str], Any]],
+                             continue_on_error: bool, pipelined: bool) -> List[Any]:
+        """Ejecutar las operaciones en una sesión asyncio: en un pipeline o una a una"""
+        if pipelined:
+            results = await conn.run_pipeline(build_pipeline(operations),
+                                              continue_on_error=continue_on_error)
+            return [pipeline_result_value(kind, result)
+                    for (kind, _, _), result in zip(operations, results)]
+
+        results = []
+        cursor = conn.cursor()
+        for kind, sql, params in operations:
+            try:
+                if kind == 'commit':
+                    await conn.commit()
+                    results.append(None)
+                    continue
+
+                await cursor.execute(sql, params or [])
+                if kind == 'fetchall':
+                    results.append(await cursor.fetchall())
+                elif kind == 'fetchone':
+                    results.append(await cursor.fetchone())
+                else:
+                    results.append(None)
+            except oracledb.Error as e:
+                if not continue_on_error:
+                    raise
+                results.append(e)
+        cursor.close()
+        return results
+
+    def benchmark_pipeline(self, operations: List[Any], repeats: int = 5) -> Dict[str, Any]:
+        """
+        Comparar la ejecución secuencial y el pipeline sobre la misma sesión abierta
+
+        Los dos modos se ejecutan alternados en una única sesión del pool de
+        pipelines, tras una ronda de calentamiento de cada uno (sentencias ya
+        parseadas en la caché de la sesión): la diferencia medida son los round trips.
+        Las operaciones no deben modificar datos.
+
+        Returns:
+            Operaciones, repeticiones y tiempo medio (ms) de cada modo
+        """
+        operations = normalize_pipeline_operations(operations)
+        return self._run_async(self._benchmark_pipeline_async(operations, repeats))
+
+    async def _benchmark_pipeline_async(self, operations: List[Tuple[str, Optional[str], Any]],
+                                        repeats: int) -> Dict[str, Any]:
+        conn = await self._acquire_async()
+        try:
+            timings = {False: [], True: []}
+            for run in range(repeats + 1):
+                for pipelined in (False, True):
+                    start = time.perf_counter()
+                    await self._execute_async(conn, operations, False, pipelined)
+                    if run:
+                        timings[pipelined].append((time.perf_counter() - start) * 1000)
+        finally:
+            await conn.close()
+
+        return {
+            'operations': len(operations),
+            'repeats': repeats,
+            'sequential_ms': sum(timings[False]) / repeats,
+            'pipelined_ms': sum(timings[True]) / repeats
+        }
+
+    def _run_sequential(self, operations: List[Tuple[str, Optional[str], Any]],
+                        continue_on_error: bool) -> List[Any]:
+        """Alternativa secuencial (un round trip por operación) sobre una sola conexión"""
+        results = []
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            for kind, sql, params in operations:
+                try:
+                    if kind == 'commit':
+                        conn.commit()
+                        results.append(None)
+                        continue
+
+                    cursor.execute(sql, params or [])
+                    if kind == 'fetchall':
+                        results.append(cursor.fetchall())
+                    elif kind == 'fetchone':
+                        results.append(cursor.fetchone())
+                    else:
+                        results.append(None)
+                except oracledb.Error as e:
+                    if not continue_on_error:
+                        raise
+                    results.append(e)
+            cursor.close()
+        return results
+
+    def _configure_cursor(self, cursor, inline_lobs: bool = False):
+        """Instalar los output type handlers habilitados en el cursor"""
+        handler = build_output_type_handler(inline_lobs and self.fetch_lobs_inline,
+                                            self.vectors_as_numpy)
+        if handler is not None:
+            cursor.outputtypehandler = handler
+
+    @workload_route('search')
     def execute_query(self, query: str, params: Optional[Dict] = None) -> List[tuple]:
         """Ejecutar una consulta SELECT"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            self._configure_cursor(cursor)
             if params:
                 cursor.execute(query, params)
             else:
@@ -95,30 +1747,186 @@ class OracleADBConnection:
             cursor.close()
             return results
 
-    def execute_query_df(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
-        """Ejecutar consulta y retornar DataFrame"""
+    @workload_route('search')
+    def execute_query_df(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
+        """Ejecutar consulta y retornar DataFrame"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._configure_cursor(cursor, inline_lobs=True)
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+
+            columns = [col[0].lower() for col in cursor.description]
+            results = []
+
+            for row in cursor.fetchall():
+                row_data = []
+                for item in row:
+                    if hasattr(item, 'read'):
+                        row_data.append(item.read())
+                    else:
+                        row_data.append(item)
+                results.append(tuple(row_data))
+
+            cursor.close()
+            return merge_lob_fallback_columns(pd.DataFrame(results, columns=columns))
+
+    def iter_query(self, query: str, params: Optional[Dict] = None,
+                   batch_size: int = 500) -> Iterator[tuple]:
+        """
+        Ejecutar una consulta SELECT y devolver las filas en streaming
+
+        Usa fetchmany con arraysize/prefetchrows = batch_size, de modo que la
+        memoria queda acotada por el tamaño del batch y no por el de la tabla.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = batch_size
+            cursor.prefetchrows = batch_size + 1
+            self._configure_cursor(cursor)
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def fetch_vector_matrix(self, query: str, params: Optional[Dict] = None,
+                            vector_column: str = 'vector',
+                            batch_size: int = 500) -> Tuple[pd.DataFrame, np.ndarray]:
+        """
+        Ejecutar consulta y apilar la columna VECTOR en una matriz NumPy contigua (n, dim)
+
+        Returns:
+            (DataFrame con el resto de columnas, matriz de vectores en el mismo orden)
+        """
+        frames = []
+        matrices = []
+        for df, matrix in self.iter_vector_batches(query, params, vector_column, batch_size):
+            frames.append(df)
+            matrices.append(matrix)
+
+        if not frames:
+            return pd.DataFrame(), np.empty((0, 0), dtype=np.float32)
+        return pd.concat(frames, ignore_index=True), np.concatenate(matrices)
+
+    def iter_vector_batches(self, query: str, params: Optional[Dict] = None,
+                            vector_column: str = 'vector',
+                            batch_size: int = 500) -> Iterator[Tuple[pd.DataFrame, np.ndarray]]:
+        """
+        Ejecutar consulta y devolver, por batch, el resto de columnas y la matriz de vectores
+
+        La memoria queda acotada por batch_size: permite copiar tablas de cualquier tamaño
+        (réplicas, índices en memoria, exportaciones). Los LOB llegan en línea si
+        fetch_lobs_inline está habilitado.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.arraysize = batch_size
+            cursor.prefetchrows = batch_size + 1
+            cursor.outputtypehandler = build_output_type_handler(self.fetch_lobs_inline, True)
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+
+                columns = [col[0].lower() for col in cursor.description]
+                vector_idx = columns.index(vector_column.lower())
+                other_columns = [c for i, c in enumerate(columns) if i != vector_idx]
+
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    vectors = [row[vector_idx] for row in batch]
+                    rows = [tuple(item.read() if hasattr(item, 'read') else item
+                                  for i, item in enumerate(row) if i != vector_idx)
+                            for row in batch]
+                    yield (pd.DataFrame(rows, columns=other_columns),
+                           stack_vectors(vectors, len(vectors[0]), vectors[0].dtype))
+            finally:
+                cursor.close()
+
+    def iter_query_df(self, query: str, params: Optional[Dict] = None,
+                      batch_size: int = 500) -> Iterator[pd.DataFrame]:
+        """Ejecutar consulta y devolver DataFrames de hasta batch_size filas"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            self._configure_cursor(cursor, inline_lobs=True)
+            cursor.arraysize = batch_size
+            cursor.prefetchrows = batch_size + 1
+            try:
+                if params:
+                    cursor.execute(query, params)
+                else:
+                    cursor.execute(query)
+
+                columns = [col[0].lower() for col in cursor.description]
+
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    results = [
+                        tuple(item.read() if hasattr(item, 'read') else item for item in row)
+                        for row in rows
+                    ]
+                    yield merge_lob_fallback_columns(pd.DataFrame(results, columns=columns))
+            finally:
+                cursor.close()
+
+    # ==================== FETCH COLUMNAR (ARROW) ====================
+
+    @staticmethod
+    def _to_frame(oracle_df, output: str):
+        """Convertir un OracleDataFrame a pyarrow.Table o pandas.DataFrame (columnas en minúsculas)"""
+        try:
+            import pyarrow
+        except ImportError as e:
+            raise ImportError("El fetch columnar requiere pyarrow: pip install pyarrow") from e
+
+        table = pyarrow.table(oracle_df)
+        table = table.rename_columns([name.lower() for name in table.column_names])
+        if output == "arrow":
+            return table
+        return table.to_pandas()
+
+    def fetch_df(self, query: str, params: Optional[Dict] = None,
+                 output: str = "pandas", arraysize: int = 1000):
+        """
+        Ejecutar consulta con el intercambio DataFrame/Arrow de python-oracledb (fetch_df_all)
+
+        Los datos se construyen en buffers columnares sin objetos Python por celda.
+        output: "pandas" (pd.DataFrame) o "arrow" (pyarrow.Table)
+        """
+        if output not in ("pandas", "arrow"):
+            raise ValueError("output debe ser 'pandas' o 'arrow'")
+
         with self.get_connection() as conn:
-            cursor = conn.cursor()
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
+            oracle_df = conn.fetch_df_all(statement=query, parameters=params, arraysize=arraysize)
+            return self._to_frame(oracle_df, output)
 
-            columns = [col[0].lower() for col in cursor.description]
-            results = []
-
-            for row in cursor.fetchall():
-                row_data = []
-                for item in row:
-                    if hasattr(item, 'read'):
-                        row_data.append(item.read())
-                    else:
-                        row_data.append(item)
-                results.append(tuple(row_data))
+    def iter_fetch_df(self, query: str, params: Optional[Dict] = None,
+                      batch_size: int = 10000, output: str = "pandas") -> Iterator[Any]:
+        """Variante por batches de fetch_df (fetch_df_batches), para exportar tablas grandes"""
+        if output not in ("pandas", "arrow"):
+            raise ValueError("output debe ser 'pandas' o 'arrow'")
 
-            cursor.close()
-            return pd.DataFrame(results, columns=columns)
+        with self.get_connection() as conn:
+            for oracle_df in conn.fetch_df_batches(statement=query, parameters=params, size=batch_size):
+                yield self._to_frame(oracle_df, output)
 
+    @workload_route('ingest')
     def execute_dml(self, query: str, params: Optional[Dict] = None, commit: bool = True) -> int:
         """Ejecutar INSERT, UPDATE, DELETE"""
         with self.get_connection() as conn:
@@ -134,10 +1942,30 @@ class OracleADBConnection:
                 conn.commit()
 
             cursor.close()
-            return rows_affected
+
+        self._invalidate_after_dml(query)
+        return rows_affected
+
+    def _invalidate_after_dml(self, statement: str):
+        """
+        Invalidar las estadísticas de la tabla modificada por execute_dml
+
+        Esas filas no pasan por los contadores de la tabla lateral: hasta el próximo
+        rebuild_genai_stats (o create_genai_stats_table), get_genai_stats hace la
+        pasada completa. También se invalida la caché de búsquedas de la tabla
+        (ver _on_commit). El estado es local a esta instancia.
+        """
+        target = self._stats.after_dml(statement)
+        if target is None:
+            return
+        verb, table = target
+        self._on_commit(table)
+        if verb == 'DROP':
+            self._text_indexes.pop(table, None)
 
     # ==================== FUNCIONES VECTORIALES GENAI ====================
 
+    @workload_route('ingest')
     def insert_vector_document_genai(self, docid: str, body: str, vector: List[float],
                                      title: str = None, url: str = None,
                                      chunk_id: int = None, page_numbers: str = None,
@@ -149,55 +1977,28 @@ class OracleADBConnection:
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
-            body_truncated = body[:4000] if len(body) > 4000 else body
-            vector_array = array.array('f', vector)
-
-            columns = ['docid', 'body', 'vector']
-            values = [docid, body_truncated, vector_array]
-            placeholders = [':1', ':2', ':3']
-            param_count = 3
-
-            if title:
-                param_count += 1
-                columns.append('title')
-                values.append(title)
-                placeholders.append(f':{param_count}')
-
-            if url:
-                param_count += 1
-                columns.append('url')
-                values.append(url)
-                placeholders.append(f':{param_count}')
-
-            if chunk_id is not None:
-                param_count += 1
-                columns.append('chunk_id')
-                values.append(chunk_id)
-                placeholders.append(f':{param_count}')
-
-            if page_numbers:
-                param_count += 1
-                columns.append('page_numbers')
-                values.append(page_numbers)
-                placeholders.append(f':{param_count}')
-
-            if metadata:
-                param_count += 1
-                columns.append('metadata')
-                values.append(metadata)
-                placeholders.append(f':{param_count}')
-
-            query = f"""
-                INSERT INTO {table_name} ({', '.join(columns)})
-                VALUES ({', '.join(placeholders)})
-            """
+            query, values = genai_insert_statement({
+                'docid': docid,
+                'body': body,
+                'vector': vector,
+                'title': title,
+                'url': url,
+                'chunk_id': chunk_id,
+                'page_numbers': page_numbers,
+                'metadata': metadata
+            }, table_name, self.vector_format)
 
             cursor.execute(query, values)
-            conn.commit()
             rows_affected = cursor.rowcount
+            self._update_source_stats(conn, table_name, [{
+                'docid': docid, 'body': body, 'chunk_id': chunk_id
+            }])
+            conn.commit()
+            self._on_commit(table_name)
             cursor.close()
             return rows_affected
 
+    @workload_route('ingest')
     def bulk_insert_genai(self, documents: List[Dict[str, Any]],
                           table_name: str = None,
                           batch_size: int = 100) -> int:
@@ -210,69 +2011,25 @@ class OracleADBConnection:
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
+            query = genai_bulk_insert_statement(table_name)
+
             for i in range(0, len(documents), batch_size):
                 batch = documents[i:i + batch_size]
+                rows, bound_docs = genai_bulk_rows(batch, self.vector_format)
 
-                for doc in batch:
-                    try:
-                        docid = doc['docid']
-                        body = doc['body'][:4000]
-                        vector = array.array('f', doc['vector'])
-
-                        title = doc.get('title')
-                        url = doc.get('url')
-                        chunk_id = doc.get('chunk_id')
-                        page_numbers = doc.get('page_numbers')
-                        metadata = doc.get('metadata')
-
-                        columns = ['docid', 'body', 'vector']
-                        values = [docid, body, vector]
-                        placeholders = [':1', ':2', ':3']
-                        param_count = 3
-
-                        if title:
-                            param_count += 1
-                            columns.append('title')
-                            values.append(title)
-                            placeholders.append(f':{param_count}')
-
-                        if url:
-                            param_count += 1
-                            columns.append('url')
-                            values.append(url)
-                            placeholders.append(f':{param_count}')
-
-                        if chunk_id is not None:
-                            param_count += 1
-                            columns.append('chunk_id')
-                            values.append(chunk_id)
-                            placeholders.append(f':{param_count}')
-
-                        if page_numbers:
-                            param_count += 1
-                            columns.append('page_numbers')
-                            values.append(page_numbers)
-                            placeholders.append(f':{param_count}')
-
-                        if metadata:
-                            param_count += 1
-                            columns.append('metadata')
-                            values.append(metadata)
-                            placeholders.append(f':{param_count}')
-
-                        query = f"""
-                            INSERT INTO {table_name} ({', '.join(columns)})
-                            VALUES ({', '.join(placeholders)})
-                        """
-
-                        cursor.execute(query, values)
-                        total_inserted += 1
-
-                    except Exception as e:
-                        logger.error(f"Error insertando documento {doc.get('docid', 'unknown')}: {e}")
-                        continue
+                if rows:
+                    cursor.setinputsizes(*genai_bulk_input_sizes())
+                    cursor.executemany(query, rows, batcherrors=True)
+                    batch_errors = cursor.getbatcherrors()
+                    log_batch_errors(batch_errors, bound_docs)
+                    total_inserted += len(rows) - len(batch_errors)
+
+                    failed = {error.offset for error in batch_errors}
+                    self._update_source_stats(conn, table_name,
+                                              [d for n, d in enumerate(bound_docs) if n not in failed])
 
                 conn.commit()
+                self._on_commit(table_name)
                 logger.info(f"Batch {i // batch_size + 1}: {len(batch)} documentos procesados")
 
             cursor.close()
@@ -280,69 +2037,1020 @@ class OracleADBConnection:
         logger.info(f"✓ Total insertado: {total_inserted} documentos")
         return total_inserted
 
+    @workload_route('ingest')
+    def bulk_load_genai(self, documents: List[Dict[str, Any]],
+                        table_name: str = None,
+                        batch_size: int = 1000,
+                        mode: str = "direct") -> Dict[str, Any]:
+        """
+        Carga masiva para cargas iniciales o reconstrucciones completas de la tabla GenAI
+
+        Args:
+            documents: Documentos con el mismo formato que bulk_insert_genai
+            table_name: Tabla destino
+            batch_size: Filas por batch (cada batch se confirma por separado)
+            mode: "direct" usa la API de direct path load de python-oracledb y, si no
+                  está disponible, INSERT /*+ APPEND_VALUES */ con array binds;
+                  "conventional" usa bulk_insert_genai
+
+        Con mode="direct" conviene eliminar antes el índice vectorial y recrearlo
+        después de la carga (ver manage_index en exa/2.2-ingest_markdown_fixed.py).
+
+        Un error en un batch lo descarta entero (la carga directa no admite batcherrors),
+        reporta cada documento rechazado y la carga sigue con el siguiente batch.
+
+        Returns:
+            Diccionario con filas cargadas y rechazadas, segundos, filas/s y el método usado
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if mode not in ("direct", "conventional"):
+            raise ValueError("mode debe ser 'direct' o 'conventional'")
+
+        start = time.perf_counter()
+
+        if mode == "conventional":
+            loaded = self.bulk_insert_genai(documents, table_name, batch_size)
+            method = "conventional"
+        else:
+            loaded, method = self._direct_load_genai(documents, table_name, batch_size)
+
+        elapsed = time.perf_counter() - start
+        rows_per_second = loaded / elapsed if elapsed > 0 else 0.0
+        rejected = len(documents) - loaded
+        logger.info(f"✓ Carga {method}: {loaded} filas en {elapsed:.2f}s ({rows_per_second:.0f} filas/s)")
+        if rejected:
+            logger.warning(f"Carga {method}: {rejected} documentos rechazados")
+
+        return {
+            'rows': loaded,
+            'rejected': rejected,
+            'seconds': elapsed,
+            'rows_per_second': rows_per_second,
+            'method': method
+        }
+
+    def _direct_load_genai(self, documents: List[Dict[str, Any]], table_name: str,
+                           batch_size: int) -> Tuple[int, str]:
+        """Direct path load, con INSERT /*+ APPEND_VALUES */ como alternativa"""
+        batches = (documents[i:i + batch_size] for i in range(0, len(documents), batch_size))
+        return self._direct_load_batches(batches, table_name)
+
+    def _direct_load_batches(self, batches: Iterable[List[Dict[str, Any]]], table_name: str,
+                             with_hash: bool = False) -> Tuple[int, str]:
+        """
+        Cargar batches de documentos por direct path (o APPEND_VALUES), uno por transacción
+
+        with_hash: Cargar también la columna content_hash de cada documento
+        """
+        loaded = 0
+        columns = UPSERT_COLUMNS if with_hash else GENAI_COLUMNS
+        input_sizes = genai_merge_input_sizes() if with_hash else genai_bulk_input_sizes()
+
+        with self.get_connection() as conn:
+            if self._has_vector_index(conn, table_name):
+                logger.warning(f"La tabla '{table_name}' tiene un índice vectorial: la carga directa "
+                               f"lo mantendrá al final de cada batch. Considere eliminarlo y recrearlo.")
+
+            method = "direct_path" if hasattr(conn, "direct_path_load") else "append_values"
+            cursor = conn.cursor()
+            query = genai_bulk_insert_statement(table_name, with_hash).replace(
+                "INSERT INTO", "INSERT /*+ APPEND_VALUES */ INTO", 1)
+
+            for i, batch in enumerate(batches):
+                rows, bound_docs = genai_bulk_rows(batch, self.vector_format)
+                if not rows:
+                    continue
+                if with_hash:
+                    rows = [row + [doc.get('content_hash')] for row, doc in zip(rows, bound_docs)]
+
+                try:
+                    if method == "direct_path":
+                        try:
+                            conn.direct_path_load(
+                                schema_name=self.user,
+                                table_name=table_name,
+                                column_names=columns,
+                                data=rows
+                            )
+                        except oracledb.NotSupportedError as e:
+                            logger.warning(f"Direct path load no soportado ({e}); usando APPEND_VALUES")
+                            method = "append_values"
+
+                    if method == "append_values":
+                        cursor.setinputsizes(*input_sizes)
+                        cursor.executemany(query, rows)
+                except oracledb.Error as e:
+                    # Ni direct path ni APPEND_VALUES admiten batcherrors: se descarta el batch completo
+                    conn.rollback()
+                    log_rejected_batch(bound_docs, e)
+                    logger.error(f"Error en batch {i + 1} ({method}), descartado: {e}")
+                    continue
+
+                self._update_source_stats(conn, table_name, bound_docs)
+                # Tras una escritura directa la tabla no puede leerse en la misma transacción
+                conn.commit()
+                self._on_commit(table_name)
+                loaded += len(rows)
+                logger.info(f"Batch {i + 1}: {len(rows)} filas cargadas ({method})")
+
+            cursor.close()
+
+        return loaded, method
+
+    @staticmethod
+    def _has_vector_index(conn, table_name: str) -> bool:
+        """Indicar si la tabla tiene algún índice vectorial"""
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT COUNT(*) FROM user_indexes
+            WHERE table_name = UPPER(:1) AND index_type = 'VECTOR'
+        """, [table_name])
+        count = cursor.fetchone()[0]
+        cursor.close()
+        return count > 0
+
+    # ==================== INGESTA IDEMPOTENTE ====================
+
+    @workload_route('ingest')
+    def ensure_upsert_schema(self, table_name: str):
+        """Añadir la columna content_hash y el índice sobre docid si faltan (idempotente)"""
+        has_hash, has_docid_index = self.execute_pipeline([
+            ('fetchone', """
+                SELECT COUNT(*) FROM user_tab_columns
+                WHERE table_name = UPPER(:1) AND column_name = 'CONTENT_HASH'
+            """, [table_name]),
+            ('fetchone', """
+                SELECT COUNT(*) FROM user_ind_columns
+                WHERE table_name = UPPER(:1) AND column_name = 'DOCID' AND column_position = 1
+            """, [table_name])
+        ])
+        if has_hash[0] == 0:
+            self.execute_dml(content_hash_column_ddl(table_name))
+            logger.info(f"✓ Columna content_hash añadida a '{table_name}'")
+
+        if has_docid_index[0] == 0:
+            self.execute_dml(docid_index_ddl(table_name))
+            logger.info(f"✓ Índice '{docid_index_name(table_name)}' creado")
+
+    @workload_route('ingest')
+    def diff_source_genai(self, docid_prefix: str, documents: List[Dict[str, Any]],
+                          table_name: str = None, salt: str = '') -> Dict[str, Any]:
+        """
+        Comparar los chunks de un archivo fuente con los guardados, en una sola consulta
+
+        Args:
+            docid_prefix: Prefijo común de los docid del archivo (ej. 'a.md_chunk_')
+            documents: Chunks actuales del archivo, con el formato de bulk_insert_genai
+                       (el vector es opcional)
+            salt: Identificador de cómo se generan los vectores (ver genai_content_hash)
+
+        Returns:
+            {'changed': [(documento, hash, es_actualización)], 'removed_ids': [ids],
+             'removed_docids': [docids], 'unchanged': int}. Las filas repetidas de un
+            mismo docid (ingestas no idempotentes anteriores) se cuentan como borradas.
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        check_source_docids(docid_prefix, documents)
+
+        rows = self.execute_query(genai_existing_hashes_statement(table_name),
+                                  {'prefix': like_prefix(docid_prefix)})
+        return genai_source_diff(documents, rows, salt)
+
+    @workload_route('ingest')
+    def source_titles_genai(self, table_name: str = None) -> List[str]:
+        """Títulos (archivos fuente) presentes en la tabla, para borrar los archivos que ya no existen"""
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        return [row[0] for row in self.execute_query(genai_source_titles_statement(table_name))]
+
+    @workload_route('ingest')
+    def diff_sources_genai(self, sources: Dict[str, List[Dict[str, Any]]],
+                           table_name: str = None, salt: str = '') -> Dict[str, Dict[str, Any]]:
+        """
+        diff_source_genai de varios archivos fuente con las consultas en un solo pipeline
+
+        Args:
+            sources: {docid_prefix: chunks actuales del archivo}
+
+        Returns:
+            {docid_prefix: resultado de diff_source_genai}
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        for docid_prefix, documents in sources.items():
+            check_source_docids(docid_prefix, documents)
+        if not sources:
+            return {}
+
+        statement = genai_existing_hashes_statement(table_name)
+        results = self.execute_pipeline([('fetchall', statement, {'prefix': like_prefix(docid_prefix)})
+                                         for docid_prefix in sources])
+        return {docid_prefix: genai_source_diff(documents, rows, salt)
+                for (docid_prefix, documents), rows in zip(sources.items(), results)}
+
+    @workload_route('ingest')
+    def upsert_source_genai(self, docid_prefix: str, documents: List[Dict[str, Any]],
+                            embed: Callable[[str], Any],
+                            table_name: str = None,
+                            batch_size: int = 100,
+                            salt: str = '',
+                            diff: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
+        """
+        Sincronizar los chunks de un archivo fuente: solo se vectorizan los nuevos o
+        modificados, se aplican con un MERGE por docid y se borran los que ya no existen
+
+        Todo el archivo se confirma en una transacción, junto con sus contadores en la
+        tabla lateral. Requiere ensure_upsert_schema.
+
+        Args:
+            embed: Función texto -> vector (ej. CohereOCIEmbedder.embed_vector); se llama
+                   solo para los chunks sin 'vector' que cambiaron
+            diff: Resultado previo de diff_source_genai (evita repetir la consulta)
+
+        Returns:
+            Conteo de chunks sin cambios, insertados, actualizados, borrados,
+            vectorizados y fallidos
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if diff is None:
+            diff = self.diff_source_genai(docid_prefix, documents, table_name, salt)
+
+        result = {'unchanged': diff['unchanged'], 'inserted': 0, 'updated': 0,
+                  'deleted': 0, 'embedded': 0, 'failed': 0}
+
+        # Vectorizar fuera de la sesión: no se retiene una conexión del pool durante las llamadas al servicio
+        pending = []
+        for doc, content_hash, is_update in diff['changed']:
+            vector = doc.get('vector')
+            if vector is None:
+                try:
+                    vector = embed(doc['body'])
+                    result['embedded'] += 1
+                except Exception as e:
+                    logger.error(f"Error vectorizando {doc['docid']}: {e}")
+                    result['failed'] += 1
+                    continue
+            pending.append(({**doc, 'vector': vector}, content_hash, is_update))
+
+        if not pending and not diff['removed_ids']:
+            return result
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            if diff['removed_ids']:
+                cursor.executemany(f"DELETE FROM {table_name} WHERE id = :1",
+                                   [[row_id] for row_id in diff['removed_ids']])
+                result['deleted'] = len(diff['removed_ids'])
+
+            query = genai_merge_statement(table_name)
+            for i in range(0, len(pending), batch_size):
+                batch = pending[i:i + batch_size]
+                hashes = {doc['docid']: (content_hash, is_update) for doc, content_hash, is_update in batch}
+                rows, bound_docs = genai_bulk_rows([doc for doc, _, _ in batch], self.vector_format)
+                result['failed'] += len(batch) - len(rows)
+                if not rows:
+                    continue
+
+                rows = [row + [hashes[doc['docid']][0]] for row, doc in zip(rows, bound_docs)]
+                cursor.setinputsizes(*genai_merge_input_sizes())
+                cursor.executemany(query, rows, batcherrors=True)
+                batch_errors = cursor.getbatcherrors()
+                log_batch_errors(batch_errors, bound_docs)
+                result['failed'] += len(batch_errors)
+
+                failed = {error.offset for error in batch_errors}
+                for n, doc in enumerate(bound_docs):
+                    if n not in failed:
+                        result['updated' if hashes[doc['docid']][1] else 'inserted'] += 1
+
+            touched = [doc['docid'] for doc, _, _ in pending] + diff['removed_docids']
+            self._refresh_source_stats(conn, table_name, touched)
+            conn.commit()
+            # Un solo commit para borrados y MERGE: invalida también los chunks borrados
+            self._on_commit(table_name)
+            cursor.close()
+
+        logger.info(f"✓ {docid_prefix}: {result['inserted']} nuevos, {result['updated']} actualizados, "
+                    f"{result['deleted']} borrados, {result['unchanged']} sin cambios")
+        return result
+
+    @workload_route('search')
     def vector_similarity_search_genai(self, query_vector: List[float],
                                        top_k: int = 5,
                                        distance_metric: str = 'COSINE',
                                        filter_conditions: str = None,
-                                       table_name: str = None) -> pd.DataFrame:
-        """Búsqueda por similitud vectorial en tabla GenAI"""
+                                       table_name: str = None,
+                                       filters: Optional[Dict[str, Any]] = None,
+                                       approximate: bool = False,
+                                       target_accuracy: Optional[int] = None) -> pd.DataFrame:
+        """
+        Búsqueda por similitud vectorial en tabla GenAI
+
+        Args:
+            filters: Filtro estructurado (ver compile_genai_filters), compilado a binds
+            filter_conditions: Condición SQL libre (compatibilidad; genera un SQL distinto por valor)
+            approximate: Usar FETCH APPROX para que el optimizador use el índice vectorial (HNSW/IVF);
+                         con False la búsqueda es exacta (auditorías)
+            target_accuracy: Precisión objetivo por consulta (1-100) en modo aproximado
+        """
         if table_name is None:
             raise ValueError("table_name es requerido")
+        if target_accuracy is not None and not approximate:
+            raise ValueError("target_accuracy solo aplica con approximate=True")
 
-        vector_array = array.array('f', query_vector)
+        distance_metric = resolve_distance_metric(distance_metric, self.vector_format)
+        where_clause, params = genai_search_params(query_vector, top_k, filter_conditions,
+                                                   filters, target_accuracy, self.vector_format,
+                                                   distance_metric)
+        query = genai_search_statement(distance_metric, where_clause, table_name,
+                                       self.lob_inline_max_size, approximate, target_accuracy)
 
-        base_query = f"""
-            SELECT docid, body, title, url, chunk_id, page_numbers, metadata,
-                   VECTOR_DISTANCE(vector, :1, {distance_metric}) as distance
-            FROM {table_name}
+        return self._cached_search(table_name, query, params)
+
+    def _cached_search(self, table_name: str, query: str, params: Dict[str, Any]) -> pd.DataFrame:
+        """Ejecutar una búsqueda pasando por la caché de resultados (si está habilitada)"""
+        if self.search_cache is None:
+            return self.execute_query_df(query, params)
+
+        binds = {name: value for name, value in params.items() if name != 'query_vector'}
+        key = SearchResultCache.make_key(table_name, params['query_vector'], query=query, binds=binds)
+        cached = self.search_cache.get(key, table_name)
+        if cached is not None:
+            return cached
+
+        generation = self.search_cache.generation(table_name)
+        result = self.execute_query_df(query, params)
+        self.search_cache.put(key, table_name, result, generation)
+        return result
+
+    def _on_commit(self, table_name: str):
+        """
+        Invalidar la caché de búsquedas tras modificar filas de la tabla
+
+        Se llama tras cada commit de inserción, carga, upsert (borrados incluidos) y
+        execute_dml. El contador de generación vive en este proceso: las escrituras de
+        otros procesos o sesiones (otra instancia, SQL*Plus, jobs) no lo incrementan y
+        sus cambios solo se ven cuando expira search_cache_ttl.
+        """
+        if self.search_cache is not None:
+            self.search_cache.bump_generation(table_name)
+
+    # ==================== BÚSQUEDA HÍBRIDA ====================
+
+    @workload_route('search')
+    def hybrid_search_genai(self, query_text: str, query_vector: List[float],
+                            top_k: int = 5,
+                            distance_metric: str = 'COSINE',
+                            table_name: str = None,
+                            filters: Optional[Dict[str, Any]] = None,
+                            approximate: bool = False,
+                            target_accuracy: Optional[int] = None,
+                            candidates: Optional[int] = None,
+                            rrf_k: int = 60) -> pd.DataFrame:
+        """
+        Búsqueda híbrida: candidatos por palabras clave (Oracle Text) y por vector,
+        fusionados en la base de datos por reciprocal rank en un solo round trip
+
+        Recupera identificadores exactos (códigos, nombres de llaves) que la búsqueda
+        solo vectorial pierde. Usa el índice de text_index_ddl sobre body: si la tabla
+        no lo tiene (create_text_index), hace la búsqueda solo vectorial con un aviso.
+
+        Args:
+            query_text: Texto de la consulta (ver keyword_text_query)
+            candidates: Filas por rama antes de fusionar (por defecto max(4 * top_k, 20))
+            rrf_k: Constante de la fusión; valores mayores suavizan el peso de los primeros puestos
+
+        Returns:
+            DataFrame con las columnas de vector_similarity_search_genai más vector_rank,
+            text_rank, text_score y rrf_score (rango None si la rama no trajo el documento)
         """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if target_accuracy is not None and not approximate:
+            raise ValueError("target_accuracy solo aplica con approximate=True")
+
+        text_query = keyword_text_query(query_text)
+        if text_query is None:
+            logger.warning("La consulta no tiene términos para Oracle Text; búsqueda solo vectorial")
+        if text_query is None or not self._has_text_index(table_name):
+            return self.vector_similarity_search_genai(query_vector, top_k, distance_metric,
+                                                       table_name=table_name, filters=filters,
+                                                       approximate=approximate,
+                                                       target_accuracy=target_accuracy)
+
+        distance_metric = resolve_distance_metric(distance_metric, self.vector_format)
+        where_clause, params = genai_search_params(query_vector, top_k, None, filters,
+                                                   target_accuracy, self.vector_format,
+                                                   distance_metric)
+        params['text_query'] = text_query
+        params['candidates'] = candidates or max(4 * top_k, 20)
+        params['rrf_k'] = rrf_k
+        query = genai_hybrid_search_statement(distance_metric, where_clause, table_name,
+                                              self.lob_inline_max_size, approximate, target_accuracy)
+        return self._cached_search(table_name, query, params)
 
-        if filter_conditions:
-            query = f"{base_query} WHERE {filter_conditions} ORDER BY distance FETCH FIRST :2 ROWS ONLY"
+    @workload_route('ingest')
+    def create_text_index(self, table_name: str):
+        """Crear el índice Oracle Text sobre body que usa hybrid_search_genai (idempotente)"""
+        rows = self.execute_query(INDEX_EXISTS_QUERY, [text_index_name(table_name)])
+        if rows[0][0] > 0:
+            logger.info(f"El índice de texto '{text_index_name(table_name)}' ya existe")
         else:
-            query = f"{base_query} ORDER BY distance FETCH FIRST :2 ROWS ONLY"
+            self.execute_dml(text_index_ddl(table_name))
+            logger.info(f"✓ Índice de texto '{text_index_name(table_name)}' creado")
+        self._text_indexes[table_name.lower()] = (True, time.monotonic())
+
+    def _has_text_index(self, table_name: str) -> bool:
+        """
+        Indicar si existe el índice Oracle Text de hybrid_search_genai
+
+        Como _has_stats_table: un resultado positivo se recuerda y uno negativo se
+        vuelve a comprobar tras stats_ttl segundos.
+        """
+        key = table_name.lower()
+        cached = self._text_indexes.get(key)
+        if cached is not None and (cached[0] or time.monotonic() - cached[1] < self.stats_ttl):
+            return cached[0]
+
+        exists = self.execute_query(INDEX_EXISTS_QUERY, [text_index_name(table_name)])[0][0] > 0
+        self._text_indexes[key] = (exists, time.monotonic())
+        if not exists:
+            logger.warning(f"'{table_name}' no tiene el índice de texto '{text_index_name(table_name)}' "
+                           f"(create_text_index): hybrid_search_genai hará la búsqueda solo vectorial")
+        return exists
+
+    # ==================== BÚSQUEDA EN DOS FASES ====================
+
+    @workload_route('search')
+    def vector_search_ids(self, query_vector: List[float],
+                          top_k: int = 100,
+                          distance_metric: str = 'COSINE',
+                          table_name: str = None,
+                          filters: Optional[Dict[str, Any]] = None,
+                          approximate: bool = False,
+                          target_accuracy: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fase 1: búsqueda que devuelve solo id, docid y distancia
+
+        Permite sobre-muestrear (top_k alto) para re-rankear o deduplicar en el cliente
+        sin transferir los CLOB de todos los candidatos.
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+
+        distance_metric = resolve_distance_metric(distance_metric, self.vector_format)
+        where_clause, params = genai_search_params(query_vector, top_k, None,
+                                                   filters, target_accuracy, self.vector_format,
+                                                   distance_metric)
+        query = genai_ids_search_statement(distance_metric, where_clause, table_name,
+                                           approximate, target_accuracy)
+        return self._cached_search(table_name, query, params)
+
+    @workload_route('search')
+    def fetch_documents_by_ids(self, ids: List[int], table_name: str = None,
+                               columns: Optional[List[str]] = None,
+                               body_preview_chars: Optional[int] = None) -> pd.DataFrame:
+        """
+        Fase 2: traer las columnas proyectadas de los ids elegidos en una consulta
+
+        Args:
+            ids: Ids devueltos por vector_search_ids (se conserva su orden)
+            columns: Columnas a proyectar (por defecto las de vector_similarity_search_genai)
+            body_preview_chars: Si se indica, body se recorta en el servidor con DBMS_LOB.SUBSTR
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if columns is None:
+            columns = ['docid', 'body', 'title', 'url', 'chunk_id', 'page_numbers', 'metadata']
+
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        if not ids:
+            return pd.DataFrame(columns=['id'] + list(columns))
+
+        frames = []
+        for offset in range(0, len(ids), IN_LIST_BUCKETS[-1]):
+            chunk = ids[offset:offset + IN_LIST_BUCKETS[-1]]
+            size = next(b for b in IN_LIST_BUCKETS if b >= len(chunk))
+            padded = chunk + [chunk[-1]] * (size - len(chunk))
+
+            params = {f'id{i}': value for i, value in enumerate(padded)}
+            if body_preview_chars and 'body' in columns:
+                params['preview_chars'] = body_preview_chars
 
-        return self.execute_query_df(query, [vector_array, top_k])
+            query = genai_fetch_by_ids_statement(size, table_name, columns, body_preview_chars)
+            frames.append(self.execute_query_df(query, params))
 
-    def get_genai_stats(self, table_name: str = None) -> Dict[str, Any]:
-        """Obtener estadísticas de la tabla GenAI"""
+        df = pd.concat(frames, ignore_index=True)
+        order = {value: position for position, value in enumerate(ids)}
+        return df.sort_values('id', key=lambda col: col.map(order)).reset_index(drop=True)
+
+    @workload_route('search')
+    def two_phase_search(self, query_vector: List[float],
+                         top_k: int = 5,
+                         candidates: int = 100,
+                         table_name: str = None,
+                         select: Optional[Callable[[pd.DataFrame], pd.DataFrame]] = None,
+                         columns: Optional[List[str]] = None,
+                         body_preview_chars: Optional[int] = None,
+                         **search_kwargs) -> pd.DataFrame:
+        """
+        Búsqueda en dos fases: distancias de `candidates` filas y cuerpos solo para las elegidas
+
+        Args:
+            select: Función que recibe el DataFrame de la fase 1 (id, docid, distance) y
+                    devuelve las filas supervivientes; por defecto las top_k primeras
+        """
+        hits = self.vector_search_ids(query_vector, top_k=candidates,
+                                      table_name=table_name, **search_kwargs)
+        survivors = select(hits) if select else hits.head(top_k)
+
+        documents = self.fetch_documents_by_ids(survivors['id'].tolist(), table_name,
+                                                columns, body_preview_chars)
+        return documents.merge(survivors[['id', 'distance']], on='id', how='left')
+
+    @workload_route('search')
+    def batch_vector_search(self, query_vectors: List[List[float]],
+                            top_k: int = 5,
+                            distance_metric: str = 'COSINE',
+                            table_name: str = None,
+                            filters: Optional[Dict[str, Any]] = None,
+                            approximate: bool = False,
+                            target_accuracy: Optional[int] = None,
+                            method: str = "single_statement",
+                            max_workers: Optional[int] = None) -> Dict[int, pd.DataFrame]:
+        """
+        Búsqueda por similitud para varios vectores de consulta
+
+        Args:
+            method: "single_statement" envía todos los vectores en una sentencia
+                    (un round trip); "concurrent" ejecuta una búsqueda por vector en
+                    paralelo sobre el pool (max_workers, por defecto pool_max)
+
+        Returns:
+            Diccionario {índice de la consulta: DataFrame con el formato de vector_similarity_search_genai}
+        """
         if table_name is None:
             raise ValueError("table_name es requerido")
+        if method not in ("single_statement", "concurrent"):
+            raise ValueError("method debe ser 'single_statement' o 'concurrent'")
+        if not query_vectors:
+            return {}
+
+        distance_metric = resolve_distance_metric(distance_metric, self.vector_format)
+        start = time.perf_counter()
+
+        if method == "concurrent":
+            # Los hilos del executor no heredan el thread-local: se propaga la clase de carga
+            workload = self._current_workload()
+
+            def search(vector):
+                return self.vector_similarity_search_genai(
+                    query_vector=vector, top_k=top_k, distance_metric=distance_metric,
+                    table_name=table_name, filters=filters,
+                    approximate=approximate, target_accuracy=target_accuracy,
+                    workload=workload
+                )
+
+            workers = max_workers or (self.pool_max if self.pool_enabled else 4)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = dict(enumerate(executor.map(search, query_vectors)))
+        else:
+            results = {}
+            for offset in range(0, len(query_vectors), IN_LIST_BUCKETS[-1]):
+                chunk = query_vectors[offset:offset + IN_LIST_BUCKETS[-1]]
+                size = next(b for b in IN_LIST_BUCKETS if b >= len(chunk))
+                where_clause, params = genai_search_params(chunk[0], top_k, None, filters,
+                                                           target_accuracy, self.vector_format,
+                                                           distance_metric)
+                del params['query_vector']
+                for i, vector in enumerate(chunk):
+                    params[f'qv{i}'] = quantize_vector(vector, self.vector_format, distance_metric)
+                # Relleno hasta el bucket: filas inactivas que no llegan al CROSS APPLY
+                for i in range(len(chunk), size):
+                    params[f'qv{i}'] = params[f'qv{len(chunk) - 1}']
+                params['active_queries'] = len(chunk)
+
+                query = genai_batch_search_statement(size, distance_metric, where_clause, table_name,
+                                                     self.lob_inline_max_size, approximate,
+                                                     target_accuracy)
+                df = self.execute_query_df(query, params)
+
+                for i in range(len(chunk)):
+                    group = df[df['query_index'] == i].drop(columns=['query_index'])
+                    results[offset + i] = group.reset_index(drop=True)
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"✓ {len(query_vectors)} búsquedas ({method}) en {elapsed:.3f}s "
+                    f"({len(query_vectors) / elapsed:.1f} consultas/s)")
+        return results
+
+    def benchmark_batch_search(self, query_vectors: List[List[float]], top_k: int = 5,
+                               table_name: str = None, repeats: int = 3,
+                               **search_kwargs) -> Dict[str, float]:
+        """Medir el tiempo medio (s) de batch_vector_search con cada método"""
+        timings = {}
+        for method in ("single_statement", "concurrent"):
+            elapsed = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                self.batch_vector_search(query_vectors, top_k=top_k, table_name=table_name,
+                                         method=method, **search_kwargs)
+                elapsed.append(time.perf_counter() - start)
+            timings[method] = sum(elapsed) / len(elapsed)
+            logger.info(f"{method}: {timings[method]:.3f}s promedio ({repeats} repeticiones)")
+        return timings
+
+    @workload_route('search')
+    def explain_vector_search(self, table_name: str, distance_metric: str = 'COSINE',
+                              filters: Optional[Dict[str, Any]] = None,
+                              approximate: bool = True,
+                              target_accuracy: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Obtener el plan de ejecución de la búsqueda GenAI y validar si usa el índice vectorial
+
+        Returns:
+            {'uses_vector_index': bool, 'plan': [líneas de DBMS_XPLAN]}
+        """
+        where_clause, _ = compile_genai_filters(filters)
+        distance_metric = resolve_distance_metric(distance_metric, self.vector_format)
+        query = genai_search_statement(distance_metric, where_clause, table_name,
+                                       self.lob_inline_max_size, approximate, target_accuracy)
+        statement_id = f"vs_{int(time.time() * 1000)}"
+
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {query}")
+            cursor.execute(
+                "SELECT plan_table_output FROM TABLE(DBMS_XPLAN.DISPLAY('PLAN_TABLE', :1, 'BASIC'))",
+                [statement_id]
+            )
+            plan = [row[0] for row in cursor.fetchall()]
+            cursor.execute("DELETE FROM plan_table WHERE statement_id = :1", [statement_id])
+            conn.commit()
+            cursor.close()
+
+        # HNSW aparece como 'VECTOR INDEX HNSW SCAN'; IVF como acceso a las tablas VECTOR$<índice>$...
+        uses_index = any('VECTOR INDEX' in line.upper() or 'VECTOR$' in line.upper() for line in plan)
+        if approximate and not uses_index:
+            logger.warning(f"La búsqueda aproximada en '{table_name}' no usa el índice vectorial")
 
+        return {'uses_vector_index': uses_index, 'plan': plan}
+
+    # ==================== ÍNDICE VECTORIAL ====================
+
+    @workload_route('ingest')
+    def vector_memory_advisor(self, num_vectors: int, dimensions: int,
+                              dim_type: str = 'FLOAT32', index_type: str = 'HNSW') -> Dict[str, Any]:
+        """Llamar a DBMS_VECTOR.INDEX_VECTOR_MEMORY_ADVISOR y devolver su respuesta JSON"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            response = cursor.var(oracledb.DB_TYPE_CLOB)
+            cursor.execute("""
+                BEGIN
+                    DBMS_VECTOR.INDEX_VECTOR_MEMORY_ADVISOR(
+                        INDEX_TYPE     => :index_type,
+                        NUM_VECTORS    => :num_vectors,
+                        DIM_COUNT      => :dim_count,
+                        DIM_TYPE       => :dim_type,
+                        PARAMETER_JSON => NULL,
+                        RESPONSE_JSON  => :response);
+                END;
+            """, index_type=index_type.upper(), num_vectors=num_vectors, dim_count=dimensions,
+                dim_type=dim_type.upper(), response=response)
+            value = response.getvalue()
+            cursor.close()
+
+        text = value.read() if hasattr(value, 'read') else value
+        return json.loads(text) if text else {}
+
+    @workload_route('ingest')
+    def get_vector_memory_size(self) -> Optional[int]:
+        """
+        Bytes asignados al vector memory pool según v$vector_memory_pool (legible en ADB,
+        a diferencia de v$parameter); 0 sin pool, None si no se puede consultar
+        """
+        try:
+            rows = self.execute_query("SELECT SUM(alloc_bytes) FROM v$vector_memory_pool")
+        except oracledb.DatabaseError as e:
+            logger.warning(f"No se pudo consultar v$vector_memory_pool: {e}")
+            return None
+        return int(rows[0][0] or 0) if rows else None
+
+    @workload_route('ingest')
+    def recommend_vector_index(self, num_vectors: int, dimensions: int,
+                               dim_type: str = 'FLOAT32',
+                               headroom: float = 0.8) -> Dict[str, Any]:
+        """
+        Recomendar HNSW o IVF según la memoria que sugiere el advisor y el vector memory pool
+
+        HNSW se recomienda si la memoria sugerida por INDEX_VECTOR_MEMORY_ADVISOR (o la
+        estimación local si el advisor no responde) cabe en headroom * el pool de
+        v$vector_memory_pool; en otro caso IVF (NEIGHBOR PARTITIONS), con particiones
+        ~ sqrt(num_vectors). Si no se conoce el tamaño del pool se recomienda IVF, que no
+        lo necesita, con un aviso.
+        """
+        estimate = estimate_hnsw_memory(num_vectors, dimensions, dim_type)
+        advisor = {}
+        try:
+            advisor = self.vector_memory_advisor(num_vectors, dimensions, dim_type)
+        except oracledb.DatabaseError as e:
+            logger.warning(f"Vector memory advisor no disponible: {e}")
+
+        required = advisor_memory_bytes(advisor)
+        source = 'advisor'
+        if required is None:
+            logger.warning("El advisor no devolvió una memoria sugerida; se usa la estimación local "
+                           f"({estimate / 1024 ** 3:.2f} GB)")
+            required, source = estimate, 'estimate'
+
+        pool_size = self.get_vector_memory_size()
+        if pool_size is None:
+            logger.warning("Tamaño del vector memory pool desconocido: se recomienda IVF. Indique "
+                           "VECTOR_INDEX_TYPE si sabe que HNSW cabe en memoria")
+        fits = pool_size is not None and required <= pool_size * headroom
+        index_type = 'HNSW' if fits else 'IVF'
+
+        recommendation = {
+            'index_type': index_type,
+            'required_bytes': required,
+            'required_source': source,
+            'estimated_hnsw_bytes': estimate,
+            'vector_memory_size': pool_size,
+            'neighbor_partitions': None if fits else max(1, int(num_vectors ** 0.5)),
+            'advisor': advisor
+        }
+        pool_text = f"{pool_size / 1024 ** 3:.2f} GB" if pool_size is not None else "desconocido"
+        logger.info(f"Índice recomendado: {index_type} (HNSW necesita {required / 1024 ** 3:.2f} GB "
+                    f"según {'el advisor' if source == 'advisor' else 'la estimación local'}, "
+                    f"vector pool {pool_text})")
+        return recommendation
 
-            cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-            total_docs = cursor.fetchone()[0]
-
-            cursor.execute(f"""
-                SELECT 
-                    COUNT(DISTINCT REGEXP_SUBSTR(docid, '^[^_]+')) as unique_docs,
-                    COUNT(CASE WHEN chunk_id IS NOT NULL THEN 1 END) as chunked_docs
-                FROM {table_name}
-            """)
-            doc_stats = cursor.fetchone()
-
-            cursor.execute(f"""
-                SELECT 
-                    AVG(LENGTH(body)) as avg_length,
-                    MAX(LENGTH(body)) as max_length,
-                    MIN(LENGTH(body)) as min_length
-                FROM {table_name}
-            """)
-            content_stats = cursor.fetchone()
+    # ==================== ESTADÍSTICAS ====================
 
+    @workload_route('ingest')
+    def create_genai_stats_table(self, table_name: str, rebuild: bool = True):
+        """Crear la tabla lateral de contadores por archivo fuente y (opcionalmente) poblarla"""
+        self.execute_dml(genai_stats_table_ddl(table_name))
+        self._stats.set_side_table(table_name, True)
+        self._stats.mark_rebuilt(table_name)
+        logger.info(f"✓ Tabla de estadísticas '{genai_stats_table_name(table_name)}' creada")
+        if rebuild:
+            self.rebuild_genai_stats(table_name)
+
+    @workload_route('ingest')
+    def rebuild_genai_stats(self, table_name: str) -> int:
+        """Recalcular la tabla lateral desde la tabla GenAI (una pasada)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM {genai_stats_table_name(table_name)}")
+            cursor.execute(genai_stats_rebuild_statement(table_name))
+            sources = cursor.rowcount
+            conn.commit()
             cursor.close()
 
-            return {
-                'total_documents': total_docs,
-                'unique_source_documents': doc_stats[0] if doc_stats[0] else 0,
-                'chunked_documents': doc_stats[1] if doc_stats[1] else 0,
-                'body_avg_length': float(content_stats[0]) if content_stats[0] else 0,
-                'body_max_length': content_stats[1] if content_stats[1] else 0,
-                'body_min_length': content_stats[2] if content_stats[2] else 0
-            }
+        self._stats.mark_rebuilt(table_name)
+        logger.info(f"✓ Estadísticas recalculadas: {sources} archivos fuente")
+        return sources
+
+    def _has_stats_table(self, conn, table_name: str) -> bool:
+        """Indicar si existe la tabla lateral de estadísticas (ver GenAIStatsState.side_table)"""
+        exists = self._stats.side_table(table_name)
+        if exists is not None:
+            return exists
+
+        cursor = conn.cursor()
+        cursor.execute(STATS_TABLE_EXISTS_QUERY, [genai_stats_table_name(table_name)])
+        exists = cursor.fetchone()[0] > 0
+        cursor.close()
+        self._stats.set_side_table(table_name, exists)
+        return exists
+
+    def _update_source_stats(self, conn, table_name: str, documents: List[Dict[str, Any]]):
+        """Acumular contadores por archivo fuente en la misma transacción del INSERT"""
+        self._stats.forget(table_name)
+        if not documents or not self._has_stats_table(conn, table_name):
+            return
+
+        deltas = genai_stats_deltas(documents)
+        if deltas:
+            self._merge_source_stats(conn, genai_stats_merge_statement(table_name), deltas)
+
+    def _refresh_source_stats(self, conn, table_name: str, docids: List[str]):
+        """Recalcular los contadores de los archivos fuente tocados por una actualización o borrado"""
+        self._stats.forget(table_name)
+        binds = genai_stats_refresh_binds(docids)
+        if not binds or not self._has_stats_table(conn, table_name):
+            return
+
+        sources = [bind for bind in binds if bind['source_file'] != NULL_SOURCE_FILE]
+        if sources:
+            self._merge_source_stats(conn, genai_stats_refresh_statement(table_name), sources)
+        if len(sources) < len(binds):
+            self._merge_source_stats(conn, genai_stats_refresh_statement(table_name, null_source=True),
+                                     [{'source_file': NULL_SOURCE_FILE}])
+
+    def _merge_source_stats(self, conn, statement: str, rows: List[Dict[str, Any]]):
+        """MERGE sobre la tabla lateral, repitiendo las filas que chocan con ORA-00001"""
+        cursor = conn.cursor()
+        cursor.executemany(statement, rows, batcherrors=True)
+        retry = genai_stats_retry_rows(cursor.getbatcherrors(), rows)
+        if retry:
+            logger.info(f"Tabla de estadísticas: {len(retry)} archivos fuente insertados a la vez "
+                        f"por otra sesión; reintentando")
+            cursor.executemany(statement, retry)
+        cursor.close()
+
+    @workload_route('search')
+    def get_genai_stats(self, table_name: str = None, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Obtener estadísticas de la tabla GenAI
+
+        Args:
+            fresh: True recorre la tabla en una sola pasada (valor exacto). Con False se
+                   usa el último resultado si tiene menos de stats_ttl segundos, o la
+                   tabla lateral de contadores si existe, y en otro caso la pasada completa.
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+
+        if not fresh:
+            cached = self._stats.cached(table_name)
+            if cached is not None:
+                return cached
+
+        row = None
+        if self._stats.use_side_table(table_name, fresh):
+            # Existencia de la tabla lateral y resumen en un solo round trip
+            results = self.execute_pipeline(genai_stats_side_operations(table_name), continue_on_error=True)
+            row = self._stats.side_table_row(table_name, *results)
+
+        if row is None:
+            row = self.execute_query(genai_stats_statement(table_name))[0]
+        return self._stats.store(table_name, genai_stats_from_row(row))
+
+    # ==================== SNAPSHOTS ====================
+
+    def _has_column(self, table_name: str, column: str) -> bool:
+        """Indicar si la tabla tiene la columna"""
+        rows = self.execute_query("""
+            SELECT COUNT(*) FROM user_tab_columns
+            WHERE table_name = UPPER(:1) AND column_name = UPPER(:2)
+        """, [table_name, column])
+        return rows[0][0] > 0
+
+    @workload_route('ingest')
+    def export_collection(self, table_name: str, path: str,
+                          batch_size: int = 5000) -> Dict[str, Any]:
+        """
+        Exportar una tabla GenAI a un snapshot columnar en el directorio path
+
+        - vectors.f32: bloque contiguo float32 (filas, dim), legible con np.memmap
+          (vectors.u8 con los bits empaquetados si la columna es BINARY)
+        - columns.parquet: docid, body, title, url, chunk_id, page_numbers, metadata
+          (JSON) y content_hash, un row group por batch, en el mismo orden
+        - manifest.json: formato, dimensiones y filas; se escribe al final, de modo
+          que un directorio sin manifest es un snapshot incompleto
+
+        La memoria queda acotada por batch_size. Requiere pyarrow.
+
+        Returns:
+            Filas, bytes escritos, segundos, filas/s y MB/s
+        """
+        pyarrow, parquet = import_pyarrow()
+        schema = snapshot_schema()
+        os.makedirs(path, exist_ok=True)
+        manifest_path = os.path.join(path, SNAPSHOT_MANIFEST)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+
+        has_hash = self._has_column(table_name, 'content_hash')
+        columns = SNAPSHOT_COLUMNS if has_hash else SNAPSHOT_COLUMNS[:-1]
+        query = f"SELECT {', '.join(columns)}, vector FROM {table_name} ORDER BY id"
+
+        start = time.perf_counter()
+        rows = 0
+        width = 0
+        vector_format = self.vector_format
+        vectors_out = None
+        writer = parquet.ParquetWriter(os.path.join(path, SNAPSHOT_COLUMNS_FILE), schema)
+        try:
+            for df, matrix in self.iter_vector_batches(query, batch_size=batch_size):
+                if vectors_out is None:
+                    vector_format = NUMPY_VECTOR_FORMATS[matrix.dtype.name]
+                    vector_file, dtype = snapshot_vector_file(vector_format)
+                    vectors_out = open(os.path.join(path, vector_file), 'wb')
+                    width = matrix.shape[1]
+                vectors_out.write(np.ascontiguousarray(matrix, dtype=dtype).tobytes())
+
+                df['metadata'] = [value if value is None or isinstance(value, str)
+                                  else json.dumps(value, default=str) for value in df['metadata']]
+                if not has_hash:
+                    df['content_hash'] = None
+                writer.write_table(pyarrow.Table.from_pandas(df[SNAPSHOT_COLUMNS], schema=schema,
+                                                             preserve_index=False))
+                rows += len(df)
+                logger.info(f"Exportación: {rows} filas...")
+        finally:
+            writer.close()
+            if vectors_out is not None:
+                vectors_out.close()
+
+        if vectors_out is None:
+            vector_file, _ = snapshot_vector_file(vector_format)
+            open(os.path.join(path, vector_file), 'wb').close()
+
+        manifest = {
+            'table_name': table_name,
+            'rows': rows,
+            'vector_format': vector_format,
+            'vector_file': vector_file,
+            'vector_width': width,
+            'columns': SNAPSHOT_COLUMNS,
+            'content_hash': has_hash,
+            'exported_at': time.strftime('%Y-%m-%dT%H:%M:%S')
+        }
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+
+        return self._snapshot_report('Exportación', path, rows, time.perf_counter() - start)
+
+    @workload_route('ingest')
+    def import_collection(self, path: str, table_name: str,
+                          batch_size: int = 2000) -> Dict[str, Any]:
+        """
+        Cargar un snapshot de export_collection en una tabla GenAI existente
+
+        Lee columns.parquet por batches y la misma franja del bloque de vectores
+        (np.memmap), y carga cada batch por direct path (o INSERT /*+ APPEND_VALUES */
+        con array binds) en su propia transacción. content_hash se conserva si la tabla
+        destino tiene la columna, de modo que la ingesta idempotente posterior no vuelve
+        a vectorizar los chunks importados. Requiere pyarrow.
+
+        Returns:
+            Filas, bytes leídos, segundos, filas/s, MB/s y el método de carga
+        """
+        _, parquet = import_pyarrow()
+        manifest_path = os.path.join(path, SNAPSHOT_MANIFEST)
+        if not os.path.exists(manifest_path):
+            raise ValueError(f"'{path}' no es un snapshot completo (falta {SNAPSHOT_MANIFEST})")
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+
+        source_format = manifest['vector_format']
+        if (source_format == 'BINARY') != (self.vector_format == 'BINARY'):
+            raise ValueError(f"El snapshot es {source_format} y la conexión usa {self.vector_format}: "
+                             f"los vectores BINARY no se pueden convertir")
+
+        start = time.perf_counter()
+        if manifest['rows'] == 0:
+            return self._snapshot_report('Importación', path, 0, 0.0)
+
+        _, dtype = snapshot_vector_file(source_format)
+        vectors = np.memmap(os.path.join(path, manifest['vector_file']), dtype=dtype, mode='r',
+                            shape=(manifest['rows'], manifest['vector_width']))
+        # Los INT8 se guardan como float32 exactos: se devuelven a enteros para no reescalarlos
+        vector_dtype = np.int8 if source_format == 'INT8' else dtype
+        with_hash = manifest['content_hash'] and self._has_column(table_name, 'content_hash')
+
+        def batches():
+            offset = 0
+            columns_file = parquet.ParquetFile(os.path.join(path, SNAPSHOT_COLUMNS_FILE))
+            for record_batch in columns_file.iter_batches(batch_size=batch_size):
+                records = record_batch.to_pylist()
+                block = np.asarray(vectors[offset:offset + len(records)]).astype(vector_dtype)
+                for record, vector in zip(records, block):
+                    record['vector'] = vector
+                    record['body'] = record['body'] or ''
+                offset += len(records)
+                yield records
+
+        loaded, method = self._direct_load_batches(batches(), table_name, with_hash)
+        report = self._snapshot_report('Importación', path, loaded, time.perf_counter() - start)
+        report['method'] = method
+        if loaded < manifest['rows']:
+            logger.warning(f"Importadas {loaded} de {manifest['rows']} filas del snapshot")
+        return report
+
+    @staticmethod
+    def _snapshot_report(operation: str, path: str, rows: int, elapsed: float) -> Dict[str, Any]:
+        """Throughput de una exportación o importación (bytes = tamaño del snapshot)"""
+        size = sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+        report = {
+            'rows': rows,
+            'bytes': size,
+            'seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else 0.0,
+            'mb_per_second': size / 1024 ** 2 / elapsed if elapsed > 0 else 0.0
+        }
+        logger.info(f"✓ {operation} '{path}': {rows} filas, {size / 1024 ** 2:.1f} MB en {elapsed:.2f}s "
+                    f"({report['rows_per_second']:.0f} filas/s, {report['mb_per_second']:.1f} MB/s)")
+        return report
 
+    @workload_route('search')
     def vector_similarity_search(self, table_name: str, query_vector: List[float],
                                  top_k: int = 5, distance_metric: str = 'COSINE',
                                  return_columns: List[str] = None) -> pd.DataFrame:
@@ -355,7 +3063,7 @@ class OracleADBConnection:
 
         query = f"""
             SELECT {columns_str},
-                   VECTOR_DISTANCE(vector, :1, {distance_metric}) as distance
+                   VECTOR_DISTANCE(vector, :1, {validate_distance_metric(distance_metric)}) as distance
             FROM {table_name}
             ORDER BY distance
             FETCH FIRST :2 ROWS ONLY
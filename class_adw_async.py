@@ -0,0 +1,485 @@
+import oracledb
+import pandas as pd
+from typing import List, Dict, Any, Optional, Callable
+from contextlib import asynccontextmanager
+import logging
+import time
+
+from class_cache import SearchResultCache
+from class_adw import (build_workload_dsns, resolve_workload, DEFAULT_WORKLOAD,
+                       genai_bulk_insert_statement, genai_bulk_input_sizes,
+                       genai_bulk_rows, log_batch_errors, genai_search_statement, genai_search_params,
+                       genai_stats_statement, genai_stats_from_row, genai_stats_table_name,
+                       genai_stats_deltas, genai_stats_merge_statement, genai_stats_retry_rows,
+                       genai_stats_side_operations, genai_stats_table_ddl,
+                       genai_stats_rebuild_statement, GenAIStatsState, STATS_TABLE_EXISTS_QUERY,
+                       normalize_pipeline_operations, build_pipeline, pipeline_result_value,
+                       supports_pipelining,
+                       build_output_type_handler, merge_lob_fallback_columns,
+                       validate_vector_format, resolve_distance_metric,
+                       keyword_text_query, genai_hybrid_search_statement,
+                       INDEX_EXISTS_QUERY, text_index_name)
+
+# Configurar logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class AsyncOracleADBConnection:
+    """Variante asyncio de OracleADBConnection (python-oracledb en modo Thin)"""
+
+    def __init__(self, user: str, password: str,
+                 host: Optional[str] = None, port: Optional[int] = None,
+                 service_name: Optional[str] = None, dsn: Optional[str] = None,
+                 pool_enabled: bool = True, pool_min: int = 1, pool_max: int = 4,
+                 pool_increment: int = 1, pool_ping_interval: int = 60,
+                 pool_timeout: int = 5000,
+                 session_callback: Optional[Callable] = None,
+                 fetch_lobs_inline: bool = True,
+                 lob_inline_max_size: Optional[int] = 1048576,
+                 vectors_as_numpy: bool = False,
+                 stmtcachesize: int = 50,
+                 stats_ttl: float = 60.0,
+                 workload_services: Optional[Dict[str, str]] = None,
+                 search_cache_enabled: bool = False,
+                 search_cache_max_entries: int = 1024,
+                 search_cache_max_bytes: int = 64 * 1024 * 1024,
+                 search_cache_ttl: Optional[float] = 300.0,
+                 vector_format: str = 'FLOAT32',
+                 pipeline_pool_max: int = 2):
+        """
+        Inicializar conexión asíncrona a Oracle ADB
+
+        Acepta los mismos argumentos que OracleADBConnection (incluido **DB_CONFIG).
+        A diferencia de la clase síncrona, el pool está habilitado por defecto: es lo
+        que acota el número de sesiones cuando miles de búsquedas comparten un event loop.
+        Como en la clase síncrona, las búsquedas usan el servicio de 'search' y la
+        ingesta el de 'ingest' (workload_services), cada uno con su pool.
+        pipeline_pool_max se acepta por compatibilidad con DB_CONFIG: run_pipeline
+        usa los pools de esta clase.
+        """
+        self.user = user
+        self.password = password
+        self.workload_dsns = build_workload_dsns(host, port, service_name, dsn, workload_services)
+        self.dsn = self.workload_dsns[DEFAULT_WORKLOAD]
+
+        self.pool_enabled = pool_enabled
+        self.pool_min = pool_min
+        self.pool_max = pool_max
+        self.pool_increment = pool_increment
+        self.pool_ping_interval = pool_ping_interval
+        self.pool_timeout = pool_timeout
+        self.session_callback = session_callback
+        self.pools = {}
+        self.pool = None
+
+        self.fetch_lobs_inline = fetch_lobs_inline
+        self.lob_inline_max_size = lob_inline_max_size if fetch_lobs_inline else None
+        self.vectors_as_numpy = vectors_as_numpy
+        self.stmtcachesize = stmtcachesize
+        self.stats_ttl = stats_ttl
+        self._stats = GenAIStatsState(stats_ttl)
+        self._text_indexes = {}
+
+        self.search_cache = None
+        if search_cache_enabled:
+            self.search_cache = SearchResultCache(search_cache_max_entries, search_cache_max_bytes,
+                                                  search_cache_ttl)
+
+        self.vector_format = validate_vector_format(vector_format)
+
+    def create_pool(self, workload: str = DEFAULT_WORKLOAD):
+        """Crear el pool asíncrono de una clase de carga (idempotente)"""
+        workload = resolve_workload(workload, self.workload_dsns)
+        if workload not in self.pools:
+            self.pools[workload] = oracledb.create_pool_async(
+                user=self.user,
+                password=self.password,
+                dsn=self.workload_dsns[workload],
+                min=self.pool_min,
+                max=self.pool_max,
+                increment=self.pool_increment,
+                ping_interval=self.pool_ping_interval,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=self.pool_timeout,
+                session_callback=self.session_callback,
+                stmtcachesize=self.stmtcachesize
+            )
+            if workload == DEFAULT_WORKLOAD:
+                self.pool = self.pools[workload]
+            logger.info(f"✓ Pool asíncrono '{workload}' creado (min={self.pool_min}, max={self.pool_max})")
+        return self.pools[workload]
+
+    async def close_pool(self, force: bool = False, workload: Optional[str] = None):
+        """Cerrar el pool asíncrono de una clase de carga, o todos si no se indica"""
+        for name in [workload] if workload else list(self.pools):
+            pool = self.pools.pop(name, None)
+            if pool is not None:
+                await pool.close(force=force)
+                logger.info(f"✓ Pool asíncrono '{name}' cerrado")
+        if DEFAULT_WORKLOAD not in self.pools:
+            self.pool = None
+
+    @asynccontextmanager
+    async def get_connection(self, workload: str = DEFAULT_WORKLOAD):
+        """
+        Context manager asíncrono para manejar conexiones automáticamente
+
+        Args:
+            workload: Clase de carga ('search', 'ingest', ...); las que no tienen
+                      servicio propio usan el por defecto
+        """
+        conn = None
+        try:
+            workload = resolve_workload(workload, self.workload_dsns)
+            if self.pool_enabled:
+                conn = await self.create_pool(workload).acquire()
+            else:
+                conn = await oracledb.connect_async(
+                    user=self.user,
+                    password=self.password,
+                    dsn=self.workload_dsns[workload],
+                    stmtcachesize=self.stmtcachesize
+                )
+            yield conn
+        except oracledb.Error as e:
+            logger.error(f"Error en la conexión: {e}")
+            raise
+        finally:
+            if conn:
+                await conn.close()
+
+    async def run_pipeline(self, operations: List[Any],
+                           continue_on_error: bool = False,
+                           workload: str = DEFAULT_WORKLOAD) -> List[Any]:
+        """
+        Ejecutar varias sentencias independientes en un solo round trip (Oracle 23ai)
+
+        Con servidores anteriores el driver las envía en secuencia; con un driver sin
+        la API de pipelining se ejecutan en secuencia aquí. Mismo formato de
+        operaciones y resultados que OracleADBConnection.execute_pipeline.
+        """
+        operations = normalize_pipeline_operations(operations)
+        results = await self._run_operations(operations, continue_on_error, workload)
+        for kind, sql, _ in operations:
+            if kind == 'execute':
+                self._invalidate_after_dml(sql)
+        return results
+
+    async def _run_operations(self, operations: List[Any], continue_on_error: bool,
+                              workload: str) -> List[Any]:
+        """Ejecutar operaciones normalizadas sobre una conexión del pool de la carga"""
+        async with self.get_connection(workload) as conn:
+            if supports_pipelining():
+                results = await conn.run_pipeline(build_pipeline(operations),
+                                                  continue_on_error=continue_on_error)
+                return [pipeline_result_value(kind, result)
+                        for (kind, _, _), result in zip(operations, results)]
+
+            results = []
+            cursor = conn.cursor()
+            for kind, sql, params in operations:
+                try:
+                    if kind == 'commit':
+                        await conn.commit()
+                        results.append(None)
+                        continue
+
+                    await cursor.execute(sql, params or [])
+                    if kind == 'fetchall':
+                        results.append(await cursor.fetchall())
+                    elif kind == 'fetchone':
+                        results.append(await cursor.fetchone())
+                    else:
+                        results.append(None)
+                except oracledb.Error as e:
+                    if not continue_on_error:
+                        raise
+                    results.append(e)
+            cursor.close()
+            return results
+
+    def _configure_cursor(self, cursor, inline_lobs: bool = False):
+        """Instalar los output type handlers habilitados en el cursor"""
+        handler = build_output_type_handler(inline_lobs and self.fetch_lobs_inline,
+                                            self.vectors_as_numpy)
+        if handler is not None:
+            cursor.outputtypehandler = handler
+
+    async def execute_query(self, query: str, params: Optional[Dict] = None) -> List[tuple]:
+        """Ejecutar una consulta SELECT (servicio de búsqueda)"""
+        async with self.get_connection('search') as conn:
+            cursor = conn.cursor()
+            self._configure_cursor(cursor)
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+            results = await cursor.fetchall()
+            cursor.close()
+            return results
+
+    async def execute_query_df(self, query: str, params: Optional[Dict] = None) -> pd.DataFrame:
+        """Ejecutar consulta y retornar DataFrame (servicio de búsqueda)"""
+        async with self.get_connection('search') as conn:
+            cursor = conn.cursor()
+            self._configure_cursor(cursor, inline_lobs=True)
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+
+            columns = [col[0].lower() for col in cursor.description]
+            results = []
+
+            for row in await cursor.fetchall():
+                row_data = []
+                for item in row:
+                    if hasattr(item, 'read'):
+                        row_data.append(await item.read())
+                    else:
+                        row_data.append(item)
+                results.append(tuple(row_data))
+
+            cursor.close()
+            return merge_lob_fallback_columns(pd.DataFrame(results, columns=columns))
+
+    async def execute_dml(self, query: str, params: Optional[Dict] = None, commit: bool = True) -> int:
+        """Ejecutar INSERT, UPDATE, DELETE (servicio de ingesta)"""
+        async with self.get_connection('ingest') as conn:
+            cursor = conn.cursor()
+            if params:
+                await cursor.execute(query, params)
+            else:
+                await cursor.execute(query)
+
+            rows_affected = cursor.rowcount
+
+            if commit:
+                await conn.commit()
+
+            cursor.close()
+
+        self._invalidate_after_dml(query)
+        return rows_affected
+
+    def _invalidate_after_dml(self, statement: str):
+        """
+        Invalidar las estadísticas y la caché de búsquedas de la tabla modificada
+        (ver OracleADBConnection._invalidate_after_dml); solo en esta instancia
+        """
+        target = self._stats.after_dml(statement)
+        if target is None:
+            return
+        verb, table = target
+        if self.search_cache is not None:
+            self.search_cache.bump_generation(table)
+        if verb == 'DROP':
+            self._text_indexes.pop(table, None)
+
+    # ==================== FUNCIONES VECTORIALES GENAI ====================
+
+    async def bulk_insert_genai(self, documents: List[Dict[str, Any]],
+                                table_name: str = None,
+                                batch_size: int = 100) -> int:
+        """Inserción masiva de documentos en formato GenAI"""
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+
+        total_inserted = 0
+
+        async with self.get_connection('ingest') as conn:
+            cursor = conn.cursor()
+
+            query = genai_bulk_insert_statement(table_name)
+
+            for i in range(0, len(documents), batch_size):
+                batch = documents[i:i + batch_size]
+                rows, bound_docs = genai_bulk_rows(batch, self.vector_format)
+
+                if rows:
+                    cursor.setinputsizes(*genai_bulk_input_sizes())
+                    await cursor.executemany(query, rows, batcherrors=True)
+                    batch_errors = cursor.getbatcherrors()
+                    log_batch_errors(batch_errors, bound_docs)
+                    total_inserted += len(rows) - len(batch_errors)
+
+                    failed = {error.offset for error in batch_errors}
+                    await self._update_source_stats(conn, table_name,
+                                                    [d for n, d in enumerate(bound_docs) if n not in failed])
+
+                await conn.commit()
+                if self.search_cache is not None:
+                    self.search_cache.bump_generation(table_name)
+                logger.info(f"Batch {i // batch_size + 1}: {len(batch)} documentos procesados")
+
+            cursor.close()
+
+        logger.info(f"✓ Total insertado: {total_inserted} documentos")
+        return total_inserted
+
+    async def _update_source_stats(self, conn, table_name: str, documents: List[Dict[str, Any]]):
+        """Acumular contadores por archivo fuente en la misma transacción del INSERT"""
+        if not documents:
+            return
+
+        self._stats.forget(table_name)
+        cursor = conn.cursor()
+        exists = self._stats.side_table(table_name)
+        if exists is None:
+            await cursor.execute(STATS_TABLE_EXISTS_QUERY, [genai_stats_table_name(table_name)])
+            exists = (await cursor.fetchone())[0] > 0
+            self._stats.set_side_table(table_name, exists)
+
+        deltas = genai_stats_deltas(documents)
+        if exists and deltas:
+            statement = genai_stats_merge_statement(table_name)
+            await cursor.executemany(statement, deltas, batcherrors=True)
+            retry = genai_stats_retry_rows(cursor.getbatcherrors(), deltas)
+            if retry:
+                # Otra sesión insertó a la vez el mismo archivo fuente: el MERGE repetido actualiza
+                await cursor.executemany(statement, retry)
+        cursor.close()
+
+    async def vector_similarity_search_genai(self, query_vector: List[float],
+                                             top_k: int = 5,
+                                             distance_metric: str = 'COSINE',
+                                             filter_conditions: str = None,
+                                             table_name: str = None,
+                                             filters: Optional[Dict[str, Any]] = None,
+                                             approximate: bool = False,
+                                             target_accuracy: Optional[int] = None) -> pd.DataFrame:
+        """Búsqueda por similitud vectorial en tabla GenAI (ver compile_genai_filters)"""
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if target_accuracy is not None and not approximate:
+            raise ValueError("target_accuracy solo aplica con approximate=True")
+
+        distance_metric = resolve_distance_metric(distance_metric, self.vector_format)
+        where_clause, params = genai_search_params(query_vector, top_k, filter_conditions,
+                                                   filters, target_accuracy, self.vector_format,
+                                                   distance_metric)
+        query = genai_search_statement(distance_metric, where_clause, table_name,
+                                       self.lob_inline_max_size, approximate, target_accuracy)
+
+        return await self._cached_search(table_name, query, params)
+
+    async def hybrid_search_genai(self, query_text: str, query_vector: List[float],
+                                  top_k: int = 5,
+                                  distance_metric: str = 'COSINE',
+                                  table_name: str = None,
+                                  filters: Optional[Dict[str, Any]] = None,
+                                  approximate: bool = False,
+                                  target_accuracy: Optional[int] = None,
+                                  candidates: Optional[int] = None,
+                                  rrf_k: int = 60) -> pd.DataFrame:
+        """Búsqueda híbrida con fusión por reciprocal rank (ver OracleADBConnection.hybrid_search_genai)"""
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if target_accuracy is not None and not approximate:
+            raise ValueError("target_accuracy solo aplica con approximate=True")
+
+        text_query = keyword_text_query(query_text)
+        if text_query is None:
+            logger.warning("La consulta no tiene términos para Oracle Text; búsqueda solo vectorial")
+        if text_query is None or not await self._has_text_index(table_name):
+            return await self.vector_similarity_search_genai(query_vector, top_k, distance_metric,
+                                                             table_name=table_name, filters=filters,
+                                                             approximate=approximate,
+                                                             target_accuracy=target_accuracy)
+
+        distance_metric = resolve_distance_metric(distance_metric, self.vector_format)
+        where_clause, params = genai_search_params(query_vector, top_k, None, filters,
+                                                   target_accuracy, self.vector_format,
+                                                   distance_metric)
+        params['text_query'] = text_query
+        params['candidates'] = candidates or max(4 * top_k, 20)
+        params['rrf_k'] = rrf_k
+        query = genai_hybrid_search_statement(distance_metric, where_clause, table_name,
+                                              self.lob_inline_max_size, approximate, target_accuracy)
+        return await self._cached_search(table_name, query, params)
+
+    async def _has_text_index(self, table_name: str) -> bool:
+        """Indicar si existe el índice Oracle Text (ver OracleADBConnection._has_text_index)"""
+        key = table_name.lower()
+        cached = self._text_indexes.get(key)
+        if cached is not None and (cached[0] or time.monotonic() - cached[1] < self.stats_ttl):
+            return cached[0]
+
+        rows = await self.execute_query(INDEX_EXISTS_QUERY, [text_index_name(table_name)])
+        exists = rows[0][0] > 0
+        self._text_indexes[key] = (exists, time.monotonic())
+        if not exists:
+            logger.warning(f"'{table_name}' no tiene el índice de texto '{text_index_name(table_name)}' "
+                           f"(create_text_index): hybrid_search_genai hará la búsqueda solo vectorial")
+        return exists
+
+    async def _cached_search(self, table_name: str, query: str, params: Dict[str, Any]) -> pd.DataFrame:
+        """Ejecutar una búsqueda pasando por la caché de resultados (si está habilitada)"""
+        if self.search_cache is None:
+            return await self.execute_query_df(query, params)
+
+        binds = {name: value for name, value in params.items() if name != 'query_vector'}
+        key = SearchResultCache.make_key(table_name, params['query_vector'], query=query, binds=binds)
+        cached = self.search_cache.get(key, table_name)
+        if cached is not None:
+            return cached
+
+        generation = self.search_cache.generation(table_name)
+        result = await self.execute_query_df(query, params)
+        self.search_cache.put(key, table_name, result, generation)
+        return result
+
+    async def get_genai_stats(self, table_name: str = None, fresh: bool = False) -> Dict[str, Any]:
+        """
+        Obtener estadísticas de la tabla GenAI
+
+        Args:
+            fresh: Igual que en OracleADBConnection.get_genai_stats: con False se usa el
+                   último resultado (stats_ttl) o la tabla lateral, consultada con su
+                   existencia en un solo pipeline
+        """
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+
+        if not fresh:
+            cached = self._stats.cached(table_name)
+            if cached is not None:
+                return cached
+
+        row = None
+        if self._stats.use_side_table(table_name, fresh):
+            results = await self.run_pipeline(genai_stats_side_operations(table_name),
+                                              continue_on_error=True, workload='search')
+            row = self._stats.side_table_row(table_name, *results)
+
+        if row is None:
+            async with self.get_connection('search') as conn:
+                cursor = conn.cursor()
+                await cursor.execute(genai_stats_statement(table_name))
+                row = await cursor.fetchone()
+                cursor.close()
+        return self._stats.store(table_name, genai_stats_from_row(row))
+
+    async def create_genai_stats_table(self, table_name: str, rebuild: bool = True):
+        """Crear la tabla lateral de contadores por archivo fuente y (opcionalmente) poblarla"""
+        await self.execute_dml(genai_stats_table_ddl(table_name))
+        self._stats.set_side_table(table_name, True)
+        self._stats.mark_rebuilt(table_name)
+        logger.info(f"✓ Tabla de estadísticas '{genai_stats_table_name(table_name)}' creada")
+        if rebuild:
+            await self.rebuild_genai_stats(table_name)
+
+    async def rebuild_genai_stats(self, table_name: str) -> int:
+        """Recalcular la tabla lateral desde la tabla GenAI (una pasada)"""
+        async with self.get_connection('ingest') as conn:
+            cursor = conn.cursor()
+            await cursor.execute(f"DELETE FROM {genai_stats_table_name(table_name)}")
+            await cursor.execute(genai_stats_rebuild_statement(table_name))
+            sources = cursor.rowcount
+            await conn.commit()
+            cursor.close()
+
+        self._stats.mark_rebuilt(table_name)
+        logger.info(f"✓ Estadísticas recalculadas: {sources} archivos fuente")
+        return sources
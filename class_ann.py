@@ -0,0 +1,386 @@
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import logging
+
+from class_adw import validate_distance_metric
+from class_local import LOCAL_DISTANCE_METRICS, top_k_distances
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PQ_CENTROIDS = 256  # Un byte (uint8) por subespacio
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Filas con norma 1 (las filas nulas se dejan en cero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def assign_nearest(vectors: np.ndarray, centroids: np.ndarray, spherical: bool = False,
+                   block_rows: int = 65536) -> np.ndarray:
+    """Centroide más cercano de cada vector (euclídeo, o máximo producto escalar si spherical)"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    centroid_norms = (centroids ** 2).sum(axis=1)
+    for start in range(0, len(vectors), block_rows):
+        block = np.asarray(vectors[start:start + block_rows], dtype=np.float32)
+        products = block @ centroids.T
+        if spherical:
+            assignments[start:start + block_rows] = products.argmax(axis=1)
+        else:
+            assignments[start:start + block_rows] = (centroid_norms[None, :] - 2 * products).argmin(axis=1)
+    return assignments
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 20, spherical: bool = False,
+           seed: int = 0) -> np.ndarray:
+    """
+    k-means (Lloyd) con NumPy; devuelve los centroides (k, dim) en float32
+
+    Con spherical=True los vectores y centroides se normalizan (k-means esférico,
+    adecuado para la distancia coseno). Los clusters vacíos se vuelven a sembrar
+    con un vector al azar.
+    """
+    rng = np.random.default_rng(seed)
+    data = np.asarray(vectors, dtype=np.float32)
+    if spherical:
+        data = normalize_rows(data)
+    k = min(k, len(data))
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = assign_nearest(data, centroids, spherical)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, data)
+        counts = np.bincount(assignments, minlength=k)
+
+        empty = counts == 0
+        centroids = sums / np.maximum(counts, 1)[:, None]
+        if empty.any():
+            centroids[empty] = data[rng.choice(len(data), int(empty.sum()), replace=False)]
+        if spherical:
+            centroids = normalize_rows(centroids)
+
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """
+    Índice IVF en memoria: cuantizador grueso k-means y listas invertidas de posiciones
+
+    Las posiciones son las filas de la matriz interna, en orden de inserción. Un
+    vector borrado queda marcado y deja de devolverse; compact() reconstruye sin
+    ellos. La búsqueda visita las nprobe listas más cercanas y calcula la distancia
+    exacta solo sobre sus vectores.
+    """
+
+    def __init__(self, dimensions: int, nlist: int = 256, nprobe: int = 8,
+                 distance_metric: str = 'COSINE'):
+        self.dimensions = dimensions
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.distance_metric = distance_metric.upper()
+        self.spherical = self.distance_metric == 'COSINE'
+        self.centroids = None
+        self.trained_size = 0
+
+        self._vectors = np.empty((0, dimensions), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._size = 0
+        self._lists = []
+        self._list_arrays = []
+
+    @property
+    def size(self) -> int:
+        """Posiciones ocupadas (incluidas las borradas)"""
+        return self._size
+
+    @property
+    def alive_count(self) -> int:
+        return int(self._alive[:self._size].sum())
+
+    def alive_positions(self) -> np.ndarray:
+        """Posiciones no borradas, en orden de inserción"""
+        return np.flatnonzero(self._alive[:self._size])
+
+    def vectors(self, positions: np.ndarray) -> np.ndarray:
+        """Copia de los vectores de las posiciones indicadas"""
+        return self._vectors[:self._size][np.asarray(positions, dtype=np.int64)]
+
+    def train(self, sample: np.ndarray, iterations: int = 20, seed: int = 0):
+        """Entrenar el cuantizador grueso y reasignar los vectores existentes"""
+        self.centroids = kmeans(sample, self.nlist, iterations, self.spherical, seed)
+        self.nlist = len(self.centroids)
+        self.trained_size = self.alive_count or len(sample)
+        self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        self._assignments[:self._size] = assign_nearest(self._vectors[:self._size], self.centroids,
+                                                        self.spherical) if self._size else []
+        self._lists = [[] for _ in range(self.nlist)]
+        for position in self.alive_positions():
+            self._lists[self._assignments[position]].append(int(position))
+        self._list_arrays = [None] * self.nlist
+
+    def _grow(self, needed: int):
+        capacity = len(self._vectors)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity, 1024)
+        for name, shape in (('_vectors', (capacity, self.dimensions)), ('_norms', (capacity,)),
+                            ('_alive', (capacity,)), ('_assignments', (capacity,))):
+            current = getattr(self, name)
+            grown = np.zeros(shape, dtype=current.dtype)
+            grown[:self._size] = current[:self._size]
+            setattr(self, name, grown)
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Añadir vectores; devuelve sus posiciones"""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        start = self._size
+        self._grow(start + len(vectors))
+        positions = np.arange(start, start + len(vectors))
+
+        self._vectors[positions] = vectors
+        self._norms[positions] = np.linalg.norm(vectors, axis=1)
+        self._alive[positions] = True
+        self._size += len(vectors)
+
+        if self.centroids is not None and len(vectors):
+            assignments = assign_nearest(vectors, self.centroids, self.spherical)
+            self._assignments[positions] = assignments
+            for position, cluster in zip(positions.tolist(), assignments.tolist()):
+                self._lists[cluster].append(position)
+                self._list_arrays[cluster] = None
+        return positions
+
+    def remove(self, positions: List[int]):
+        """
+        Marcar posiciones como borradas
+
+        Cada lista afectada se reconstruye una sola vez por llamada: conviene pasar
+        todas las posiciones de un lote juntas.
+        """
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        positions = positions[self._alive[positions]]
+        if not len(positions):
+            return
+        self._alive[positions] = False
+        if self.centroids is None:
+            return
+        for cluster in np.unique(self._assignments[positions]).tolist():
+            self._lists[cluster] = [p for p in self._lists[cluster] if self._alive[p]]
+            self._list_arrays[cluster] = None
+
+    def compact(self) -> np.ndarray:
+        """
+        Eliminar las posiciones borradas (sin reentrenar)
+
+        Returns:
+            Posiciones anteriores de las que quedan, en el nuevo orden
+        """
+        kept = self.alive_positions()
+        vectors = self.vectors(kept)
+        self._size = 0
+        self._vectors = np.empty((0, self.dimensions), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._alive = np.empty(0, dtype=bool)
+        self._assignments = np.empty(0, dtype=np.int32)
+        if self.centroids is not None:
+            self._lists = [[] for _ in range(self.nlist)]
+            self._list_arrays = [None] * self.nlist
+        self.add(vectors)
+        return kept
+
+    def _list_array(self, cluster: int) -> np.ndarray:
+        if self._list_arrays[cluster] is None:
+            self._list_arrays[cluster] = np.asarray(self._lists[cluster], dtype=np.int64)
+        return self._list_arrays[cluster]
+
+    def candidates(self, query: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """Posiciones vivas de las nprobe listas más cercanas a la consulta"""
+        if self.centroids is None:
+            return self.alive_positions()
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        query = np.asarray(query, dtype=np.float32)
+        if self.spherical:
+            scores = -(self.centroids @ query)
+        else:
+            scores = ((self.centroids - query) ** 2).sum(axis=1)
+        probed = np.argpartition(scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self._list_array(c) for c in probed])
+
+    def search(self, query: np.ndarray, top_k: int = 5, nprobe: Optional[int] = None,
+               candidate_filter: Optional[Callable[[np.ndarray], np.ndarray]] = None
+               ) -> List[Tuple[int, float]]:
+        """
+        Top-k aproximado para una consulta
+
+        Args:
+            nprobe: Listas visitadas (más listas, más recall y más latencia)
+            candidate_filter: Función posiciones -> máscara bool, evaluada solo sobre
+                              los candidatos de las listas visitadas
+
+        Returns:
+            Lista de (posición, distancia) ordenada por distancia
+        """
+        positions = self.candidates(query, nprobe)
+        if candidate_filter is not None and len(positions):
+            positions = positions[candidate_filter(positions)]
+        if not len(positions):
+            return []
+
+        hits = top_k_distances(self._vectors[positions], self._norms[positions], query, top_k,
+                               self.distance_metric)[0]
+        return [(int(positions[row]), distance) for row, distance in hits]
+
+    def exact_search(self, query: np.ndarray, top_k: int = 5) -> List[Tuple[int, float]]:
+        """Top-k exacto sobre todas las posiciones vivas (referencia para medir el recall)"""
+        positions = self.alive_positions()
+        if not len(positions):
+            return []
+        hits = top_k_distances(self._vectors[positions], self._norms[positions], query, top_k,
+                               self.distance_metric)[0]
+        return [(int(positions[row]), distance) for row, distance in hits]
+
+
+class PQIndex:
+    """
+    Índice de cuantización de producto (PQ) en memoria
+
+    Cada vector se divide en m subespacios y cada subvector se sustituye por el índice
+    (uint8) del centroide más cercano de su codebook: m bytes por vector frente a
+    4 * dim en float32 (memory_bytes suma además los codebooks). La búsqueda usa
+    distancias asimétricas (ADC): la consulta sin cuantizar frente a los códigos, con
+    una tabla (m, 256) por consulta y una suma de m búsquedas por vector.
+    """
+
+    def __init__(self, dimensions: int, m: Optional[int] = None,
+                 distance_metric: str = 'COSINE'):
+        """
+        Args:
+            m: Subespacios (bytes por vector); debe dividir a dimensions. Por defecto dim // 8
+        """
+        self.dimensions = dimensions
+        self.m = m or max(1, dimensions // 8)
+        if dimensions % self.m:
+            raise ValueError(f"m={self.m} debe dividir a las {dimensions} dimensiones")
+        self.dsub = dimensions // self.m
+        self.distance_metric = validate_distance_metric(distance_metric)
+        if self.distance_metric not in LOCAL_DISTANCE_METRICS:
+            raise ValueError(f"Métrica no soportada en el índice PQ: {self.distance_metric}")
+        self.normalize = self.distance_metric == 'COSINE'
+        self.codebooks = None
+
+        self._codes = np.empty((0, self.m), dtype=np.uint8)
+        self._size = 0
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Códigos (n, m) uint8 contiguos"""
+        return self._codes[:self._size]
+
+    @property
+    def memory_bytes(self) -> int:
+        """Memoria de códigos y codebooks"""
+        codebooks = self.codebooks.nbytes if self.codebooks is not None else 0
+        return self._size * self.m + codebooks
+
+    def _prepare(self, vectors: np.ndarray) -> np.ndarray:
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dimensions)
+        return normalize_rows(vectors) if self.normalize else vectors
+
+    def train(self, sample: np.ndarray, iterations: int = 10, seed: int = 0):
+        """
+        Entrenar un codebook de 256 centroides por subespacio (k-means euclídeo)
+
+        El coste es proporcional a filas * 256 * m por iteración: unas decenas de miles
+        de vectores de muestra bastan para 256 centroides.
+        """
+        data = self._prepare(sample)
+        codebooks = np.empty((self.m, PQ_CENTROIDS, self.dsub), dtype=np.float32)
+        for j in range(self.m):
+            centroids = kmeans(data[:, j * self.dsub:(j + 1) * self.dsub], PQ_CENTROIDS, iterations,
+                               seed=seed + j)
+            # Con menos de 256 vectores de muestra se repiten centroides (códigos no usados)
+            codebooks[j] = centroids[np.arange(PQ_CENTROIDS) % len(centroids)]
+        self.codebooks = codebooks
+        logger.info(f"PQ entrenado: {self.m} subespacios de {self.dsub} dimensiones, "
+                    f"{len(data)} vectores de muestra")
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Códigos uint8 (n, m) de los vectores"""
+        if self.codebooks is None:
+            raise RuntimeError("El índice PQ no está entrenado")
+        data = self._prepare(vectors)
+        codes = np.empty((len(data), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = assign_nearest(data[:, j * self.dsub:(j + 1) * self.dsub], self.codebooks[j])
+        return codes
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Codificar y añadir vectores; devuelve sus posiciones"""
+        codes = self.encode(vectors)
+        start = self._size
+        if start + len(codes) > len(self._codes):
+            grown = np.empty((max(start + len(codes), 2 * len(self._codes), 1024), self.m), dtype=np.uint8)
+            grown[:start] = self._codes[:start]
+            self._codes = grown
+        self._codes[start:start + len(codes)] = codes
+        self._size += len(codes)
+        return np.arange(start, start + len(codes))
+
+    def lookup_table(self, query: np.ndarray) -> np.ndarray:
+        """Tabla ADC (m, 256): contribución de cada centroide a la distancia de la consulta"""
+        query = self._prepare(query)[0].reshape(self.m, 1, self.dsub)
+        if self.distance_metric in ('COSINE', 'DOT'):
+            return -(self.codebooks * query).sum(axis=2)
+        return ((self.codebooks - query) ** 2).sum(axis=2)
+
+    def distances(self, query: np.ndarray, positions: Optional[np.ndarray] = None,
+                  block_rows: int = 65536) -> np.ndarray:
+        """Distancias aproximadas (ADC) de la consulta a todas las posiciones o a las indicadas"""
+        table = self.lookup_table(query)
+        codes = self.codes if positions is None else self.codes[positions]
+        result = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), block_rows):
+            block = codes[start:start + block_rows]
+            total = np.zeros(len(block), dtype=np.float32)
+            for j in range(self.m):
+                total += table[j, block[:, j]]
+            result[start:start + block_rows] = total
+
+        if self.distance_metric == 'COSINE':
+            result += 1.0
+        elif self.distance_metric == 'EUCLIDEAN':
+            np.sqrt(np.maximum(result, 0), out=result)
+        return result
+
+    def search(self, query: np.ndarray, top_k: int = 5,
+               mask: Optional[np.ndarray] = None) -> List[Tuple[int, float]]:
+        """
+        Top-k aproximado por ADC
+
+        Args:
+            mask: Máscara bool (size,) de posiciones elegibles
+
+        Returns:
+            Lista de (posición, distancia aproximada) ordenada por distancia
+        """
+        positions = np.flatnonzero(mask[:self._size]) if mask is not None else None
+        distances = self.distances(query, positions)
+        if not len(distances):
+            return []
+        k = min(top_k, len(distances))
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best], kind='stable')]
+        rows = positions[best] if positions is not None else best
+        return [(int(row), float(distances[b])) for row, b in zip(rows, best)]
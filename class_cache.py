@@ -0,0 +1,139 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SearchResultCache:
+    """
+    Caché LRU/TTL de resultados de búsqueda vectorial con invalidación por generación
+
+    La generación es un contador en memoria de este proceso (no un marcador del
+    servidor): con varios procesos escribiendo, el TTL acota cuánto tiempo se
+    sirven resultados anteriores a sus ingestas.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024,
+                 ttl: Optional[float] = 300.0):
+        """
+        Inicializar la caché
+
+        Args:
+            max_entries: Número máximo de resultados guardados
+            max_bytes: Memoria máxima (bytes) ocupada por los DataFrames guardados
+            ttl: Segundos de vida de cada resultado (None para no expirar)
+
+        Cada tabla tiene un contador de generación que las inserciones incrementan al
+        hacer commit; un resultado guardado con una generación anterior nunca se sirve.
+        El contador es local al proceso: las ingestas de otros procesos solo se
+        reflejan al expirar el TTL.
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(table_name: str, query_vector, **params) -> str:
+        """Clave: hash de los bytes del vector (float32) más los parámetros de la búsqueda"""
+        digest = hashlib.sha256(np.asarray(query_vector, dtype=np.float32).tobytes())
+        digest.update(table_name.lower().encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def generation(self, table_name: str) -> int:
+        """Generación actual de la tabla"""
+        return self._generations.get(table_name.lower(), 0)
+
+    def bump_generation(self, table_name: str):
+        """Invalidar los resultados de una tabla (llamar tras confirmar datos nuevos)"""
+        table = table_name.lower()
+        with self._lock:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if entry['table'] == table]
+            for key in stale:
+                self._evict(key)
+
+    def get(self, key: str, table_name: str) -> Optional[pd.DataFrame]:
+        """Resultado guardado, o None si no existe, expiró o es de una generación anterior"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expired = self.ttl is not None and time.monotonic() - entry['stored_at'] > self.ttl
+            if expired or entry['generation'] != self.generation(table_name):
+                self._evict(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry['result'].copy()
+
+    def put(self, key: str, table_name: str, result: pd.DataFrame, generation: int):
+        """
+        Guardar un resultado
+
+        generation debe leerse antes de ejecutar la búsqueda: si una ingesta confirma
+        mientras tanto, el resultado queda descartado.
+        """
+        size = int(result.memory_usage(deep=True).sum())
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if generation != self.generation(table_name):
+                return
+            if key in self._entries:
+                self._evict(key)
+
+            self._entries[key] = {
+                'table': table_name.lower(),
+                'result': result.copy(),
+                'generation': generation,
+                'stored_at': time.monotonic(),
+                'size': size
+            }
+            self._bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str):
+        entry = self._entries.pop(key)
+        self._bytes -= entry['size']
+
+    def clear(self):
+        """Vaciar la caché"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Estadísticas de uso de la caché"""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,306 @@
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import oracledb
+
+from class_adw import OracleADBConnection, vector_index_ddl, vector_index_name
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STRATEGY_KEEP = "keep"
+STRATEGY_REBUILD_ONLINE = "rebuild_online"
+STRATEGY_DROP_REBUILD = "drop_rebuild"
+
+INDEX_TYPE_AUTO = "AUTO"
+
+# Vista de estado en memoria de cada organización de índice vectorial
+VECTOR_INDEX_STATUS_VIEWS = {
+    'HNSW': 'v$vector_graph_index',
+    'IVF': 'v$vector_partitions_index'
+}
+
+
+def vector_index_type(organization: Optional[str]) -> Optional[str]:
+    """
+    HNSW o IVF a partir de USER_INDEXES.INDEX_SUBTYPE (INMEMORY_NEIGHBOR_GRAPH_HNSW,
+    NEIGHBOR_PARTITIONS_IVF) o V$VECTOR_INDEX.INDEX_ORGANIZATION; None si no se reconoce
+    """
+    organization = (organization or '').upper()
+    if 'HNSW' in organization or 'GRAPH' in organization:
+        return 'HNSW'
+    if 'IVF' in organization or 'PARTITION' in organization:
+        return 'IVF'
+    return None
+
+
+class VectorIndexManager:
+    """Ciclo de vida del índice vectorial durante la ingesta, sin dejar las búsquedas sin índice"""
+
+    def __init__(self, db: OracleADBConnection, table_name: str,
+                 index_type: str = 'HNSW', distance_metric: str = 'COSINE',
+                 target_accuracy: int = 95, neighbor_partitions: Optional[int] = None,
+                 keep_threshold: float = 0.05, online_threshold: float = 0.5,
+                 dimensions: Optional[int] = None, dim_type: str = 'FLOAT32',
+                 progress_interval: float = 10):
+        """
+        Inicializar el gestor del índice
+
+        Args:
+            index_type: HNSW, IVF o AUTO. Con AUTO se conserva el tipo del índice existente
+                        y, si no hay índice, se usa recommend_vector_index (requiere
+                        dimensions) o HNSW
+            keep_threshold: Hasta esta fracción (delta / filas actuales) el índice se
+                            mantiene solo con el DML de la ingesta
+            online_threshold: Hasta esta fracción se reconstruye en línea tras la ingesta
+                              (DBMS_VECTOR.REBUILD_INDEX), sin dejar de servir búsquedas;
+                              por encima se elimina antes y se recrea después
+            progress_interval: Segundos entre lecturas de progreso durante la creación
+                               o reconstrucción (desde otra sesión)
+        """
+        self.db = db
+        self.table_name = table_name
+        self.index_name = vector_index_name(table_name)
+        self.index_type = index_type.upper()
+        self.distance_metric = distance_metric
+        self.target_accuracy = target_accuracy
+        self.neighbor_partitions = neighbor_partitions
+        self.keep_threshold = keep_threshold
+        self.online_threshold = online_threshold
+        self.dimensions = dimensions
+        self.dim_type = dim_type
+        self.progress_interval = progress_interval
+        self.strategy = None
+
+    def plan(self, delta_rows: int, table_rows: Optional[int] = None) -> str:
+        """Elegir la estrategia según el tamaño del delta relativo a la tabla"""
+        if table_rows is None:
+            table_rows = self.db.get_genai_stats(self.table_name)['total_documents']
+
+        if not self.index_exists():
+            return STRATEGY_DROP_REBUILD
+        if table_rows == 0:
+            return STRATEGY_DROP_REBUILD
+
+        ratio = delta_rows / table_rows
+        if ratio <= self.keep_threshold:
+            return STRATEGY_KEEP
+        if ratio <= self.online_threshold:
+            return STRATEGY_REBUILD_ONLINE
+        return STRATEGY_DROP_REBUILD
+
+    def before_ingest(self, delta_rows: int) -> str:
+        """Preparar el índice para una ingesta de delta_rows filas; devuelve la estrategia"""
+        table_rows = self.db.get_genai_stats(self.table_name)['total_documents']
+        self.resolve_index_type(table_rows + delta_rows)
+        self.strategy = self.plan(delta_rows, table_rows)
+        logger.info(f"Estrategia de índice: {self.strategy} (delta={delta_rows}, filas={table_rows})")
+
+        if self.strategy == STRATEGY_DROP_REBUILD:
+            self.drop_index()
+        return self.strategy
+
+    def after_ingest(self, wait_population: bool = False, timeout: float = 3600,
+                     poll_interval: float = 10) -> Dict[str, Any]:
+        """Completar el ciclo de la estrategia elegida y devolver el estado final del índice"""
+        if self.strategy == STRATEGY_DROP_REBUILD:
+            self.create_index()
+        elif self.strategy == STRATEGY_REBUILD_ONLINE:
+            self.rebuild_online()
+
+        if wait_population:
+            self.wait_until_ready(timeout, poll_interval)
+
+        status = self.index_status()
+        logger.info(f"✓ Índice '{self.index_name}': {status}")
+        return status
+
+    def resolve_index_type(self, expected_rows: int) -> str:
+        """
+        Fijar el tipo del índice que se recreará: con AUTO el del índice existente, o
+        el recomendado para expected_rows si no existe
+        """
+        existing = self.existing_index_type()
+        if self.index_type != INDEX_TYPE_AUTO:
+            if existing and existing != self.index_type:
+                logger.info(f"El índice '{self.index_name}' es {existing}; se recreará como {self.index_type}")
+            return self.index_type
+
+        if existing:
+            self.index_type = existing
+        elif self.dimensions:
+            recommendation = self.db.recommend_vector_index(max(expected_rows, 1), self.dimensions,
+                                                            self.dim_type)
+            self.index_type = recommendation['index_type']
+            self.neighbor_partitions = self.neighbor_partitions or recommendation['neighbor_partitions']
+        else:
+            self.index_type = 'HNSW'
+        logger.info(f"Tipo de índice (AUTO): {self.index_type}"
+                    f"{' (el del índice existente)' if existing else ''}")
+        return self.index_type
+
+    # ==================== OPERACIONES ====================
+
+    def existing_index_type(self) -> Optional[str]:
+        """Tipo (HNSW o IVF) del índice existente, o None si no existe"""
+        try:
+            rows = self.db.execute_query(
+                "SELECT index_subtype FROM user_indexes WHERE index_name = UPPER(:1)", [self.index_name])
+        except oracledb.DatabaseError as e:
+            if 'ORA-00904' not in str(e):  # Sin la columna INDEX_SUBTYPE
+                raise
+            rows = self.db.execute_query(
+                "SELECT COUNT(*) FROM user_indexes WHERE index_name = UPPER(:1)", [self.index_name])
+            rows = [(None,)] if rows[0][0] else []
+        if not rows:
+            return None
+
+        index_type = vector_index_type(rows[0][0])
+        if index_type is None:
+            organization = self.db.execute_query(
+                "SELECT index_organization FROM v$vector_index WHERE index_name = UPPER(:1)",
+                [self.index_name])
+            index_type = vector_index_type(organization[0][0]) if organization else None
+        if index_type is None:
+            raise ValueError(f"No se pudo determinar el tipo del índice vectorial '{self.index_name}'")
+        return index_type
+
+    def index_exists(self) -> bool:
+        """Indicar si el índice vectorial existe"""
+        rows = self.db.execute_query(
+            "SELECT COUNT(*) FROM user_indexes WHERE index_name = UPPER(:1)", [self.index_name])
+        return rows[0][0] > 0
+
+    def drop_index(self):
+        """Eliminar el índice (si existe)"""
+        logger.info(f"Eliminando el índice '{self.index_name}'...")
+        try:
+            self.db.execute_dml(f"DROP INDEX {self.index_name}")
+            logger.info("✓ Índice eliminado correctamente.")
+        except oracledb.DatabaseError as e:
+            if 'ORA-01418' in str(e):  # Index does not exist
+                logger.info("El índice no existía, continuando...")
+            else:
+                raise
+
+    def create_index(self):
+        """Crear el índice con la configuración del gestor"""
+        if self.index_type == INDEX_TYPE_AUTO:
+            self.resolve_index_type(self.db.get_genai_stats(self.table_name)['total_documents'])
+        logger.info(f"Creando el índice '{self.index_name}' ({self.index_type})...")
+        start = time.perf_counter()
+        with self._reporting_progress():
+            self.db.execute_dml(vector_index_ddl(self.table_name, self.index_type, self.distance_metric,
+                                                 self.target_accuracy, self.neighbor_partitions))
+        logger.info(f"✓ Índice creado en {time.perf_counter() - start:.1f}s")
+
+    def rebuild_online(self):
+        """Reconstruir el índice en línea; las búsquedas siguen usando el anterior hasta el cambio"""
+        logger.info(f"Reconstruyendo en línea el índice '{self.index_name}'...")
+        start = time.perf_counter()
+        with self._reporting_progress():
+            self.db.execute_dml("BEGIN DBMS_VECTOR.REBUILD_INDEX(IDX_NAME => :1); END;",
+                                [self.index_name], commit=False)
+        logger.info(f"✓ Índice reconstruido en {time.perf_counter() - start:.1f}s")
+
+    # ==================== ESTADO Y PROGRESO ====================
+
+    @contextmanager
+    def _reporting_progress(self):
+        """
+        Registrar build_progress cada progress_interval segundos mientras dura el bloque
+
+        La sentencia de creación bloquea su sesión: el progreso se lee desde un hilo
+        con otra sesión (del pool o una conexión nueva).
+        """
+        done = threading.Event()
+
+        def report():
+            while not done.wait(self.progress_interval):
+                try:
+                    for op in self.build_progress():
+                        logger.info(f"  {op['opname']}: {op['pct']}% ({op['time_remaining']}s restantes)")
+                except oracledb.Error as e:
+                    logger.warning(f"No se pudo leer el progreso del índice: {e}")
+                    return
+
+        monitor = threading.Thread(target=report, name=f"progress-{self.index_name}", daemon=True)
+        monitor.start()
+        try:
+            yield
+        finally:
+            done.set()
+            monitor.join()
+
+    def build_progress(self) -> List[Dict[str, Any]]:
+        """Operaciones largas en curso sobre la tabla (creación/reconstrucción del índice)"""
+        df = self.db.execute_query_df("""
+            SELECT opname, target, sofar, totalwork, units, elapsed_seconds, time_remaining,
+                   ROUND(100 * sofar / NULLIF(totalwork, 0), 1) as pct
+            FROM v$session_longops
+            WHERE UPPER(target) LIKE '%' || UPPER(:1) || '%' AND sofar < totalwork
+        """, [self.table_name])
+        return df.to_dict('records')
+
+    def index_status(self) -> Dict[str, Any]:
+        """
+        Estado del índice según USER_INDEXES y la vista de su organización:
+        V$VECTOR_GRAPH_INDEX (HNSW) o V$VECTOR_PARTITIONS_INDEX (IVF)
+        """
+        rows = self.db.execute_query(
+            "SELECT status FROM user_indexes WHERE index_name = UPPER(:1)", [self.index_name])
+        status = {
+            'index_name': self.index_name,
+            'exists': bool(rows),
+            'status': rows[0][0] if rows else None,
+            'index_type': self.existing_index_type() if rows else None,
+            'populated_vectors': None,
+            'partitions': None
+        }
+
+        view = VECTOR_INDEX_STATUS_VIEWS.get(status['index_type'])
+        if view:
+            try:
+                df = self.db.execute_query_df(
+                    f"SELECT * FROM {view} WHERE index_name = UPPER(:1)", [self.index_name])
+                if not df.empty and 'num_vectors' in df.columns:
+                    status['populated_vectors'] = int(df['num_vectors'].iloc[0])
+                for column in ('num_centroids', 'num_partitions'):
+                    if not df.empty and column in df.columns:
+                        status['partitions'] = int(df[column].iloc[0])
+                        break
+            except oracledb.DatabaseError as e:
+                logger.warning(f"No se pudo consultar {view.upper()}: {e}")
+
+        return status
+
+    def wait_until_ready(self, timeout: float = 3600, poll_interval: float = 10) -> bool:
+        """
+        Esperar a que el índice esté VALID y, en HNSW, poblado en memoria con todas las filas
+        (IVF vive en tablas: basta con VALID)
+
+        Returns:
+            True si quedó listo antes del timeout
+        """
+        expected = self.db.get_genai_stats(self.table_name, fresh=True)['total_documents']
+        deadline = time.monotonic() + timeout
+
+        while time.monotonic() < deadline:
+            status = self.index_status()
+            populated = status['populated_vectors']
+            ready = status['status'] == 'VALID' and (
+                status['index_type'] != 'HNSW' or (populated is not None and populated >= expected))
+            if ready:
+                logger.info(f"✓ Índice '{self.index_name}' listo ({populated or expected} vectores)")
+                return True
+
+            for op in self.build_progress():
+                logger.info(f"  {op['opname']}: {op['pct']}% ({op['time_remaining']}s restantes)")
+            logger.info(f"Esperando población del índice ({populated or 0}/{expected})...")
+            time.sleep(poll_interval)
+
+        logger.warning(f"El índice '{self.index_name}' no quedó listo en {timeout}s")
+        return False
@@ -0,0 +1,421 @@
+import json
+import operator
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import logging
+
+from class_adw import (OracleADBConnection, FILTERABLE_COLUMNS, RANGE_OPERATORS,
+                       validate_distance_metric, validate_vector_format, source_file_of)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+LOCAL_DISTANCE_METRICS = ('COSINE', 'DOT', 'EUCLIDEAN', 'EUCLIDEAN_SQUARED', 'L2_SQUARED')
+SEARCH_COLUMNS = ['docid', 'body', 'title', 'url', 'chunk_id', 'page_numbers', 'metadata', 'distance']
+RANGE_FUNCTIONS = {'gt': operator.gt, 'gte': operator.ge, 'lt': operator.lt, 'lte': operator.le}
+
+
+def _coerce(actual: Any, operand: Any) -> Any:
+    """Las fechas se guardan como texto ISO: convertirlas al comparar con un datetime"""
+    if isinstance(operand, datetime) and isinstance(actual, str):
+        return datetime.fromisoformat(actual)
+    return actual
+
+
+def _match_condition(actual: Any, expected: Any) -> bool:
+    """Igualdad, IN o rango con la misma semántica que compile_genai_filters"""
+    if isinstance(expected, dict):
+        for op, operand in expected.items():
+            if op not in RANGE_OPERATORS:
+                raise ValueError(f"Operador de rango no soportado: {op}")
+            if actual is None:
+                return False
+            if not RANGE_FUNCTIONS[op](_coerce(actual, operand), operand):
+                return False
+        return True
+    if isinstance(expected, (list, tuple, set)):
+        if not expected:
+            raise ValueError("Lista IN vacía en el filtro")
+        return any(_coerce(actual, value) == value for value in expected)
+    return _coerce(actual, expected) == expected
+
+
+def match_genai_filters(record: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Evaluar en Python un filtro con el formato de compile_genai_filters sobre un documento"""
+    if not filters:
+        return True
+
+    for key, value in filters.items():
+        if key in FILTERABLE_COLUMNS or key == 'id':
+            if not _match_condition(record.get(key), value):
+                return False
+        elif key == 'docid_prefix':
+            if not (record.get('docid') or '').startswith(value):
+                return False
+        elif key == 'metadata':
+            metadata = record.get('metadata') or {}
+            if isinstance(metadata, str):
+                metadata = json.loads(metadata)
+            for path, expected in value.items():
+                actual = metadata
+                for part in path.split('.'):
+                    actual = actual.get(part) if isinstance(actual, dict) else None
+                # JSON_VALUE devuelve texto: se compara como en la base de datos
+                if actual is not None and not isinstance(expected, dict):
+                    actual = str(actual)
+                    expected = [str(v) for v in expected] if isinstance(expected, (list, tuple, set)) \
+                        else str(expected)
+                if not _match_condition(actual, expected):
+                    return False
+        else:
+            raise ValueError(f"Filtro no soportado: {key}")
+    return True
+
+
+def top_k_distances(matrix: np.ndarray, norms: np.ndarray, queries: np.ndarray, top_k: int,
+                    distance_metric: str = 'COSINE', mask: Optional[np.ndarray] = None,
+                    block_rows: int = 65536) -> List[List[tuple]]:
+    """
+    Top-k exacto para varias consultas con productos matriciales por bloques
+
+    Cada bloque de la matriz (memmap) se multiplica por todas las consultas a la vez y
+    se reduce con argpartition, de modo que la memoria queda acotada por block_rows.
+
+    Returns:
+        Por consulta, lista de (fila, distancia) ordenada por distancia
+    """
+    metric = validate_distance_metric(distance_metric)
+    if metric not in LOCAL_DISTANCE_METRICS:
+        raise ValueError(f"Métrica no soportada en el almacén local: {metric}")
+
+    queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+    if top_k <= 0:
+        return [[] for _ in queries]
+    query_norms = np.linalg.norm(queries, axis=1)
+    query_norms[query_norms == 0] = 1.0
+    best = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+
+    for start in range(0, len(matrix), block_rows):
+        block = np.asarray(matrix[start:start + block_rows])
+        products = queries @ block.T
+
+        if metric == 'COSINE':
+            block_norms = np.asarray(norms[start:start + block_rows]).copy()
+            block_norms[block_norms == 0] = 1.0
+            distances = 1.0 - products / (query_norms[:, None] * block_norms[None, :])
+        elif metric == 'DOT':
+            distances = -products
+        else:
+            squared = (queries ** 2).sum(axis=1)[:, None] - 2 * products + \
+                np.asarray(norms[start:start + block_rows])[None, :] ** 2
+            squared = np.maximum(squared, 0)
+            distances = np.sqrt(squared) if metric == 'EUCLIDEAN' else squared
+
+        if mask is not None:
+            distances = np.where(mask[start:start + block_rows][None, :], distances, np.inf)
+
+        k = min(top_k, distances.shape[1])
+        candidates = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        for q in range(len(queries)):
+            rows = candidates[q]
+            values = distances[q, rows]
+            keep = np.isfinite(values)
+            merged_rows = np.concatenate([best[q][0], rows[keep] + start])
+            merged_values = np.concatenate([best[q][1], values[keep]])
+            order = np.argsort(merged_values, kind='stable')[:top_k]
+            best[q] = (merged_rows[order], merged_values[order])
+
+    return [list(zip(rows.tolist(), values.tolist())) for rows, values in best]
+
+
+class LocalVectorStore:
+    """
+    Almacén vectorial local con la misma interfaz de inserción, búsqueda y
+    estadísticas que los métodos GenAI de OracleADBConnection
+
+    Cada tabla es un directorio con:
+        vectors.f32  matriz float32 contigua (n, dim), abierta con np.memmap
+        norms.f32    norma de cada vector (coseno y euclídea sin recalcularla)
+        docs.jsonl   columnas del documento, una línea JSON por fila
+        offsets.i64  posición de cada línea en docs.jsonl (lectura directa por fila)
+        meta.json    dimensiones
+
+    El id de cada fila (filtro 'id', como la columna id de ADB) es su posición desde 1.
+    Los vectores se guardan siempre en float32: solo se admite vector_format FLOAT32.
+
+    Abrir una tabla solo lee meta.json y mapea los archivos: no depende del tamaño.
+    La fila se confirma al escribir su offset, de modo que una escritura interrumpida
+    no deja filas a medias visibles.
+    """
+
+    def __init__(self, path: str, dimensions: Optional[int] = None, block_rows: int = 65536,
+                 vector_format: str = 'FLOAT32'):
+        """
+        Args:
+            path: Directorio raíz (una subcarpeta por tabla)
+            dimensions: Dimensiones de las tablas nuevas (por defecto las del primer vector)
+            block_rows: Filas por bloque en la búsqueda (acota la memoria por consulta)
+            vector_format: Solo FLOAT32; INT8 y BINARY requieren el backend ADB
+        """
+        if validate_vector_format(vector_format) != 'FLOAT32':
+            raise ValueError(f"El almacén local guarda los vectores en float32: vector_format "
+                             f"{vector_format.upper()} solo está disponible con el backend ADB")
+        self.path = path
+        self.dimensions = dimensions
+        self.block_rows = block_rows
+        self._tables = {}
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    # ==================== ARCHIVOS ====================
+
+    def _table_dir(self, table_name: str) -> str:
+        return os.path.join(self.path, table_name.lower())
+
+    def _open(self, table_name: str, dimensions: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Mapear los archivos de una tabla (None si no existe y no se pide crearla)"""
+        table = self._tables.get(table_name.lower())
+        if table is not None:
+            return table
+
+        directory = self._table_dir(table_name)
+        meta_path = os.path.join(directory, 'meta.json')
+        if not os.path.exists(meta_path):
+            if dimensions is None:
+                return None
+            os.makedirs(directory, exist_ok=True)
+            with open(meta_path, 'w', encoding='utf-8') as f:
+                json.dump({'dimensions': int(dimensions)}, f)
+            for name in ('vectors.f32', 'norms.f32', 'docs.jsonl', 'offsets.i64'):
+                open(os.path.join(directory, name), 'ab').close()
+
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+
+        table = {'dir': directory, 'dimensions': meta['dimensions'], 'records': None}
+        self._remap(table)
+        self._tables[table_name.lower()] = table
+        return table
+
+    def _remap(self, table: Dict[str, Any]):
+        """Volver a mapear los archivos tras una escritura"""
+        directory, dim = table['dir'], table['dimensions']
+        count = os.path.getsize(os.path.join(directory, 'offsets.i64')) // 8
+        count = min(count,
+                    os.path.getsize(os.path.join(directory, 'vectors.f32')) // (4 * dim),
+                    os.path.getsize(os.path.join(directory, 'norms.f32')) // 4)
+        table['count'] = count
+        if count == 0:
+            table['vectors'] = np.empty((0, dim), dtype=np.float32)
+            table['norms'] = np.empty(0, dtype=np.float32)
+            table['offsets'] = np.empty(0, dtype=np.int64)
+            return
+        table['vectors'] = np.memmap(os.path.join(directory, 'vectors.f32'), dtype=np.float32,
+                                     mode='r', shape=(count, dim))
+        table['norms'] = np.memmap(os.path.join(directory, 'norms.f32'), dtype=np.float32,
+                                   mode='r', shape=(count,))
+        table['offsets'] = np.memmap(os.path.join(directory, 'offsets.i64'), dtype=np.int64,
+                                     mode='r', shape=(count,))
+
+    def _read_records(self, table: Dict[str, Any], rows: List[int]) -> List[Dict[str, Any]]:
+        """Leer documentos concretos por su offset, sin cargar el sidecar completo"""
+        if table['records'] is not None:
+            return [table['records'][row] for row in rows]
+        records = []
+        with open(os.path.join(table['dir'], 'docs.jsonl'), 'rb') as f:
+            for row in rows:
+                f.seek(int(table['offsets'][row]))
+                records.append(json.loads(f.readline()))
+        return records
+
+    def _all_records(self, table: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Sidecar completo en memoria (solo para filtros y estadísticas; se carga una vez)"""
+        if table['records'] is None:
+            with open(os.path.join(table['dir'], 'docs.jsonl'), 'rb') as f:
+                data = f.read()
+            table['records'] = [json.loads(data[offset:data.index(b'\n', offset)])
+                                for offset in table['offsets'].tolist()]
+            # Tablas escritas antes de guardar el id: es la posición
+            for position, record in enumerate(table['records']):
+                record.setdefault('id', position + 1)
+        return table['records']
+
+    # ==================== INSERCIÓN ====================
+
+    def insert_vector_document_genai(self, docid: str, body: str, vector: List[float],
+                                     title: str = None, url: str = None,
+                                     chunk_id: int = None, page_numbers: str = None,
+                                     metadata: str = None, table_name: str = None) -> int:
+        """Insertar documento con vector embedding en formato GenAI"""
+        return self.bulk_insert_genai([{
+            'docid': docid, 'body': body, 'vector': vector, 'title': title, 'url': url,
+            'chunk_id': chunk_id, 'page_numbers': page_numbers, 'metadata': metadata
+        }], table_name)
+
+    def bulk_insert_genai(self, documents: List[Dict[str, Any]],
+                          table_name: str = None,
+                          batch_size: int = 100) -> int:
+        """Inserción masiva de documentos en formato GenAI (se añaden al final de los archivos)"""
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if not documents:
+            return 0
+
+        total_inserted = 0
+        with self._lock:
+            first = np.asarray(documents[0]['vector'], dtype=np.float32)
+            table = self._open(table_name, self.dimensions or len(first))
+            dim = table['dimensions']
+            directory = table['dir']
+
+            for i in range(0, len(documents), batch_size):
+                vectors, lines = [], []
+                for doc in documents[i:i + batch_size]:
+                    try:
+                        vector = np.asarray(doc['vector'], dtype=np.float32)
+                        if vector.shape != (dim,):
+                            raise ValueError(f"se esperaban {dim} dimensiones, llegaron {vector.size}")
+                        metadata = doc.get('metadata') or None
+                        if isinstance(metadata, str):
+                            metadata = json.loads(metadata)
+                        record = {
+                            'id': table['count'] + len(vectors) + 1,
+                            'docid': doc['docid'],
+                            'body': doc['body'][:4000],
+                            'title': doc.get('title') or None,
+                            'url': doc.get('url') or None,
+                            'chunk_id': doc.get('chunk_id'),
+                            'page_numbers': doc.get('page_numbers') or None,
+                            'metadata': metadata,
+                            'fecha_creacion': datetime.now().isoformat()
+                        }
+                        lines.append(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n')
+                        vectors.append(vector)
+                    except Exception as e:
+                        logger.error(f"Error insertando documento {doc.get('docid', 'unknown')}: {e}")
+
+                if not vectors:
+                    continue
+
+                matrix = np.stack(vectors)
+                with open(os.path.join(directory, 'docs.jsonl'), 'ab') as f:
+                    position = f.tell()
+                    offsets = []
+                    for line in lines:
+                        offsets.append(position)
+                        f.write(line)
+                        position += len(line)
+                # Se descartan los restos de una escritura interrumpida antes de añadir
+                with open(os.path.join(directory, 'vectors.f32'), 'ab') as f:
+                    f.truncate(table['count'] * dim * 4)
+                    f.write(matrix.tobytes())
+                with open(os.path.join(directory, 'norms.f32'), 'ab') as f:
+                    f.truncate(table['count'] * 4)
+                    f.write(np.linalg.norm(matrix, axis=1).astype(np.float32).tobytes())
+                # El offset confirma las filas
+                with open(os.path.join(directory, 'offsets.i64'), 'ab') as f:
+                    f.truncate(table['count'] * 8)
+                    f.write(np.asarray(offsets, dtype=np.int64).tobytes())
+
+                if table['records'] is not None:
+                    table['records'].extend(json.loads(line) for line in lines)
+                table['count'] += len(vectors)
+                total_inserted += len(vectors)
+                logger.info(f"Batch {i // batch_size + 1}: {len(vectors)} documentos procesados")
+
+            self._remap(table)
+
+        logger.info(f"✓ Total insertado: {total_inserted} documentos")
+        return total_inserted
+
+    # ==================== BÚSQUEDA ====================
+
+    def _frame(self, table: Dict[str, Any], hits: List[tuple]) -> pd.DataFrame:
+        """DataFrame con las columnas de OracleADBConnection.vector_similarity_search_genai"""
+        records = self._read_records(table, [row for row, _ in hits]) if hits else []
+        data = [[record.get(c) for c in SEARCH_COLUMNS[:-1]] + [distance]
+                for record, (_, distance) in zip(records, hits)]
+        return pd.DataFrame(data, columns=SEARCH_COLUMNS)
+
+    def _mask(self, table: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        if not filters:
+            return None
+        return np.fromiter((match_genai_filters(record, filters) for record in self._all_records(table)),
+                           dtype=bool, count=table['count'])
+
+    def vector_similarity_search_genai(self, query_vector: List[float],
+                                       top_k: int = 5,
+                                       distance_metric: str = 'COSINE',
+                                       filter_conditions: str = None,
+                                       table_name: str = None,
+                                       filters: Optional[Dict[str, Any]] = None,
+                                       approximate: bool = False,
+                                       target_accuracy: Optional[int] = None) -> pd.DataFrame:
+        """
+        Búsqueda exacta por similitud vectorial (approximate y target_accuracy se aceptan
+        por compatibilidad: la búsqueda local siempre es exacta)
+        """
+        return self.batch_vector_search([query_vector], top_k, distance_metric, table_name,
+                                        filters, filter_conditions=filter_conditions)[0]
+
+    def batch_vector_search(self, query_vectors: List[List[float]],
+                            top_k: int = 5,
+                            distance_metric: str = 'COSINE',
+                            table_name: str = None,
+                            filters: Optional[Dict[str, Any]] = None,
+                            approximate: bool = False,
+                            target_accuracy: Optional[int] = None,
+                            filter_conditions: str = None,
+                            **kwargs) -> Dict[int, pd.DataFrame]:
+        """Búsqueda para varios vectores de consulta en una sola pasada sobre la matriz"""
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+        if filter_conditions:
+            raise ValueError("El almacén local no admite filter_conditions; use 'filters'")
+
+        table = self._open(table_name)
+        if table is None or table['count'] == 0 or not query_vectors:
+            return {i: pd.DataFrame(columns=SEARCH_COLUMNS) for i in range(len(query_vectors))}
+
+        hits = top_k_distances(table['vectors'], table['norms'], query_vectors, top_k,
+                               distance_metric, self._mask(table, filters), self.block_rows)
+        return {i: self._frame(table, query_hits) for i, query_hits in enumerate(hits)}
+
+    # ==================== ESTADÍSTICAS ====================
+
+    def get_genai_stats(self, table_name: str = None, fresh: bool = False) -> Dict[str, Any]:
+        """Obtener estadísticas de la tabla GenAI (mismo formato que OracleADBConnection)"""
+        if table_name is None:
+            raise ValueError("table_name es requerido")
+
+        table = self._open(table_name)
+        records = self._all_records(table) if table else []
+        lengths = [len(record['body']) for record in records]
+        return {
+            'total_documents': len(records),
+            'unique_source_documents': len({source_file_of(r['docid']) for r in records} - {None}),
+            'chunked_documents': sum(1 for r in records if r.get('chunk_id') is not None),
+            'body_avg_length': float(np.mean(lengths)) if lengths else 0,
+            'body_max_length': max(lengths) if lengths else 0,
+            'body_min_length': min(lengths) if lengths else 0
+        }
+
+
+def create_vector_backend(backend: str = 'adb', local_path: str = 'local_store', **db_config):
+    """
+    Crear el backend de búsqueda configurado
+
+    Args:
+        backend: 'adb' (OracleADBConnection con db_config) o 'local' (LocalVectorStore en local_path)
+    """
+    backend = backend.lower()
+    if backend == 'local':
+        return LocalVectorStore(local_path, vector_format=db_config.get('vector_format', 'FLOAT32'))
+    if backend == 'adb':
+        return OracleADBConnection(**db_config)
+    raise ValueError("backend debe ser 'adb' o 'local'")
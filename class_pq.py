@@ -0,0 +1,233 @@
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import logging
+
+from class_adw import OracleADBConnection, IN_LIST_BUCKETS
+from class_ann import PQIndex
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PQ_FILTER_KEYS = ('title', 'docid', 'docid_prefix')
+PQ_RESULT_COLUMNS = ['id', 'docid', 'title', 'distance']
+
+
+def encode_strings(values: List[Optional[str]]) -> np.ndarray:
+    """Textos como array de bytes UTF-8 de ancho fijo (None -> b'')"""
+    return np.array([(value or '').encode('utf-8') for value in values], dtype=np.bytes_)
+
+
+class PQVectorIndex:
+    """
+    Índice PQ comprimido de una tabla GenAI para servir búsquedas desde el proceso
+
+    En memoria solo quedan los códigos uint8 (m bytes por vector), los codebooks y, por
+    fila, el id (int64), el docid (bytes de ancho fijo) y el título como código de un
+    diccionario; body y metadatos se leen de ADB al re-rankear. Los arrays por fila
+    suman a los m bytes de los códigos: la compresión real frente a float32 es la que
+    reporta memory_stats(), menor que 4 * dim / m. Con rerank=True los
+    mejores candidatos por ADC se re-ordenan con la distancia exacta de
+    vector_similarity_search_genai (filtro IN por id, una sola consulta).
+    """
+
+    def __init__(self, db: OracleADBConnection, table_name: str,
+                 m: Optional[int] = None, distance_metric: str = 'COSINE',
+                 batch_size: int = 2000, train_sample: int = 20000):
+        """
+        Args:
+            m: Subespacios PQ (bytes de código por vector); por defecto dim // 8
+            train_sample: Vectores (los primeros de la tabla) usados para entrenar los codebooks
+        """
+        self.db = db
+        self.table_name = table_name
+        self.m = m
+        self.distance_metric = distance_metric.upper()
+        self.batch_size = batch_size
+        self.train_sample = train_sample
+
+        self.index = None
+        self._reset_rows()
+
+    def _reset_rows(self):
+        self.row_ids = np.empty(0, dtype=np.int64)
+        self.docids = np.empty(0, dtype=np.bytes_)
+        self.title_codes = np.empty(0, dtype=np.int32)
+        self.title_values = np.empty(0, dtype=np.bytes_)
+
+    def build(self) -> Dict[str, Any]:
+        """
+        Leer la tabla en streaming, entrenar con las primeras train_sample filas y codificar el resto
+
+        La memoria queda acotada por la muestra de entrenamiento más un batch.
+        """
+        start = time.perf_counter()
+        self.index = None
+        self._reset_rows()
+        pending = []
+        row_ids, docids, title_codes, titles = [], [], [], {}
+
+        query = f"SELECT id, docid, title, vector FROM {self.table_name} ORDER BY id"
+        for df, matrix in self.db.iter_vector_batches(query, batch_size=self.batch_size):
+            row_ids.append(df['id'].to_numpy(dtype=np.int64))
+            docids.append(encode_strings(df['docid'].tolist()))
+            title_codes.append(np.fromiter((titles.setdefault(title or '', len(titles)) for title in df['title']),
+                                           np.int32, len(df)))
+            if self.index is None:
+                pending.append(matrix)
+                if sum(len(p) for p in pending) < self.train_sample:
+                    continue
+                matrix = np.concatenate(pending)
+                pending = []
+                self._train(matrix)
+            self.index.add(matrix)
+            logger.info(f"PQ: {self.index.size} vectores codificados...")
+
+        if pending:
+            sample = np.concatenate(pending)
+            self._train(sample)
+            self.index.add(sample)
+
+        if row_ids:
+            self.row_ids = np.concatenate(row_ids)
+            self.docids = np.concatenate(docids)
+            self.title_codes = np.concatenate(title_codes)
+            self.title_values = encode_strings(list(titles))
+
+        elapsed = time.perf_counter() - start
+        stats = self.memory_stats()
+        logger.info(f"✓ Índice PQ de '{self.table_name}': {stats['rows']} vectores en {elapsed:.1f}s, "
+                    f"{stats['index_bytes'] / 1024 ** 2:.1f} MB ({stats['compression']:.0f}x frente a float32)")
+        return {**stats, 'seconds': elapsed}
+
+    def _train(self, sample: np.ndarray):
+        self.index = PQIndex(sample.shape[1], self.m, self.distance_metric)
+        self.index.train(sample[:self.train_sample])
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """
+        Memoria del índice (códigos + codebooks + id/docid/title por fila) frente a la
+        matriz float32 equivalente
+        """
+        if self.index is None:
+            return {'rows': 0, 'index_bytes': 0, 'float32_bytes': 0, 'compression': None}
+        row_bytes = (self.row_ids.nbytes + self.docids.nbytes + self.title_codes.nbytes
+                     + self.title_values.nbytes)
+        index_bytes = self.index.memory_bytes + row_bytes
+        float32_bytes = self.index.size * self.index.dimensions * 4
+        return {
+            'rows': self.index.size,
+            'bytes_per_vector': self.index.m,
+            'codes_bytes': self.index.memory_bytes,
+            'row_bytes': row_bytes,
+            'index_bytes': index_bytes,
+            'float32_bytes': float32_bytes,
+            'compression': float32_bytes / max(index_bytes, 1)
+        }
+
+    def _mask(self, filters: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Máscara de filas elegibles; solo title, docid y docid_prefix se evalúan en memoria"""
+        if not filters:
+            return None
+        unsupported = set(filters) - set(PQ_FILTER_KEYS)
+        if unsupported:
+            raise ValueError(f"El índice PQ solo filtra por {', '.join(PQ_FILTER_KEYS)}: {sorted(unsupported)}")
+
+        mask = np.ones(len(self.docids), dtype=bool)
+        for key in ('title', 'docid'):
+            if key in filters:
+                value = filters[key]
+                allowed = encode_strings([value] if isinstance(value, str) else list(value))
+                if key == 'title':
+                    codes = np.flatnonzero(np.isin(self.title_values, allowed))
+                    mask &= np.isin(self.title_codes, codes)
+                else:
+                    mask &= np.isin(self.docids, allowed)
+        if 'docid_prefix' in filters:
+            mask &= np.char.startswith(self.docids, filters['docid_prefix'].encode('utf-8'))
+        return mask
+
+    def search(self, query_vector: List[float], top_k: int = 5,
+               filters: Optional[Dict[str, Any]] = None,
+               rerank: bool = True, candidates: int = 100) -> pd.DataFrame:
+        """
+        Búsqueda por ADC, opcionalmente re-rankeada con distancias exactas en ADB
+
+        Args:
+            filters: Solo title, docid y docid_prefix
+            rerank: Re-ordenar los candidatos con vector_similarity_search_genai
+            candidates: Candidatos ADC enviados al re-rank (como máximo el mayor IN_LIST_BUCKETS)
+
+        Returns:
+            Con rerank, el DataFrame de vector_similarity_search_genai; sin rerank,
+            id, docid, title y distance (aproximada)
+        """
+        hits = self._candidates(query_vector, top_k, filters, rerank, candidates)
+        if not rerank:
+            return pd.DataFrame([(int(self.row_ids[p]), self.docids[p].decode('utf-8'),
+                                  self.title_values[self.title_codes[p]].decode('utf-8'), d)
+                                 for p, d in hits], columns=PQ_RESULT_COLUMNS)
+
+        if not hits:
+            return pd.DataFrame(columns=PQ_RESULT_COLUMNS)
+        # Por id: docid no es único (ingestas por inserción repetidas)
+        return self.db.vector_similarity_search_genai(
+            query_vector, top_k, self.distance_metric, table_name=self.table_name,
+            filters={'id': [int(self.row_ids[p]) for p, _ in hits]})
+
+    def search_ids(self, query_vector: List[float], top_k: int = 5,
+                   filters: Optional[Dict[str, Any]] = None,
+                   rerank: bool = True, candidates: int = 100) -> List[int]:
+        """Ids de fila del top-k de search(), sin leer body ni metadatos"""
+        hits = self._candidates(query_vector, top_k, filters, rerank, candidates)
+        if not rerank or not hits:
+            return [int(self.row_ids[p]) for p, _ in hits]
+        exact = self.db.vector_search_ids(query_vector, top_k, self.distance_metric, table_name=self.table_name,
+                                          filters={'id': [int(self.row_ids[p]) for p, _ in hits]})
+        return [int(row_id) for row_id in exact['id']]
+
+    def _candidates(self, query_vector: List[float], top_k: int, filters: Optional[Dict[str, Any]],
+                    rerank: bool, candidates: int) -> List[Tuple[int, float]]:
+        """Posiciones del top-k por ADC (o de los candidatos para el re-rank)"""
+        if self.index is None or not self.index.size:
+            return []
+        mask = self._mask(filters)
+        limit = min(max(candidates, top_k), IN_LIST_BUCKETS[-1]) if rerank else top_k
+        return self.index.search(np.asarray(query_vector, dtype=np.float32), limit, mask)
+
+    def benchmark(self, query_vectors: List[List[float]], top_k: int = 10,
+                  candidates: int = 100) -> Dict[str, Any]:
+        """
+        Recall@k y latencia (ms) del índice PQ, con y sin re-rank, frente a la búsqueda
+        exacta en ADB
+
+        El recall se mide sobre ids de fila (docid no es único) y las tres variantes
+        devuelven solo ids (search_ids y vector_search_ids), sin leer body.
+        """
+        timings = {'pq': [], 'rerank': [], 'adb': []}
+        recalls = {'pq': [], 'rerank': []}
+
+        for query_vector in query_vectors:
+            start = time.perf_counter()
+            exact = self.db.vector_search_ids(query_vector, top_k, self.distance_metric,
+                                              table_name=self.table_name)
+            timings['adb'].append((time.perf_counter() - start) * 1000)
+            expected = set(int(row_id) for row_id in exact['id'])
+            if not expected:
+                continue
+
+            for mode, rerank in (('pq', False), ('rerank', True)):
+                start = time.perf_counter()
+                found = self.search_ids(query_vector, top_k, rerank=rerank, candidates=candidates)
+                timings[mode].append((time.perf_counter() - start) * 1000)
+                recalls[mode].append(len(expected & set(found)) / len(expected))
+
+        result = {'top_k': top_k, 'candidates': candidates, **self.memory_stats()}
+        for mode in ('pq', 'rerank'):
+            result[f'{mode}_recall'] = float(np.mean(recalls[mode])) if recalls[mode] else None
+        for mode, values in timings.items():
+            result[f'{mode}_ms_p50'] = float(np.percentile(values, 50)) if values else None
+            result[f'{mode}_ms_p95'] = float(np.percentile(values, 95)) if values else None
+        return result
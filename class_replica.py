@@ -0,0 +1,349 @@
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import logging
+
+from class_adw import OracleADBConnection
+from class_ann import IVFIndex
+from class_local import SEARCH_COLUMNS, match_genai_filters
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+REPLICA_COLUMNS = "id, docid, body, title, url, chunk_id, page_numbers, metadata, fecha_creacion, vector"
+SYNC_EPOCH = datetime(1970, 1, 1)
+
+
+class VectorReplica:
+    """
+    Réplica de lectura en memoria de una tabla GenAI con un índice IVF (NumPy)
+
+    load() copia la tabla en streaming y entrena el cuantizador grueso; sync() trae
+    solo las filas con id o fecha_creacion posteriores a la última sincronización
+    (los MERGE de la ingesta idempotente actualizan fecha_creacion) y detecta los
+    borrados. Las búsquedas no hacen ningún round trip a la base de datos.
+    """
+
+    def __init__(self, db: OracleADBConnection, table_name: str,
+                 nlist: Optional[int] = None, nprobe: int = 8,
+                 distance_metric: str = 'COSINE',
+                 batch_size: int = 2000,
+                 sync_overlap: float = 60.0,
+                 retrain_growth: float = 2.0,
+                 compact_threshold: float = 0.3,
+                 train_sample: int = 100000):
+        """
+        Args:
+            nlist: Listas del IVF (por defecto ~sqrt(filas) al cargar)
+            nprobe: Listas visitadas por consulta
+            sync_overlap: Segundos que cada sync vuelve a leer por detrás de la última
+                          fecha_creacion vista, para no perder transacciones que
+                          confirmaron con una marca de tiempo anterior
+            retrain_growth: Reentrenar los centroides cuando las filas superen este
+                            factor sobre las usadas al entrenar
+            compact_threshold: Fracción de posiciones borradas que dispara la compactación
+            train_sample: Vectores máximos usados para entrenar k-means
+        """
+        self.db = db
+        self.table_name = table_name
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.distance_metric = distance_metric.upper()
+        self.batch_size = batch_size
+        self.sync_overlap = sync_overlap
+        self.retrain_growth = retrain_growth
+        self.compact_threshold = compact_threshold
+        self.train_sample = train_sample
+
+        self.index = None
+        self._records = []
+        self._position_of = {}
+        self.max_id = 0
+        self.max_fecha = None
+        self.last_sync = None
+        self._lock = threading.RLock()
+        self._stop = None
+
+    # ==================== SINCRONIZACIÓN ====================
+
+    def load(self) -> Dict[str, Any]:
+        """Copia inicial completa en streaming y entrenamiento del índice"""
+        start = time.perf_counter()
+        with self._lock:
+            self.index = None
+            self._records = []
+            self._position_of = {}
+            self.max_id = 0
+            self.max_fecha = None
+
+            query = f"SELECT {REPLICA_COLUMNS} FROM {self.table_name} ORDER BY id"
+            for df, matrix in self.db.iter_vector_batches(query, batch_size=self.batch_size):
+                self._apply(df, matrix)
+                logger.info(f"Réplica: {len(self._records)} filas copiadas...")
+
+            if self.index is not None:
+                self._train()
+            self.last_sync = datetime.now()
+
+        elapsed = time.perf_counter() - start
+        rows = self.index.alive_count if self.index else 0
+        logger.info(f"✓ Réplica de '{self.table_name}' cargada: {rows} filas en {elapsed:.1f}s")
+        return {'rows': rows, 'seconds': elapsed}
+
+    def sync(self) -> Dict[str, Any]:
+        """Sincronización incremental: filas nuevas o actualizadas y detección de borrados"""
+        if self.index is None:
+            return self.load()
+
+        start = time.perf_counter()
+        since = (self.max_fecha - timedelta(seconds=self.sync_overlap)) if self.max_fecha else SYNC_EPOCH
+        query = f"""
+            SELECT {REPLICA_COLUMNS} FROM {self.table_name}
+            WHERE id > :max_id OR fecha_creacion >= :since
+            ORDER BY id
+        """
+        changed = 0
+        for df, matrix in self.db.iter_vector_batches(query, {'max_id': self.max_id, 'since': since},
+                                                      batch_size=self.batch_size):
+            with self._lock:
+                changed += self._apply(df, matrix)
+
+        deleted = self._detect_deletes()
+
+        with self._lock:
+            alive = self.index.alive_count
+            if alive > self.retrain_growth * max(self.index.trained_size, 1):
+                logger.info(f"Réplica: {alive} filas frente a {self.index.trained_size} al entrenar; reentrenando")
+                self._train()
+            elif self.index.size and 1 - alive / self.index.size > self.compact_threshold:
+                self._compact()
+            self.last_sync = datetime.now()
+
+        elapsed = time.perf_counter() - start
+        logger.info(f"✓ Réplica sincronizada: {changed} filas nuevas o actualizadas, "
+                    f"{deleted} borradas ({elapsed * 1000:.0f} ms)")
+        return {'changed': changed, 'deleted': deleted, 'seconds': elapsed}
+
+    def _apply(self, df: pd.DataFrame, matrix: np.ndarray) -> int:
+        """Insertar o reemplazar filas; las que no cambiaron desde la última lectura se omiten"""
+        if self.index is None:
+            self.index = IVFIndex(matrix.shape[1], self.nlist or 1, self.nprobe, self.distance_metric)
+
+        records = df.to_dict('records')
+        keep, replaced = [], []
+        for n, record in enumerate(records):
+            if isinstance(record['fecha_creacion'], pd.Timestamp):
+                record['fecha_creacion'] = record['fecha_creacion'].to_pydatetime()
+            row_id = int(record['id'])
+            position = self._position_of.get(row_id)
+            if position is not None:
+                if self._records[position]['fecha_creacion'] == record['fecha_creacion']:
+                    continue
+                replaced.append(position)
+                self._records[position] = None
+            keep.append(n)
+
+            self.max_id = max(self.max_id, row_id)
+            if record['fecha_creacion'] is not None and (self.max_fecha is None
+                                                         or record['fecha_creacion'] > self.max_fecha):
+                self.max_fecha = record['fecha_creacion']
+
+        self.index.remove(replaced)
+        if not keep:
+            return 0
+
+        positions = self.index.add(matrix[keep])
+        for position, record in zip(positions.tolist(), [records[n] for n in keep]):
+            self._records.append(record)
+            self._position_of[int(record['id'])] = position
+        return len(keep)
+
+    def _detect_deletes(self) -> int:
+        """
+        Quitar las filas borradas en la tabla
+
+        Compara el número y la suma de los ids hasta max_id (las filas insertadas
+        después de la lectura no cuentan) y solo si difieren recorre los ids de la
+        tabla. Un borrado solo pasa inadvertido si una fila con id menor que max_id
+        confirmada tarde compensa exactamente ese conteo y esa suma; se detecta en
+        el sync siguiente, cuando sync_overlap trae esa fila a la réplica.
+        """
+        bounds = {'max_id': self.max_id}
+        with self._lock:
+            replica_ids = np.fromiter(self._position_of, dtype=np.int64, count=len(self._position_of))
+        source_rows, source_sum = self.db.execute_query(
+            f"SELECT COUNT(*), NVL(SUM(id), 0) FROM {self.table_name} WHERE id <= :max_id", bounds)[0]
+        if source_rows == len(replica_ids) and int(source_sum) == int(replica_ids.sum()):
+            return 0
+
+        ids = self.db.iter_query(f"SELECT id FROM {self.table_name} WHERE id <= :max_id", bounds,
+                                 batch_size=10000)
+        source_ids = np.fromiter((row[0] for row in ids), dtype=np.int64)
+        missing = np.setdiff1d(replica_ids, source_ids, assume_unique=True)
+        with self._lock:
+            positions = [self._position_of.pop(row_id) for row_id in missing.tolist()
+                         if row_id in self._position_of]
+            self.index.remove(positions)
+            for position in positions:
+                self._records[position] = None
+        return len(positions)
+
+    def _train(self):
+        """Entrenar k-means sobre una muestra de las filas vivas"""
+        alive = self.index.alive_positions()
+        nlist = self.nlist or max(1, int(np.sqrt(len(alive))))
+        sample = alive
+        if len(alive) > self.train_sample:
+            sample = np.random.default_rng(0).choice(alive, self.train_sample, replace=False)
+        self.index.nlist = nlist
+        start = time.perf_counter()
+        self.index.train(self.index.vectors(sample))
+        logger.info(f"Réplica: IVF entrenado con {len(sample)} vectores, nlist={self.index.nlist} "
+                    f"({time.perf_counter() - start:.1f}s)")
+
+    def _compact(self):
+        """Reconstruir las estructuras sin las posiciones borradas"""
+        kept = self.index.compact()
+        self._records = [self._records[position] for position in kept.tolist()]
+        self._position_of = {int(record['id']): position for position, record in enumerate(self._records)}
+
+    def start_auto_sync(self, interval: float = 30.0):
+        """Sincronizar en segundo plano cada interval segundos"""
+        if self._stop is not None:
+            return
+        self._stop = threading.Event()
+
+        def run(stop):
+            while not stop.wait(interval):
+                try:
+                    self.sync()
+                except Exception as e:
+                    logger.error(f"Error sincronizando la réplica: {e}")
+
+        threading.Thread(target=run, args=(self._stop,), daemon=True).start()
+
+    def stop_auto_sync(self):
+        """Detener la sincronización en segundo plano"""
+        if self._stop is not None:
+            self._stop.set()
+            self._stop = None
+
+    # ==================== BÚSQUEDA ====================
+
+    def _candidate_filter(self, filters: Optional[Dict[str, Any]]):
+        """Filtro evaluado solo sobre los candidatos de las listas visitadas"""
+        if not filters:
+            return None
+
+        title = filters.get('title')
+        titles = None if title is None else ({title} if isinstance(title, str) else set(title))
+        prefix = filters.get('docid_prefix')
+        rest = {key: value for key, value in filters.items() if key not in ('title', 'docid_prefix')}
+
+        def check(positions: np.ndarray) -> np.ndarray:
+            mask = np.empty(len(positions), dtype=bool)
+            for n, position in enumerate(positions.tolist()):
+                record = self._records[position]
+                mask[n] = ((titles is None or record['title'] in titles)
+                           and (prefix is None or (record['docid'] or '').startswith(prefix))
+                           and (not rest or match_genai_filters(record, rest)))
+            return mask
+
+        return check
+
+    def search(self, query_vector: List[float], top_k: int = 5,
+               filters: Optional[Dict[str, Any]] = None,
+               nprobe: Optional[int] = None) -> pd.DataFrame:
+        """
+        Búsqueda aproximada en la réplica
+
+        Args:
+            filters: Formato de compile_genai_filters; title y docid_prefix se evalúan
+                     directamente, el resto con match_genai_filters
+            nprobe: Listas visitadas (por defecto las de la réplica)
+
+        Returns:
+            DataFrame con las columnas de vector_similarity_search_genai
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        with self._lock:
+            if self.index is None:
+                return pd.DataFrame(columns=SEARCH_COLUMNS)
+            hits = self.index.search(query, top_k, nprobe, self._candidate_filter(filters))
+            rows = [[self._records[position].get(c) for c in SEARCH_COLUMNS[:-1]] + [distance]
+                    for position, distance in hits]
+        return pd.DataFrame(rows, columns=SEARCH_COLUMNS)
+
+    def vector_similarity_search_genai(self, query_vector: List[float],
+                                       top_k: int = 5,
+                                       distance_metric: str = 'COSINE',
+                                       filter_conditions: str = None,
+                                       table_name: str = None,
+                                       filters: Optional[Dict[str, Any]] = None,
+                                       approximate: bool = True,
+                                       target_accuracy: Optional[int] = None) -> pd.DataFrame:
+        """Misma firma que OracleADBConnection.vector_similarity_search_genai, servida por la réplica"""
+        if filter_conditions:
+            raise ValueError("La réplica no admite filter_conditions; use 'filters'")
+        if distance_metric.upper() != self.distance_metric:
+            raise ValueError(f"La réplica se construyó con la métrica {self.distance_metric}")
+        return self.search(query_vector, top_k, filters)
+
+    # ==================== OBSERVABILIDAD ====================
+
+    def staleness(self) -> Dict[str, Any]:
+        """Retraso de la réplica respecto a la tabla (consulta la base de datos)"""
+        count, max_id, max_fecha = self.db.execute_query(
+            f"SELECT COUNT(*), MAX(id), MAX(fecha_creacion) FROM {self.table_name}")[0]
+        pending = self.db.execute_query(
+            f"SELECT COUNT(*) FROM {self.table_name} WHERE id > :1 OR fecha_creacion > :2",
+            [self.max_id, self.max_fecha or SYNC_EPOCH])[0][0]
+
+        lag = None
+        if max_fecha is not None and self.max_fecha is not None:
+            lag = max(0.0, (max_fecha - self.max_fecha).total_seconds())
+        return {
+            'last_sync': self.last_sync,
+            'seconds_since_sync': (datetime.now() - self.last_sync).total_seconds() if self.last_sync else None,
+            'replica_rows': self.index.alive_count if self.index else 0,
+            'source_rows': count,
+            'pending_rows': pending,
+            'lag_seconds': lag
+        }
+
+    def measure_recall(self, query_vectors: List[List[float]], top_k: int = 10,
+                       nprobe: Optional[int] = None,
+                       filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Recall@k de la réplica frente a la búsqueda exacta de vector_similarity_search_genai,
+        con la latencia de ambas (ms)
+        """
+        recalls, replica_ms, adb_ms = [], [], []
+        for query_vector in query_vectors:
+            start = time.perf_counter()
+            local = self.search(query_vector, top_k, filters, nprobe)
+            replica_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            exact = self.db.vector_similarity_search_genai(query_vector, top_k, self.distance_metric,
+                                                           table_name=self.table_name, filters=filters)
+            adb_ms.append((time.perf_counter() - start) * 1000)
+
+            if len(exact):
+                recalls.append(len(set(local['docid']) & set(exact['docid'])) / len(exact))
+
+        result = {
+            'nprobe': nprobe or self.nprobe,
+            'nlist': self.index.nlist if self.index else None,
+            'recall': float(np.mean(recalls)) if recalls else None,
+            'replica_ms_p50': float(np.percentile(replica_ms, 50)) if replica_ms else None,
+            'replica_ms_p95': float(np.percentile(replica_ms, 95)) if replica_ms else None,
+            'adb_ms_p50': float(np.percentile(adb_ms, 50)) if adb_ms else None
+        }
+        logger.info(f"Recall@{top_k} (nprobe={result['nprobe']}): {result['recall']}, réplica p50 "
+                    f"{result['replica_ms_p50']} ms, ADB p50 {result['adb_ms_p50']} ms")
+        return result
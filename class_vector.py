@@ -2,12 +2,28 @@ import oci
 from oci.generative_ai_inference import GenerativeAiInferenceClient
 from oci.generative_ai_inference.models import EmbedTextDetails, OnDemandServingMode
 
+from class_adw import quantize_vector
+
+# Tipo de embedding de Cohere -> formato de la columna VECTOR
+EMBEDDING_TYPE_FORMATS = {"float": "FLOAT32", "int8": "INT8", "ubinary": "BINARY"}
+
+
 class CohereOCIEmbedder:
-    def __init__(self, config_file="~/.oci/config", profile="DEFAULT", compartment_id=None, endpoint=None, model_id=None):
+    def __init__(self, config_file="~/.oci/config", profile="DEFAULT", compartment_id=None, endpoint=None, model_id=None,
+                 embedding_type="float"):
+        """
+        embedding_type: "float", "int8" o "ubinary" (bits empaquetados); debe corresponder
+        al VECTOR_FORMAT de la tabla. Si el SDK o el modelo no devuelven ese tipo, el
+        embedding float se cuantiza localmente (ver quantize_vector).
+        """
+        if embedding_type not in EMBEDDING_TYPE_FORMATS:
+            raise ValueError(f"embedding_type debe ser uno de {sorted(EMBEDDING_TYPE_FORMATS)}")
         self.config = oci.config.from_file(config_file, profile)
         self.client = GenerativeAiInferenceClient(config=self.config, service_endpoint=endpoint)
         self.compartment_id = compartment_id
         self.model_id = model_id
+        self.embedding_type = embedding_type
+        self.vector_format = EMBEDDING_TYPE_FORMATS[embedding_type]
 
     def embed_text(self, text):
         embed_text_detail = EmbedTextDetails()
@@ -15,8 +31,16 @@ class CohereOCIEmbedder:
         embed_text_detail.inputs = [text]
         embed_text_detail.truncate = "NONE"
         embed_text_detail.compartment_id = self.compartment_id
-        
+        if self.embedding_type != "float" and hasattr(embed_text_detail, "embedding_types"):
+            embed_text_detail.embedding_types = [self.embedding_type]
+
         response = self.client.embed_text(embed_text_detail)
         return response.data  # contiene la lista de vectores embeddings
 
-
+    def embed_vector(self, text):
+        """Embedding de un texto listo para enlazar en una columna VECTOR del formato configurado"""
+        data = self.embed_text(text)
+        by_type = getattr(data, "embeddings_by_type", None) or {}
+        if self.embedding_type in by_type:
+            return quantize_vector(by_type[self.embedding_type][0], self.vector_format)
+        return quantize_vector(data.embeddings[0], self.vector_format)
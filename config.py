@@ -10,7 +10,36 @@ DB_CONFIG = {
     "host": os.getenv("DB_HOST"),
     "port": int(os.getenv("DB_PORT", "1522")), # Default to 1522 if not set
     "service_name": os.getenv("DB_SERVICE_NAME"),
-    "dsn": os.getenv("DB_DSN")
+    "dsn": os.getenv("DB_DSN"),
+    # Pool de sesiones (opcional)
+    "pool_enabled": os.getenv("DB_POOL_ENABLED", "false").lower() == "true",
+    "pool_min": int(os.getenv("DB_POOL_MIN", "1")),
+    "pool_max": int(os.getenv("DB_POOL_MAX", "4")),
+    "pool_increment": int(os.getenv("DB_POOL_INCREMENT", "1")),
+    "pool_ping_interval": int(os.getenv("DB_POOL_PING_INTERVAL", "60")), # Segundos
+    "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", "5000")), # Milisegundos
+    # Lectura de LOBs en línea (sin round trip por valor)
+    "fetch_lobs_inline": os.getenv("DB_FETCH_LOBS_INLINE", "true").lower() == "true",
+    "lob_inline_max_size": int(os.getenv("DB_LOB_INLINE_MAX_SIZE", "1048576")), # Caracteres
+    # Columnas VECTOR como arrays NumPy
+    "vectors_as_numpy": os.getenv("DB_VECTORS_AS_NUMPY", "false").lower() == "true",
+    # Sentencias cacheadas por sesión
+    "stmtcachesize": int(os.getenv("DB_STMT_CACHE_SIZE", "50")),
+    # Segundos de caché de get_genai_stats
+    "stats_ttl": float(os.getenv("DB_STATS_TTL", "60")),
+    # Servicio ADB por clase de carga, ej: "search=xxx_tp,ingest=xxx_high"
+    "workload_services": dict(
+        item.split("=", 1) for item in os.getenv("DB_WORKLOAD_SERVICES", "").split(",") if "=" in item
+    ),
+    # Caché de resultados de búsqueda en el cliente
+    "search_cache_enabled": os.getenv("DB_SEARCH_CACHE_ENABLED", "false").lower() == "true",
+    "search_cache_max_entries": int(os.getenv("DB_SEARCH_CACHE_MAX_ENTRIES", "1024")),
+    "search_cache_max_bytes": int(os.getenv("DB_SEARCH_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    "search_cache_ttl": float(os.getenv("DB_SEARCH_CACHE_TTL", "300")), # Segundos
+    # Formato de la columna VECTOR: FLOAT32, INT8 o BINARY (cuantizado)
+    "vector_format": os.getenv("VECTOR_FORMAT", "FLOAT32").upper(),
+    # Sesiones del pool asyncio compartido de execute_pipeline
+    "pipeline_pool_max": int(os.getenv("DB_PIPELINE_POOL_MAX", "2"))
 }
 
 # OCI Configuration
@@ -19,7 +48,9 @@ OCI_CONFIG = {
     "profile": os.getenv("OCI_PROFILE", "DEFAULT"),
     "compartment_id": os.getenv("OCI_COMPARTMENT_ID"),
     "endpoint": os.getenv("OCI_ENDPOINT"),
-    "model_id": os.getenv("OCI_EMBED_MODEL_ID")
+    "model_id": os.getenv("OCI_EMBED_MODEL_ID"),
+    # Tipo de embedding pedido al servicio; debe corresponder a VECTOR_FORMAT
+    "embedding_type": {"INT8": "int8", "BINARY": "ubinary"}.get(os.getenv("VECTOR_FORMAT", "FLOAT32").upper(), "float")
 }
 
 # Application Configuration
@@ -27,4 +58,24 @@ MARKDOWN_DIR = os.getenv("MARKDOWN_DIR", "md")
 TABLE_NAME = os.getenv("TABLE_NAME", "documentos_vectoriales_genai")
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))
 CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "200"))
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))
\ No newline at end of file
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "50"))
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "adb").lower() # adb o local (LocalVectorStore, sin base de datos)
+LOCAL_STORE_PATH = os.getenv("LOCAL_STORE_PATH", "local_store")
+INGEST_MODE = os.getenv("INGEST_MODE", "insert").lower() # insert (obligatorio con VECTOR_BACKEND=local) o upsert (idempotente, solo chunks nuevos o modificados)
+
+# Vector Index Configuration
+VECTOR_DIMENSIONS = int(os.getenv("VECTOR_DIMENSIONS", "1536"))
+VECTOR_FORMAT = DB_CONFIG["vector_format"] # FLOAT32, INT8 o BINARY
+VECTOR_DISTANCE_METRIC = "HAMMING" if VECTOR_FORMAT == "BINARY" else "COSINE"
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "HNSW").upper() # HNSW, IVF o AUTO
+VECTOR_INDEX_ACCURACY = int(os.getenv("VECTOR_INDEX_ACCURACY", "95"))
+VECTOR_INDEX_PARTITIONS = int(os.getenv("VECTOR_INDEX_PARTITIONS", "0")) or None # IVF; 0 = automático
+EXPECTED_ROWS = int(os.getenv("EXPECTED_ROWS", "100000")) # Para el advisor con VECTOR_INDEX_TYPE=AUTO
+TEXT_INDEX_ENABLED = os.getenv("TEXT_INDEX_ENABLED", "true").lower() == "true" # Índice Oracle Text para la búsqueda híbrida
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "false").lower() == "true" # 3-test-rag: búsqueda híbrida (requiere el índice de texto)
+INDEX_WAIT_POPULATION = os.getenv("INDEX_WAIT_POPULATION", "false").lower() == "true" # Esperar al índice en memoria tras la ingesta
+
+# Réplica en memoria (class_replica.py)
+REPLICA_NLIST = int(os.getenv("REPLICA_NLIST", "0")) or None # Listas del IVF; 0 = ~sqrt(filas)
+REPLICA_NPROBE = int(os.getenv("REPLICA_NPROBE", "8"))
+REPLICA_SYNC_INTERVAL = float(os.getenv("REPLICA_SYNC_INTERVAL", "30")) # Segundos entre sincronizaciones
@@ -0,0 +1,44 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Los módulos del proyecto viven en la raíz del repositorio (layout plano)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
+
+
+@pytest.fixture
+def vectors(rng):
+    """Corpus sintético: 2000 vectores de 32 dimensiones agrupados en 20 clusters"""
+    centers = rng.normal(size=(20, 32)).astype(np.float32)
+    labels = rng.integers(0, 20, size=2000)
+    return (centers[labels] + 0.3 * rng.normal(size=(2000, 32))).astype(np.float32)
+
+
+@pytest.fixture
+def brute_force():
+    """Top-k de referencia: (filas ordenadas, distancias) sin bloques ni argpartition"""
+    return _brute_force
+
+
+@pytest.fixture
+def queries(vectors, rng):
+    """20 consultas: vectores del corpus con ruido"""
+    return vectors[rng.choice(len(vectors), 20, replace=False)] + \
+        0.1 * rng.normal(size=(20, vectors.shape[1])).astype(np.float32)
+
+
+def _brute_force(matrix, query, top_k, distance_metric='COSINE'):
+    if distance_metric == 'COSINE':
+        distances = 1 - matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    elif distance_metric == 'DOT':
+        distances = -(matrix @ query)
+    else:
+        distances = np.linalg.norm(matrix - query, axis=1)
+    return list(np.argsort(distances, kind='stable')[:top_k]), distances
@@ -0,0 +1,80 @@
+import time
+
+import pandas as pd
+
+from class_cache import SearchResultCache
+
+
+def frame(rows=3):
+    return pd.DataFrame({'docid': [f"a.md_chunk_{i}" for i in range(rows)], 'distance': [0.1] * rows})
+
+
+def test_key_depends_on_vector_table_and_params():
+    key = SearchResultCache.make_key('docs', [0.1, 0.2], top_k=5)
+
+    assert key == SearchResultCache.make_key('DOCS', (0.1, 0.2), top_k=5)
+    assert key != SearchResultCache.make_key('docs', [0.1, 0.3], top_k=5)
+    assert key != SearchResultCache.make_key('docs', [0.1, 0.2], top_k=10)
+    assert key != SearchResultCache.make_key('otra', [0.1, 0.2], top_k=5)
+
+
+def test_hit_returns_a_copy():
+    cache = SearchResultCache()
+    cache.put('k', 'docs', frame(), cache.generation('docs'))
+
+    result = cache.get('k', 'docs')
+    result.loc[0, 'docid'] = 'modificado'
+
+    assert cache.get('k', 'docs').loc[0, 'docid'] == 'a.md_chunk_0'
+    assert cache.stats()['hits'] == 2
+
+
+def test_bump_generation_invalidates_table():
+    cache = SearchResultCache()
+    cache.put('k', 'docs', frame(), cache.generation('docs'))
+    cache.put('o', 'otra', frame(), cache.generation('otra'))
+
+    cache.bump_generation('DOCS')
+
+    assert cache.get('k', 'docs') is None
+    assert cache.get('o', 'otra') is not None
+
+
+def test_put_with_old_generation_is_discarded():
+    cache = SearchResultCache()
+    generation = cache.generation('docs')
+    cache.bump_generation('docs')
+
+    cache.put('k', 'docs', frame(), generation)
+
+    assert cache.get('k', 'docs') is None
+
+
+def test_ttl_expires(monkeypatch):
+    cache = SearchResultCache(ttl=10)
+    now = time.monotonic()
+    monkeypatch.setattr(time, 'monotonic', lambda: now)
+    cache.put('k', 'docs', frame(), 0)
+
+    monkeypatch.setattr(time, 'monotonic', lambda: now + 11)
+
+    assert cache.get('k', 'docs') is None
+
+
+def test_lru_eviction_by_entries_and_bytes():
+    cache = SearchResultCache(max_entries=2)
+    for key in ('a', 'b', 'c'):
+        cache.put(key, 'docs', frame(), 0)
+
+    assert cache.get('a', 'docs') is None
+    assert cache.stats()['entries'] == 2
+
+    size = int(frame().memory_usage(deep=True).sum())
+    small = SearchResultCache(max_bytes=size)
+    small.put('a', 'docs', frame(), 0)
+    small.put('b', 'docs', frame(), 0)
+    small.put('grande', 'docs', frame(1000), 0)
+
+    assert small.get('a', 'docs') is None
+    assert small.get('b', 'docs') is not None
+    assert small.get('grande', 'docs') is None
@@ -0,0 +1,59 @@
+from datetime import datetime
+
+import pytest
+
+from class_adw import IN_LIST_BUCKETS, compile_genai_filters
+
+
+def test_empty_filters():
+    assert compile_genai_filters(None) == ("", {})
+    assert compile_genai_filters({}) == ("", {})
+
+
+def test_equality_and_range():
+    where, binds = compile_genai_filters({'title': 'a.md', 'chunk_id': {'lte': 10, 'gte': 1}})
+
+    assert where == "chunk_id >= :f_chunk_id_gte AND chunk_id <= :f_chunk_id_lte AND title = :f_title_eq"
+    assert binds == {'f_chunk_id_gte': 1, 'f_chunk_id_lte': 10, 'f_title_eq': 'a.md'}
+
+
+def test_in_list_is_padded_to_bucket():
+    where, binds = compile_genai_filters({'title': ['x', 'y', 'z']})
+
+    assert where == "title IN (:f_title_0, :f_title_1, :f_title_2, :f_title_3)"
+    assert list(binds.values()) == ['x', 'y', 'z', 'z']
+
+
+@pytest.mark.parametrize('count', [2, 3, 4])
+def test_in_list_shape_only_depends_on_bucket(count):
+    where, _ = compile_genai_filters({'chunk_id': list(range(count))})
+
+    assert where.count(':f_chunk_id_') == next(b for b in IN_LIST_BUCKETS if b >= count)
+
+
+def test_docid_prefix_is_escaped():
+    where, binds = compile_genai_filters({'docid_prefix': 'a_b%.md'})
+
+    assert where == "docid LIKE :f_docid_prefix ESCAPE '\\'"
+    assert binds['f_docid_prefix'] == 'a\\_b\\%.md%'
+
+
+def test_metadata_paths():
+    since = datetime(2025, 1, 1)
+    where, binds = compile_genai_filters({'metadata': {'source_file': 'a.md', 'tags.lang': ['es', 'en']},
+                                          'fecha_creacion': {'gte': since}})
+
+    assert "JSON_VALUE(metadata, '$.source_file') = :f_meta0_eq" in where
+    assert "JSON_VALUE(metadata, '$.tags.lang') IN (:f_meta1_0, :f_meta1_1, :f_meta1_2, :f_meta1_3)" in where
+    assert binds['f_fecha_creacion_gte'] is since
+
+
+@pytest.mark.parametrize('filters', [
+    {'body': 'x'},
+    {'title': []},
+    {'chunk_id': {'ne': 1}},
+    {'metadata': {"a') OR 1=1 --": 'x'}},
+])
+def test_invalid_filters(filters):
+    with pytest.raises(ValueError):
+        compile_genai_filters(filters)
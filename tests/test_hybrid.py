@@ -0,0 +1,20 @@
+import pytest
+
+from class_adw import MAX_TEXT_QUERY_TERMS, keyword_text_query
+
+
+@pytest.mark.parametrize('text, expected', [
+    ("llaves Bre-B", "{llaves} ACCUM {Bre} {B}"),
+    ("pagos AND transferencias?", "{pagos} ACCUM {AND} ACCUM {transferencias}"),
+    ("pagos pagos", "{pagos}"),
+    ("¿? -- !!", None),
+    ("", None),
+])
+def test_keyword_text_query(text, expected):
+    assert keyword_text_query(text) == expected
+
+
+def test_keyword_text_query_limits_terms():
+    query = keyword_text_query(" ".join(f"t{i}" for i in range(100)))
+
+    assert query.count("ACCUM") == MAX_TEXT_QUERY_TERMS - 1
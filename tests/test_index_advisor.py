@@ -0,0 +1,19 @@
+import pytest
+
+from class_adw import advisor_memory_bytes, parse_memory_size
+
+
+@pytest.mark.parametrize('value, expected', [
+    (1024, 1024), ('512M', 512 * 1024 ** 2), ('1.5 GB', int(1.5 * 1024 ** 3)), ('abc', None), (None, None)
+])
+def test_parse_memory_size(value, expected):
+    assert parse_memory_size(value) == expected
+
+
+def test_advisor_memory_bytes_prefers_suggested_value():
+    response = {'index': {'Suggested vector memory size': '3 GB', 'vector_memory_size': '4G'},
+                'pool_memory': ['2G']}
+
+    assert advisor_memory_bytes(response) == 3 * 1024 ** 3
+    assert advisor_memory_bytes([{'Memory': '10M'}]) == 10 * 1024 ** 2
+    assert advisor_memory_bytes({'other': 1}) is None
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from class_ann import IVFIndex, kmeans
+
+
+def recall(found, expected):
+    return len(set(found) & set(expected)) / len(expected)
+
+
+def test_kmeans_shapes(vectors):
+    centroids = kmeans(vectors, 16, iterations=5)
+
+    assert centroids.shape == (16, vectors.shape[1])
+    assert centroids.dtype == np.float32
+    assert len(kmeans(vectors[:3], 16)) == 3
+
+
+@pytest.mark.parametrize('distance_metric', ['COSINE', 'EUCLIDEAN'])
+def test_ivf_all_lists_matches_brute_force(vectors, queries, brute_force, distance_metric):
+    index = IVFIndex(vectors.shape[1], nlist=16, distance_metric=distance_metric)
+    index.train(vectors)
+    index.add(vectors)
+
+    for query in queries:
+        expected, _ = brute_force(vectors, query, 10, distance_metric)
+        assert [p for p, _ in index.search(query, 10, nprobe=16)] == expected
+        assert [p for p, _ in index.exact_search(query, 10)] == expected
+
+
+def test_ivf_recall(vectors, queries, brute_force):
+    index = IVFIndex(vectors.shape[1], nlist=32, nprobe=4)
+    index.train(vectors)
+    index.add(vectors)
+
+    recalls = [recall([p for p, _ in index.search(query, 10)], brute_force(vectors, query, 10)[0])
+               for query in queries]
+
+    assert np.mean(recalls) >= 0.9
+
+
+def test_ivf_remove_and_compact(vectors):
+    index = IVFIndex(vectors.shape[1], nlist=16)
+    index.train(vectors)
+    index.add(vectors)
+
+    index.remove([0, 1, 2])
+
+    assert index.alive_count == len(vectors) - 3
+    assert all(p not in (0, 1, 2) for p, _ in index.search(vectors[0], 10, nprobe=16))
+
+    kept = index.compact()
+    assert index.size == len(vectors) - 3
+    assert kept[0] == 3
+
+
+def test_ivf_remove_batch_updates_lists(vectors):
+    index = IVFIndex(vectors.shape[1], nlist=16)
+    index.train(vectors)
+    index.add(vectors)
+    removed = np.arange(0, len(vectors), 3)
+
+    index.remove(removed)
+    index.remove(removed[:10])
+
+    assert index.alive_count == len(vectors) - len(removed)
+    assert np.array_equal(index.alive_positions(), np.setdiff1d(np.arange(len(vectors)), removed))
+    listed = np.sort(np.concatenate([index.candidates(c, nprobe=16) for c in index.centroids[:1]]))
+    assert np.array_equal(listed, index.alive_positions())
+    assert np.array_equal(index.vectors([1, 2]), vectors[[1, 2]])
+
+
+def test_ivf_candidate_filter(vectors):
+    index = IVFIndex(vectors.shape[1], nlist=16)
+    index.train(vectors)
+    index.add(vectors)
+
+    hits = index.search(vectors[0], 10, nprobe=16, candidate_filter=lambda positions: positions % 2 == 1)
+
+    assert hits and all(p % 2 == 1 for p, _ in hits)
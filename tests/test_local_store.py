@@ -0,0 +1,142 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from class_local import LocalVectorStore, match_genai_filters, top_k_distances
+
+
+def make_documents(vectors):
+    return [{
+        'docid': f"{'a' if i % 2 else 'b'}.md_chunk_{i}",
+        'body': f"texto {i}",
+        'vector': vector.tolist(),
+        'title': 'a.md' if i % 2 else 'b.md',
+        'chunk_id': i,
+        'metadata': json.dumps({'source_file': 'a.md' if i % 2 else 'b.md', 'chunk_index': i})
+    } for i, vector in enumerate(vectors)]
+
+
+@pytest.fixture
+def store(tmp_path, vectors):
+    store = LocalVectorStore(str(tmp_path), block_rows=256)
+    store.bulk_insert_genai(make_documents(vectors[:500]), 'docs', batch_size=128)
+    return store
+
+
+def test_round_trip_survives_reopen(store, tmp_path, vectors):
+    reopened = LocalVectorStore(str(tmp_path))
+    result = reopened.vector_similarity_search_genai(vectors[7].tolist(), top_k=1, table_name='docs')
+
+    assert result.loc[0, 'docid'] == 'a.md_chunk_7'
+    assert result.loc[0, 'body'] == 'texto 7'
+    assert result.loc[0, 'metadata'] == {'source_file': 'a.md', 'chunk_index': 7}
+    assert result.loc[0, 'distance'] == pytest.approx(0, abs=1e-5)
+
+
+def test_stats(store):
+    stats = store.get_genai_stats('docs')
+
+    assert stats['total_documents'] == 500
+    assert stats['unique_source_documents'] == 2
+    assert stats['chunked_documents'] == 500
+
+
+def test_rejects_wrong_dimensions(store, vectors):
+    documents = make_documents(vectors[:1])
+    documents[0]['vector'] = documents[0]['vector'][:-1]
+
+    assert store.bulk_insert_genai(documents, 'docs') == 0
+    assert store.get_genai_stats('docs')['total_documents'] == 500
+
+
+@pytest.mark.parametrize('distance_metric', ['COSINE', 'DOT', 'EUCLIDEAN'])
+def test_top_k_matches_brute_force(vectors, rng, brute_force, distance_metric):
+    matrix = vectors
+    norms = np.linalg.norm(matrix, axis=1).astype(np.float32)
+    queries = rng.normal(size=(5, matrix.shape[1])).astype(np.float32)
+
+    hits = top_k_distances(matrix, norms, queries, 10, distance_metric, block_rows=300)
+
+    for query, query_hits in zip(queries, hits):
+        expected, distances = brute_force(matrix, query, 10, distance_metric)
+        assert [row for row, _ in query_hits] == expected
+        assert [d for _, d in query_hits] == pytest.approx(distances[expected].tolist(), abs=1e-4)
+
+
+def test_search_with_filters(store, vectors, brute_force):
+    query = vectors[0]
+    filters = {'title': 'a.md', 'chunk_id': {'lt': 100}}
+
+    result = store.vector_similarity_search_genai(query.tolist(), top_k=5, table_name='docs',
+                                                  filters=filters)
+
+    eligible = np.arange(1, 100, 2)
+    expected, _ = brute_force(vectors[eligible], query, 5)
+    assert list(result['docid']) == [f"a.md_chunk_{eligible[row]}" for row in expected]
+
+
+def test_search_by_row_id(store, vectors):
+    result = store.vector_similarity_search_genai(vectors[0].tolist(), top_k=5, table_name='docs',
+                                                  filters={'id': [11, 21]})
+
+    assert sorted(result['docid']) == ['b.md_chunk_10', 'b.md_chunk_20']
+
+
+def test_top_k_zero(store, vectors):
+    assert store.vector_similarity_search_genai(vectors[0].tolist(), top_k=0, table_name='docs').empty
+
+
+def test_rejects_quantized_formats(tmp_path):
+    with pytest.raises(ValueError):
+        LocalVectorStore(str(tmp_path), vector_format='INT8')
+
+
+def test_search_rejects_sql_conditions(store, vectors):
+    with pytest.raises(ValueError):
+        store.vector_similarity_search_genai(vectors[0].tolist(), table_name='docs',
+                                             filter_conditions="title = 'a.md'")
+
+
+def test_missing_table_returns_empty(tmp_path, vectors):
+    result = LocalVectorStore(str(tmp_path)).batch_vector_search([vectors[0].tolist()], table_name='nada')
+
+    assert result[0].empty
+
+
+RECORD = {'id': 4, 'docid': 'a.md_chunk_3', 'title': 'a.md', 'chunk_id': 3,
+          'fecha_creacion': '2025-03-01T10:00:00',
+          'metadata': {'source_file': 'a.md', 'chunk_index': 3, 'tags': {'lang': 'es'}}}
+
+
+@pytest.mark.parametrize('filters, expected', [
+    (None, True),
+    ({'title': 'a.md'}, True),
+    ({'id': [4, 5]}, True),
+    ({'id': {'gt': 4}}, False),
+    ({'title': ['b.md', 'c.md']}, False),
+    ({'docid_prefix': 'a.md_'}, True),
+    ({'docid_prefix': 'b.md_'}, False),
+    ({'chunk_id': {'gte': 1, 'lte': 3}}, True),
+    ({'chunk_id': {'gt': 3}}, False),
+    ({'metadata': {'chunk_index': '3'}}, True),
+    ({'metadata': {'chunk_index': [1, 3]}}, True),
+    ({'metadata': {'tags.lang': 'en'}}, False),
+    ({'metadata': {'missing': {'lt': 5}}}, False),
+])
+def test_match_genai_filters(filters, expected):
+    assert match_genai_filters(RECORD, filters) is expected
+
+
+def test_match_genai_filters_datetime_range():
+    assert match_genai_filters(RECORD, {'fecha_creacion': {'gte': datetime(2025, 1, 1)}})
+    assert not match_genai_filters(RECORD, {'fecha_creacion': {'lt': datetime(2025, 1, 1)}})
+    assert match_genai_filters(RECORD, {'fecha_creacion': datetime(2025, 3, 1, 10)})
+    assert match_genai_filters(RECORD, {'fecha_creacion': [datetime(2024, 1, 1), datetime(2025, 3, 1, 10)]})
+
+
+@pytest.mark.parametrize('filters', [{'body': 'x'}, {'title': []}, {'chunk_id': {'ne': 1}}])
+def test_match_genai_filters_rejects_invalid(filters):
+    with pytest.raises(ValueError):
+        match_genai_filters(RECORD, filters)
@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from class_adw import compile_genai_filters
+from class_ann import PQIndex
+from class_pq import PQVectorIndex
+
+
+def recall(found, expected):
+    return len(set(found) & set(expected)) / len(expected)
+
+
+def test_pq_memory_and_codes(vectors):
+    index = PQIndex(vectors.shape[1], m=8)
+    index.train(vectors, iterations=5)
+    index.add(vectors)
+
+    assert index.codes.shape == (len(vectors), 8)
+    assert index.codes.dtype == np.uint8
+    with pytest.raises(ValueError):
+        PQIndex(vectors.shape[1], m=5)
+
+
+@pytest.mark.parametrize('distance_metric', ['COSINE', 'EUCLIDEAN'])
+def test_pq_recall_with_candidates(vectors, queries, brute_force, distance_metric):
+    index = PQIndex(vectors.shape[1], m=8, distance_metric=distance_metric)
+    index.train(vectors, iterations=5)
+    index.add(vectors)
+
+    # Los candidatos ADC deben contener el top-10 exacto (lo que necesita el re-rank)
+    recalls = [recall([p for p, _ in index.search(query, 100)],
+                      brute_force(vectors, query, 10, distance_metric)[0])
+               for query in queries]
+
+    assert np.mean(recalls) >= 0.9
+
+
+def test_pq_search_with_mask(vectors):
+    index = PQIndex(vectors.shape[1], m=8)
+    index.train(vectors, iterations=5)
+    index.add(vectors)
+    mask = np.zeros(len(vectors), dtype=bool)
+    mask[100:200] = True
+
+    hits = index.search(vectors[0], 10, mask)
+
+    assert len(hits) == 10
+    assert all(100 <= p < 200 for p, _ in hits)
+    assert [d for _, d in hits] == sorted(d for _, d in hits)
+
+
+class FakeVectorTable:
+    """iter_vector_batches de una tabla GenAI con docids repetidos"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def iter_vector_batches(self, query, params=None, batch_size=2000):
+        for start in range(0, len(self.vectors), batch_size):
+            block = self.vectors[start:start + batch_size]
+            ids = np.arange(start + 1, start + len(block) + 1)
+            yield pd.DataFrame({'id': ids, 'docid': [f'doc_{i % 100}' for i in ids], 'title': 'a.md'}), block
+
+
+def test_pq_vector_index_ids_and_measured_compression(vectors):
+    pq = PQVectorIndex(FakeVectorTable(vectors), 'genai', m=8, batch_size=500, train_sample=1000)
+    pq.build()
+
+    stats = pq.memory_stats()
+    assert stats['rows'] == len(vectors)
+    assert stats['compression'] < stats['float32_bytes'] / stats['codes_bytes']
+    assert stats['compression'] == stats['float32_bytes'] / stats['index_bytes']
+
+    hits = pq.search(vectors[7], top_k=5, rerank=False)
+    assert list(hits.columns) == ['id', 'docid', 'title', 'distance']
+    assert pq.search_ids(vectors[7], top_k=5, rerank=False) == hits['id'].tolist()
+    assert 8 in hits['id'].tolist()
+
+
+def test_id_filter():
+    where, binds = compile_genai_filters({'id': [101, 102]})
+
+    assert where.startswith("id IN (:f_id_0, :f_id_1")
+    assert binds['f_id_0'] == 101
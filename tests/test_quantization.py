@@ -0,0 +1,44 @@
+import array
+
+import numpy as np
+import pytest
+
+from class_adw import quantize_vector
+
+
+def test_quantize_float32_and_passthrough():
+    vector = quantize_vector([0.5, -1.0, 2.0])
+
+    assert vector.typecode == 'f'
+    assert list(vector) == [0.5, -1.0, 2.0]
+    assert quantize_vector(vector) is vector
+
+
+def test_quantize_int8_scales_floats_by_max_abs():
+    vector = quantize_vector([0.5, -1.0, 0.25], 'INT8', 'COSINE')
+
+    assert vector.typecode == 'b'
+    assert list(vector) == [64, -127, 32]
+
+
+def test_quantize_int8_keeps_integers():
+    assert list(quantize_vector(np.array([3, -7, 200]), 'INT8', 'EUCLIDEAN')) == [3, -7, 127]
+
+
+@pytest.mark.parametrize('distance_metric', ['DOT', 'EUCLIDEAN'])
+def test_quantize_int8_rejects_floats_with_other_metrics(distance_metric):
+    with pytest.raises(ValueError):
+        quantize_vector([0.5, -1.0], 'INT8', distance_metric)
+
+
+def test_quantize_binary_packs_signs():
+    vector = quantize_vector([1, -1, 1, -1, -1, -1, -1, 1.0], 'BINARY')
+
+    assert vector == array.array('B', [0b10100001])
+    with pytest.raises(ValueError):
+        quantize_vector([1.0, -1.0], 'BINARY')
+
+
+def test_quantize_rejects_unknown_format():
+    with pytest.raises(ValueError):
+        quantize_vector([1.0], 'FLOAT16')
@@ -0,0 +1,73 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from class_replica import REPLICA_COLUMNS, VectorReplica
+
+COLUMNS = [c.strip() for c in REPLICA_COLUMNS.split(',')]
+
+
+class FakeTable:
+    """Tabla GenAI en memoria con la parte de OracleADBConnection que usa la réplica"""
+
+    def __init__(self, vectors):
+        self.rows = {}
+        for vector in vectors:
+            self.insert(vector)
+
+    def insert(self, vector):
+        row_id = len(self.rows) + 1 if not self.rows else max(self.rows) + 1
+        self.rows[row_id] = {'id': row_id, 'docid': f'doc_{row_id}', 'body': '', 'title': 't.md',
+                             'url': None, 'chunk_id': 0, 'page_numbers': None, 'metadata': None,
+                             'fecha_creacion': datetime(2024, 1, 1), 'vector': vector}
+
+    def iter_vector_batches(self, query, params=None, batch_size=2000):
+        ids = sorted(self.rows)
+        if params:
+            ids = [i for i in ids if i > params['max_id'] or self.rows[i]['fecha_creacion'] >= params['since']]
+        for start in range(0, len(ids), batch_size):
+            records = [self.rows[i] for i in ids[start:start + batch_size]]
+            df = pd.DataFrame([{c: r[c] for c in COLUMNS if c != 'vector'} for r in records])
+            yield df, np.stack([r['vector'] for r in records])
+
+    def execute_query(self, query, params=None):
+        ids = [i for i in self.rows if i <= params['max_id']]
+        return [(len(ids), sum(ids))]
+
+    def iter_query(self, query, params=None, batch_size=500):
+        return iter([(i,) for i in self.rows if i <= params['max_id']])
+
+
+def test_sync_detects_deletes_and_inserts(vectors):
+    table = FakeTable(vectors[:500])
+    replica = VectorReplica(table, 'genai', nlist=8)
+    replica.load()
+
+    for row_id in (5, 6, 400):
+        del table.rows[row_id]
+    table.insert(vectors[500])
+    table.insert(vectors[501])
+    report = replica.sync()
+
+    assert report['deleted'] == 3
+    assert replica.index.alive_count == 499
+    hits = replica.search(vectors[4], top_k=5, nprobe=8)
+    assert 'doc_5' not in set(hits['docid'])
+    assert replica.search(vectors[501], top_k=1, nprobe=8)['docid'][0] == 'doc_502'
+
+
+def test_sync_detects_delete_masked_by_late_commit(vectors):
+    table = FakeTable(vectors[:100])
+    late = table.rows.pop(50)
+    replica = VectorReplica(table, 'genai', nlist=4)
+    replica.load()
+
+    # Mismo conteo hasta max_id: un borrado compensado por una fila confirmada tarde
+    del table.rows[10]
+    table.rows[50] = dict(late, fecha_creacion=datetime(2000, 1, 1))
+    report = replica.sync()
+
+    assert report['deleted'] == 1
+    assert replica.index.alive_count == 98
+    assert replica.sync()['deleted'] == 0
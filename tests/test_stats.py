@@ -0,0 +1,95 @@
+import oracledb
+import pytest
+
+from class_adw import (NULL_SOURCE_FILE, GenAIStatsState, dml_target_table, genai_stats_deltas,
+                       genai_stats_refresh_binds, genai_stats_refresh_statement, genai_stats_retry_rows,
+                       genai_stats_summary_statement)
+
+DOC = {'docid': 'a.md_chunk_0', 'body': 'texto', 'title': 'a.md', 'chunk_id': 0}
+
+
+@pytest.mark.parametrize('statement, expected', [
+    ("DELETE FROM docs WHERE id = :1", ('DELETE', 'docs')),
+    ("update ADMIN.Docs set title = :1", ('UPDATE', 'docs')),
+    ("INSERT INTO docs (docid) VALUES (:1)", ('INSERT', 'docs')),
+    ("SELECT * FROM docs", None),
+])
+def test_dml_target_table(statement, expected):
+    assert dml_target_table(statement) == expected
+
+
+def test_stats_state_after_dml_marks_table_stale():
+    state = GenAIStatsState(ttl=60)
+    state.store('docs', {'total_documents': 1})
+    state.set_side_table('docs', True)
+
+    assert state.after_dml("DELETE FROM docs WHERE id = 1") == ('DELETE', 'docs')
+    assert state.cached('docs') is None
+    assert not state.use_side_table('docs', fresh=False)
+
+    state.mark_rebuilt('docs')
+    assert state.use_side_table('docs', fresh=False)
+    assert not state.use_side_table('docs', fresh=True)
+
+
+def test_stats_state_side_table_dml_is_not_stale():
+    state = GenAIStatsState(ttl=60)
+    state.store('docs', {'total_documents': 1})
+
+    assert state.after_dml("DELETE FROM docs_stats") is None
+    assert state.cached('docs') is None
+    assert state.use_side_table('docs', fresh=False)
+
+
+def test_stats_state_side_table_row():
+    state = GenAIStatsState(ttl=60)
+
+    assert state.side_table_row('docs', (0,), ValueError()) is None
+    assert state.side_table('docs') is False
+    assert state.side_table_row('docs', (1,), ('fila',)) == ('fila',)
+    with pytest.raises(ValueError):
+        state.side_table_row('docs', (1,), ValueError('falló'))
+
+
+def test_stats_deltas():
+    documents = [dict(DOC, body='x' * 10), dict(DOC, body='x' * 4, chunk_id=None),
+                 dict(DOC, docid='b.md_chunk_0', body='x' * 5000)]
+
+    deltas = {delta['source_file']: delta for delta in genai_stats_deltas(documents)}
+
+    assert deltas['a.md'] == {'source_file': 'a.md', 'chunks': 2, 'chunked': 1,
+                              'length_sum': 14, 'length_max': 10, 'length_min': 4}
+    assert deltas['b.md']['length_max'] == 4000
+
+
+def test_stats_deltas_count_docids_without_source_file():
+    documents = [dict(DOC, docid='_sin_archivo'), dict(DOC, docid=''), dict(DOC, docid=None)]
+
+    deltas = genai_stats_deltas(documents)
+
+    assert [(d['source_file'], d['chunks']) for d in deltas] == [(NULL_SOURCE_FILE, 3)]
+    assert NULL_SOURCE_FILE in genai_stats_summary_statement('docs')
+
+
+def test_stats_refresh_binds():
+    binds = genai_stats_refresh_binds(['b.md_chunk_1', 'a_b.md_chunk_0', 'b.md_chunk_2', '_x'])
+
+    assert binds == [{'source_file': NULL_SOURCE_FILE},
+                     {'source_file': 'a', 'source_prefix': 'a\\_%'},
+                     {'source_file': 'b.md', 'source_prefix': 'b.md\\_%'}]
+    assert 'IS NULL' in genai_stats_refresh_statement('docs', null_source=True)
+
+
+class BatchError:
+    def __init__(self, code, offset):
+        self.code = code
+        self.offset = offset
+
+
+def test_stats_retry_rows_only_for_unique_violations():
+    rows = [{'source_file': 'a.md'}, {'source_file': 'b.md'}, {'source_file': 'c.md'}]
+
+    assert genai_stats_retry_rows([BatchError(1, 2), BatchError(1, 0)], rows) == [rows[2], rows[0]]
+    assert genai_stats_retry_rows([], rows) == []
+    with pytest.raises(oracledb.DatabaseError):
+        genai_stats_retry_rows([BatchError(1, 0), BatchError(1400, 1)], rows)
@@ -0,0 +1,47 @@
+import pytest
+
+from class_adw import genai_content_hash, genai_source_diff
+
+DOC = {'docid': 'a.md_chunk_0', 'body': 'texto', 'title': 'a.md', 'chunk_id': 0,
+       'metadata': '{"source_file": "a.md", "chunk_index": 0}'}
+
+
+def test_content_hash_ignores_vector_and_metadata_encoding():
+    same = dict(DOC, vector=[1.0, 2.0], metadata={'chunk_index': 0, 'source_file': 'a.md'})
+
+    assert genai_content_hash(DOC) == genai_content_hash(same)
+
+
+@pytest.mark.parametrize('change', [{'body': 'otro'}, {'title': 'b.md'}, {'chunk_id': 1}])
+def test_content_hash_changes_with_content(change):
+    assert genai_content_hash(DOC) != genai_content_hash(dict(DOC, **change))
+
+
+def test_content_hash_changes_with_salt():
+    assert genai_content_hash(DOC, 'modelo-a') != genai_content_hash(DOC, 'modelo-b')
+
+
+def test_source_diff():
+    kept = dict(DOC)
+    edited = dict(DOC, docid='a.md_chunk_1', body='nuevo')
+    added = dict(DOC, docid='a.md_chunk_2')
+    rows = [(1, 'a.md_chunk_0', genai_content_hash(kept)),
+            (2, 'a.md_chunk_1', 'hash-anterior'),
+            (3, 'a.md_chunk_1', 'duplicado'),
+            (4, 'a.md_chunk_9', 'borrado')]
+
+    diff = genai_source_diff([kept, edited, added], rows)
+
+    assert diff['unchanged'] == 1
+    assert [(doc['docid'], existed) for doc, _, existed in diff['changed']] == \
+        [('a.md_chunk_1', True), ('a.md_chunk_2', False)]
+    assert sorted(diff['removed_ids']) == [3, 4]
+
+
+def test_source_diff_removes_every_row_of_an_emptied_file():
+    rows = [(1, 'a.md_chunk_0', 'h0'), (2, 'a.md_chunk_1', 'h1')]
+
+    diff = genai_source_diff([], rows)
+
+    assert diff['unchanged'] == 0 and diff['changed'] == []
+    assert sorted(diff['removed_ids']) == [1, 2]
@@ -0,0 +1,31 @@
+import pytest
+
+from class_adw import DEFAULT_WORKLOAD, build_workload_dsns, resolve_workload
+
+
+def test_workload_dsns_from_host_and_port():
+    dsns = build_workload_dsns('adb.example.com', 1522, 'x_low', workload_services={'search': 'x_tp'})
+
+    assert set(dsns) == {DEFAULT_WORKLOAD, 'search'}
+    assert 'x_low' in dsns[DEFAULT_WORKLOAD]
+    assert 'x_tp' in dsns['search'] and 'adb.example.com' in dsns['search']
+
+
+def test_workload_dsns_from_aliases():
+    dsns = build_workload_dsns(dsn='agent_low', workload_services={'ingest': 'agent_high'})
+
+    assert dsns == {DEFAULT_WORKLOAD: 'agent_low', 'ingest': 'agent_high'}
+
+
+@pytest.mark.parametrize('workload, expected', [
+    ('search', 'search'), ('ingest', DEFAULT_WORKLOAD), (None, DEFAULT_WORKLOAD), ('batch', 'batch')
+])
+def test_resolve_workload(workload, expected):
+    dsns = {DEFAULT_WORKLOAD: 'low', 'search': 'tp', 'batch': 'high'}
+
+    assert resolve_workload(workload, dsns) == expected
+
+
+def test_unknown_workload_is_rejected():
+    with pytest.raises(ValueError):
+        resolve_workload('serach', {DEFAULT_WORKLOAD: 'low'})